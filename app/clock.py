@@ -0,0 +1,69 @@
+import time
+
+
+class Clock:
+    """
+    Horloge injectable. Appelée sans argument, elle rend un temps en secondes (float,
+    résolution milliseconde) sur une échelle monotone : seules les différences comptent.
+    wall(t) convertit un temps de cette échelle en timestamp Unix (pour l'affichage
+    ou la persistance d'un départ de course).
+    """
+
+    def __call__(self):
+        raise NotImplementedError
+
+    def wall(self, t=None):
+        raise NotImplementedError
+
+    def from_wall(self, wall_time):
+        """Timestamp Unix => temps de cette horloge (inverse de wall)."""
+        return wall_time - self.wall(0.0)
+
+
+class MonotonicClock(Clock):
+    """Horloge de production : time.monotonic_ns, insensible aux sauts NTP / changements d'heure."""
+
+    def __init__(self):
+        self._wall_anchor = time.time()
+        self._mono_anchor = self()
+
+    def __call__(self):
+        return time.monotonic_ns() // 1_000_000 / 1000
+
+    def wall(self, t=None):
+        t = self() if t is None else t
+        return self._wall_anchor + (t - self._mono_anchor)
+
+
+class FakeClock(Clock):
+    """Horloge pilotée à la main (tests, rejeux) : n'avance que via advance() / set()."""
+
+    def __init__(self, start=0.0, epoch=0.0):
+        self.t = start
+        self.epoch = epoch
+
+    def __call__(self):
+        return self.t
+
+    def advance(self, seconds):
+        self.t = round(self.t + seconds, 3)
+        return self.t
+
+    def set(self, t):
+        self.t = t
+
+    def wall(self, t=None):
+        return self.epoch + (self.t if t is None else t)
+
+
+class AcceleratedClock(MonotonicClock):
+    """Temps réel multiplié par `speed` : rejoue une course de 24h en quelques minutes."""
+
+    def __init__(self, speed=60.0):
+        self.speed = speed
+        self._origin = time.monotonic_ns()
+        super().__init__()
+
+    def __call__(self):
+        elapsed_ns = (time.monotonic_ns() - self._origin) * self.speed
+        return int(elapsed_ns) // 1_000_000 / 1000
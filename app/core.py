@@ -1,360 +1,308 @@
-import time
+import sys
 from datetime import timedelta
 from tkinter import messagebox, simpledialog, filedialog, Toplevel, ttk
-import csv
-import sqlite3
-
-from .db import (
-    init_db,
-    store_lap_data,
-    remove_last_db_entry,
-    reload_from_db,
-    clear_all_laps_db,
-    fetch_stats_for_all,
-    fetch_stats_per_rider
-)
-from .utils import format_lap_duration
+
+from .db import init_db, start_writer, stop_writer, LAP_COLUMNS
+from .engine import RaceEngine, RaceError, NothingToUndo, NothingToRedo, BIKE1, PELOTON, TMA
+from .scheduler import RenderScheduler
+from .utils import format_lap_duration, format_secs_as_hhmmss
+from .views import LapTableView, LapGrid, format_management_row
+
+# Période (ms) de relève des tours reçus des postes distants
+INGEST_POLL_MS = 50
+
 
 class CyclingCore:
-    def __init__(self, app):
+    """
+    Adaptateur Tk du RaceEngine : transforme les clics en appels au moteur,
+    les RaceError en messagebox, et les événements du moteur en mises à jour
+    des labels / Treeviews.
+    """
+
+    def __init__(self, app, clock=None):
         self.app = app
-        self.start_time = None
-        self.MIN_LAP_TIME = 30
-
-        # Bike1
-        self.last_rouleur_1_time = None
-        self.rouleur_1_laps = []
-        self.total_rouleur_1 = 0
-
-        # Peloton
-        self.last_peloton_time = None
-        self.peloton_laps = []
-        self.total_peloton = 0
-
-        # TMA
-        self.last_tma_time = None
-        self.tma_laps = []
-        self.total_tma = 0
-
-        # Liste riders
-        self.riders = [
-            "Lionceau", "Tarpan", "Tamarin", "Ouandji", "Pajero", "Bengali",
-            "Kitfox", "Banteng", "Xérus", "Capybara", "Mustela", "Aquila",
-            "Chaoui", "Steenbock", "Lycaon", "Kowari", "Jaco", "Markhor",
-            "Alaskan", "Chikaree", "Margay", "Mink", "Springbok"
-        ]
-
-        self.next_rouleurs_queue = []
-        self.current_rouleur = self.riders[0]
+        self.engine = RaceEngine(clock=clock)
+        self.engine.subscribe(self.on_engine_event)
+        self.lap_views = {}  # groupe -> LapTableView, créées au premier affichage (après build_ui)
+        self.render = RenderScheduler(app.root, clock=self.engine.clock)
+        self._dirty_groups = set()
+        self.loaded = False
+        self.ingest = None  # IngestServer, voir start_ingest()
+        self.scoreboard = None  # Scoreboard, voir start_scoreboard()
+        # Base de données => load(), planifié par ui.py après le premier rendu
+        # Lancement du timer => depuis ui.py (self.core.update_timer()) après build_ui
 
+    def load(self):
+        """
+        Ouvre la base (migrations), reprend la course en cours et lance l'écriture différée.
+        Hors du chemin critique : ui.py l'appelle via after_idle, une fois la fenêtre dessinée.
+        Chaque action qui touche au moteur ou à la base l'appelle d'abord (sans effet si
+        déjà fait) : un clic, ou une boîte modale qui fait tourner la boucle Tk, peut
+        précéder l'after_idle.
+        """
+        if self.loaded:
+            return
+        self.loaded = True
         init_db()
-        # Lancement du timer => depuis ui.py (self.core.update_timer()) après build_ui
+        # Reprise d'une course en cours (crash / fermeture) : instantané + derniers tours,
+        # sans parcourir la table. Les agrégats sont calculés à la première lecture.
+        if not self.engine.resume():
+            self.engine.stats.invalidate()
+        # Écritures différées : un clic de tour ne bloque jamais sur le disque
+        start_writer()
+
+    def shutdown(self):
+        """Fermeture de l'application : vide la file d'écriture avant de quitter."""
+        if self.ingest is not None:
+            self.ingest.stop()
+            self.ingest = None
+        if self.scoreboard is not None:
+            self.scoreboard.stop()
+            self.scoreboard = None
+        stop_writer()
+
+    @property
+    def start_time(self):
+        return self.engine.start_time
+
+    @property
+    def riders(self):
+        return self.engine.riders
+
+    @property
+    def current_rouleur(self):
+        return self.engine.current_rouleur
+
+    # ============== Événements du moteur ==============
+    def on_engine_event(self, event, **data):
+        if self.scoreboard is not None:
+            # Un seul instantané par tour de boucle, quel que soit le nombre d'événements
+            self.render.request(self.publish_scoreboard)
+        if event in ("lap_recorded", "lap_undone", "lap_redone", "lap_changed"):
+            self.invalidate((data["group"],))
+        elif event in ("reset", "reloaded", "started"):
+            self.invalidate((BIKE1, PELOTON, TMA))
+        elif event == "resumed":
+            # Émis avant build_ui : tout passe par le repaint différé
+            self.invalidate((BIKE1, PELOTON, TMA))
+            self.render.request(self.update_queue_display)
+            self.render.request(self.update_current_rouleur_display)
+            self.render.request(self.update_rider_selector)
+        elif event == "queue_changed":
+            self.update_queue_display()
+        elif event == "rider_changed":
+            self.update_current_rouleur_display()
+        elif event == "riders_changed":
+            self.update_rider_selector()
+
+    def update_rider_selector(self):
+        self.app.rider_selector["values"] = self.engine.riders
+
+    def invalidate(self, groups):
+        """Marque les groupes à redessiner ; un seul repaint par tour de boucle Tk."""
+        self._dirty_groups.update(groups)
+        self.render.request(self.repaint)
+
+    def repaint(self):
+        groups, self._dirty_groups = self._dirty_groups, set()
+        for group in groups:
+            self.update_total_label(group)
+        self.update_lap_history(groups)
+        self.update_pace_headers()
+
+    def update_total_label(self, group):
+        total = self.engine.groups[group].total
+        if group == BIKE1:
+            self.render.set_text(self.app.label_rouleur_1_total, f"Total Rosaire (Bike 1): {total}")
+        elif group == PELOTON:
+            self.render.set_text(self.app.label_peloton_total, f"Total Peloton: {total}")
+        else:
+            self.render.set_text(self.app.label_tma_total, f"Total TMA: {total}")
 
     # ============== Chrono principal ==============
     def start_24h(self):
-        """
-        Démarre le chrono => start_time = now,
-        last_xxx_time = start_time pour réinitialiser les 'current' à 0.
-        """
-        if not self.start_time:
-            self.start_time = time.time()
-            self.last_rouleur_1_time = self.start_time
-            self.last_peloton_time = self.start_time
-            self.last_tma_time = self.start_time
+        self.load()
+        self.engine.start()
 
     def update_timer(self):
         """
-        Appelé chaque seconde => label principal + update_table_headers()
+        Lance le tick d'une seconde, recalé sur l'horloge monotone (voir RenderScheduler).
+        Appelé une fois depuis ui.py après build_ui.
         """
-        if self.start_time:
-            elapsed = time.time() - self.start_time
-            self.app.label_elapsed.config(text=str(timedelta(seconds=int(elapsed))))
-
-        # Actualise “Current” + écarts en direct
         self.update_table_headers()
+        self.render.start_ticks(self.on_tick, period=1.0)
 
-        self.app.root.after(1000, self.update_timer)
+    def on_tick(self):
+        """Chaque seconde => label principal + temps “Current” (le reste ne change qu'aux tours)."""
+        elapsed = self.engine.elapsed()
+        if elapsed is not None:
+            self.render.set_text(self.app.label_elapsed, str(timedelta(seconds=int(elapsed))))
+        self.update_current_headers()
+        self.publish_scoreboard()
 
     def add_new_rider(self):
+        self.load()
         new_name = simpledialog.askstring("Nouveau Rouleur", "Nom du nouveau rouleur :")
         if new_name:
             new_name = new_name.strip()
             if new_name:
-                self.riders.append(new_name)
-                self.app.rider_selector["values"] = self.riders
+                self.engine.add_rider(new_name)
                 messagebox.showinfo("Succès", f"Le rouleur '{new_name}' a été ajouté.")
             else:
                 messagebox.showwarning("Attention", "Le nom du rouleur ne peut être vide.")
 
-    # ============== Record TMA ==============
-    def record_tma(self):
-        if not self.start_time:
-            messagebox.showwarning("Attention", "Démarrez d'abord le chronomètre.")
-            return
-
-        now = time.time()
-        if self.last_tma_time and (now - self.last_tma_time < self.MIN_LAP_TIME):
-            messagebox.showwarning("Attention", f"Il faut au moins {self.MIN_LAP_TIME}s entre deux tours TMA.")
+    # ============== Record ==============
+    def record_lap(self, group):
+        self.load()
+        try:
+            self.engine.record_lap(group)
+        except RaceError as e:
+            messagebox.showwarning("Attention", str(e))
+            return False
+        return True
+
+    # ============== Postes distants ==============
+    def start_ingest(self, port, host="0.0.0.0"):
+        """Ouvre la réception des tours envoyés par les autres postes (voir ingest.py)."""
+        from .ingest import IngestServer
+
+        self.ingest = IngestServer(host, port, min_lap_time=self.engine.min_lap_time).start()
+        print(f"Réception des tours sur {host}:{self.ingest.port}")
+        self.app.root.after(INGEST_POLL_MS, self.drain_ingest)
+
+    def drain_ingest(self):
+        """
+        Thread Tk : passe au moteur les tours reçus depuis la dernière relève, à l'heure
+        du poste. Un refus du moteur (course non démarrée, tour trop court face à un clic
+        local) est journalisé : pas de boîte de dialogue pour un clic fait ailleurs ; le
+        passage est rendu au serveur (reject) pour ne pas bloquer le suivant comme doublon.
+        """
+        if self.ingest is None:
             return
+        try:
+            events = self.ingest.drain()
+            if events:
+                self.load()
+            for event in events:
+                try:
+                    self.engine.record_lap(event.group, at=self.engine.clock.from_wall(event.wall))
+                except RaceError as e:
+                    self.ingest.reject(event)
+                    print(f"Tour reçu de {event.station} ({event.group}) refusé : {e}", file=sys.stderr)
+                except Exception as e:
+                    # Ne doit pas arrêter la relève : les tours suivants restent à enregistrer
+                    print(f"Tour reçu de {event.station} ({event.group}) ignoré : "
+                          f"{type(e).__name__}: {e}", file=sys.stderr)
+        finally:
+            if self.ingest is not None:
+                self.app.root.after(INGEST_POLL_MS, self.drain_ingest)
+
+    # ============== Tableau d'affichage ==============
+    def start_scoreboard(self, port, host="0.0.0.0"):
+        """Sert l'état de la course aux écrans des spectateurs (voir scoreboard.py)."""
+        from .scoreboard import Scoreboard
+
+        self.scoreboard = Scoreboard(self.engine, host, port).start()
+        self.scoreboard.publish()
+        print(f"Tableau d'affichage sur http://{host}:{self.scoreboard.port}/")
+
+    def publish_scoreboard(self):
+        """Chaque seconde (on_tick) et à chaque changement d'état : nouvel instantané si besoin."""
+        if self.scoreboard is not None:
+            self.scoreboard.publish()
 
-        self.total_tma += 1
-        rider = "TMA"
-        lap_duration = (now - self.last_tma_time) if self.last_tma_time else (now - self.start_time)
-        lap_time_str = self.format_time(now)
-
-        store_lap_data(
-            lap_type="TMA",
-            lap_number=self.total_tma,
-            rider_name=rider,
-            lap_time=lap_time_str,
-            time_diff="N/A",
-            cumulative_time=int(now - self.start_time),
-            lap_duration=int(lap_duration)
-        )
-        self.tma_laps.append((self.total_tma, rider, lap_time_str, "N/A", format_lap_duration(lap_duration)))
-        self.last_tma_time = now
+    def record_tma(self):
+        self.record_lap(TMA)
 
-        self.app.label_tma_total.config(text=f"Total TMA: {self.total_tma}")
-        self.update_lap_history()
+    def record_peloton(self):
+        self.record_lap(PELOTON)
 
+    def record_rouleur_1(self):
+        if self.record_lap(BIKE1):
+            # Mettre à jour l'affichage de la file d'attente des rouleurs
+            self.update_queue_display()
 
-    # ============== Record Vélo 1 ==============
+    # ============== File des rouleurs ==============
     def update_queue_display(self):
-      for item in self.app.queue_tree.get_children():
-          self.app.queue_tree.delete(item)
-      for rider in self.next_rouleurs_queue:
-          self.app.queue_tree.insert("", "end", values=(rider,))
-
+        for item in self.app.queue_tree.get_children():
+            self.app.queue_tree.delete(item)
+        for rider in self.engine.next_rouleurs_queue:
+            self.app.queue_tree.insert("", "end", values=(rider,))
 
     def update_current_rouleur_display(self):
-      # Mettre à jour l'étiquette du rouleur actuel dans l'interface
-      self.app.current_rider_label.config(text=f"Rouleur actuel : {self.current_rouleur}")
+        # Mettre à jour l'étiquette du rouleur actuel dans l'interface
+        self.render.set_text(self.app.current_rider_label, f"Rouleur actuel : {self.engine.current_rouleur}")
 
     def next_rouleur(self):
-        if self.next_rouleurs_queue:
-            self.current_rouleur = self.next_rouleurs_queue.pop(0)  # Passe au premier rouleur de la queue
-            self.update_queue_display()  # Mettre à jour le tableau après changement
-            self.update_current_rouleur_display()  # Mettre à jour l'affichage du rouleur actuel
-        else:
+        self.load()
+        if not self.engine.next_rouleur():
             messagebox.showwarning("File vide", "La file d'attente est vide.")
 
     def add_to_queue(self):
+        self.load()
         rider = self.app.rider_selector.get()  # Obtenir le nom du rouleur sélectionné
-        self.next_rouleurs_queue.append(rider)  # Ajouter à la queue si non déjà présent
-        self.update_queue_display()  # Mettre à jour l'affichage de la file d'attente
+        self.engine.add_to_queue(rider)
 
     def remove_from_queue(self):
+        self.load()
         selected = self.app.queue_tree.selection()
         if not selected:
             messagebox.showinfo("Info", "Veuillez sélectionner un rouleur à retirer dans la liste.")
             return
+        self.engine.remove_from_queue(self.app.queue_tree.index(selected[0]))
 
-        index = self.app.queue_tree.index(selected[0])  # <- On récupère l'index directement
-        if 0 <= index < len(self.next_rouleurs_queue):
-            del self.next_rouleurs_queue[index]  # <- Suppression par index
-            self.update_queue_display()
-
-    def move_rider_up(self):
+    def move_rider(self, offset):
+        self.load()
         selected = self.app.queue_tree.selection()
         if selected:
             index = self.app.queue_tree.index(selected[0])
-            if index > 0:
-                # Échange dans la liste
-                self.next_rouleurs_queue[index], self.next_rouleurs_queue[index - 1] = self.next_rouleurs_queue[index - 1], self.next_rouleurs_queue[index]
-                self.update_queue_display()
+            if self.engine.move_rider(index, offset):
                 # Re-sélectionner l'élément déplacé
-                new_item = self.app.queue_tree.get_children()[index - 1]
+                new_item = self.app.queue_tree.get_children()[index + offset]
                 self.app.queue_tree.selection_set(new_item)
 
+    def move_rider_up(self):
+        self.move_rider(-1)
+
     def move_rider_down(self):
-        selected = self.app.queue_tree.selection()
-        if selected:
-            index = self.app.queue_tree.index(selected[0])
-            if index < len(self.next_rouleurs_queue) - 1:
-                # Échange dans la liste
-                self.next_rouleurs_queue[index], self.next_rouleurs_queue[index + 1] = self.next_rouleurs_queue[index + 1], self.next_rouleurs_queue[index]
-                self.update_queue_display()
-                # Re-sélectionner l'élément déplacé
-                new_item = self.app.queue_tree.get_children()[index + 1]
-                self.app.queue_tree.selection_set(new_item)
+        self.move_rider(+1)
 
     def reset_queue(self):
-        self.next_rouleurs_queue = []
-        self.app.queue_tree.delete(*self.app.queue_tree.get_children())
+        self.load()
+        self.engine.reset_queue()
 
     def confirm_reset_queue(self):
         confirm = messagebox.askyesno("Confirmation", "Es-tu sûr de vouloir réinitialiser toute la file d'attente ?")
         if confirm:
-          self.reset_queue()
-
-    def record_rouleur_1(self):
-        if not self.start_time:
-            messagebox.showwarning("Attention", "Démarrez d'abord le chronomètre.")
-            return
-        now = time.time()
-
-        # Vérification du temps entre deux tours
-        if self.last_rouleur_1_time and (now - self.last_rouleur_1_time < self.MIN_LAP_TIME):
-            messagebox.showwarning("Attention", f"Il faut au moins {self.MIN_LAP_TIME}s entre deux tours Vélo 1.")
-            return
-
-        rider = self.current_rouleur or "Vélo1"  # Si la queue est vide, utiliser l'ancien ou "Vélo1"
-
-        self.total_rouleur_1 += 1
-
-        # Calcul du temps du tour
-        lap_duration = (now - self.last_rouleur_1_time) if self.last_rouleur_1_time else (now - self.start_time)
-        lap_time_str = self.format_time(now)
-
-        # Enregistrer le tour dans la base de données
-        store_lap_data(
-            lap_type="Vélo 1",
-            lap_number=self.total_rouleur_1,
-            rider_name=rider,
-            lap_time=lap_time_str,
-            time_diff="N/A",
-            cumulative_time=int(now - self.start_time),
-            lap_duration=int(lap_duration)
-        )
-
-        # Ajouter le tour à la liste des tours de Vélo 1
-        self.rouleur_1_laps.append((self.total_rouleur_1, rider, lap_time_str, "N/A", format_lap_duration(lap_duration)))
-        self.last_rouleur_1_time = now
-
-        # Mise à jour de l'affichage du total des tours de Vélo 1
-        self.app.label_rouleur_1_total.config(text=f"Total Rosaire (Bike 1): {self.total_rouleur_1}")
-
-        # Mettre à jour l'historique des tours
-        self.update_lap_history()
-
-        # Mettre à jour l'affichage de la file d'attente des rouleurs
-        self.update_queue_display()  # Assurez-vous que cette méthode est définie dans core.py
-
-
-
-    # ============== Record Peloton ==============
-    def record_peloton(self):
-        if not self.start_time:
-            messagebox.showwarning("Attention", "Démarrez d'abord le chronomètre.")
-            return
-        now = time.time()
-        if self.last_peloton_time and (now - self.last_peloton_time < self.MIN_LAP_TIME):
-            messagebox.showwarning("Attention", f"Il faut au moins {self.MIN_LAP_TIME}s entre deux tours du Peloton.")
-            return
-
-        self.total_peloton += 1
-        lap_duration = (now - self.last_peloton_time) if self.last_peloton_time else (now - self.start_time)
-        lap_time_str = self.format_time(now)
-
-        store_lap_data(
-            lap_type="Peloton",
-            lap_number=self.total_peloton,
-            rider_name="N/A",
-            lap_time=lap_time_str,
-            time_diff="N/A",
-            cumulative_time=int(now - self.start_time),
-            lap_duration=int(lap_duration)
-        )
-        self.peloton_laps.append((self.total_peloton, "Peloton", lap_time_str, "N/A", format_lap_duration(lap_duration)))
-        self.last_peloton_time = now
-
-        self.app.label_peloton_total.config(text=f"Total Peloton: {self.total_peloton}")
-        self.update_lap_history()
+            self.reset_queue()
 
     # ============== Undo / Reset ==============
     def undo_last_lap(self):
-        times = [
-            ("Vélo 1", self.last_rouleur_1_time),
-            ("Peloton", self.last_peloton_time),
-            ("TMA", self.last_tma_time)
-        ]
-        times = [(typ, t) for (typ, t) in times if t is not None]
-        if not times:
-            messagebox.showinfo("Info", "Aucun tour enregistré à annuler.")
-            return
+        self.load()
+        try:
+            self.engine.undo_last_lap()
+        except NothingToUndo as e:
+            messagebox.showinfo("Info", str(e))
 
-        last_type, _ = max(times, key=lambda x: x[1])
-        if last_type == "Vélo 1":
-            if self.total_rouleur_1 > 0:
-                remove_last_db_entry("Vélo 1")
-                self.total_rouleur_1 -= 1
-                if self.rouleur_1_laps:
-                    self.rouleur_1_laps.pop()
-                self.last_rouleur_1_time = None
-                if self.rouleur_1_laps:
-                    self.last_rouleur_1_time = self.find_last_timestamp_from_db("Vélo 1")
-                self.app.label_rouleur_1_total.config(text=f"Total Rosaire (Bike 1): {self.total_rouleur_1}")
-        elif last_type == "Peloton":
-            if self.total_peloton > 0:
-                remove_last_db_entry("Peloton")
-                self.total_peloton -= 1
-                if self.peloton_laps:
-                    self.peloton_laps.pop()
-                self.last_peloton_time = None
-                if self.peloton_laps:
-                    self.last_peloton_time = self.find_last_timestamp_from_db("Peloton")
-                self.app.label_peloton_total.config(text=f"Total Peloton: {self.total_peloton}")
-        else:
-            if self.total_tma > 0:
-                remove_last_db_entry("TMA")
-                self.total_tma -= 1
-                if self.tma_laps:
-                    self.tma_laps.pop()
-                self.last_tma_time = None
-                if self.tma_laps:
-                    self.last_tma_time = self.find_last_timestamp_from_db("TMA")
-                self.app.label_tma_total.config(text=f"Total TMA: {self.total_tma}")
-
-        self.update_lap_history()
+    def redo_last_lap(self):
+        self.load()
+        try:
+            self.engine.redo()
+        except NothingToRedo as e:
+            messagebox.showinfo("Info", str(e))
 
     def reset_laps(self):
+        self.load()
         confirm = messagebox.askyesno("Réinitialiser", "Voulez-vous vraiment tout réinitialiser ?")
         if not confirm:
             return
-        self.rouleur_1_laps.clear()
-        self.peloton_laps.clear()
-        self.tma_laps.clear()
-
-        self.total_rouleur_1 = 0
-        self.total_peloton = 0
-        self.total_tma = 0
-
-        self.last_rouleur_1_time = None
-        self.last_peloton_time = None
-        self.last_tma_time = None
-
-        self.app.label_rouleur_1_total.config(text="Total Rosaire (Bike 1): 0")
-        self.app.label_peloton_total.config(text="Total Peloton: 0")
-        self.app.label_tma_total.config(text="Total TMA: 0")
-
-        for item in self.app.bike1_tree.get_children():
-            self.app.bike1_tree.delete(item)
-        for item in self.app.peloton_tree.get_children():
-            self.app.peloton_tree.delete(item)
-        for item in self.app.tma_tree.get_children():
-            self.app.tma_tree.delete(item)
-
-        clear_all_laps_db()
-
-    def find_last_timestamp_from_db(self, lap_type):
-        with sqlite3.connect("data/laps_data.db") as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT cumulative_time FROM laps
-                WHERE type = ?
-                ORDER BY id DESC
-                LIMIT 1
-            """, (lap_type,))
-            row = cursor.fetchone()
-            if row:
-                ctime = float(row[0])
-                return (self.start_time or 0) + ctime
-        return None
+        self.engine.reset()
 
     # ============== Dummy Lap ==============
     def add_dummy_lap(self):
+        self.load()
         lap_type = simpledialog.askstring("Ajouter Tour Manuellement", "Ajouter pour quel type? (Vélo 1 / Peloton / TMA)")
-        if lap_type not in ("Vélo 1", "Peloton", "TMA"):
+        if lap_type not in (BIKE1, PELOTON, TMA):
             messagebox.showerror("Erreur", "Type invalide. Entrez 'Vélo 1', 'Peloton' ou 'TMA'.")
             return
 
@@ -362,225 +310,78 @@ class CyclingCore:
         if dummy_duration is None:
             return
 
-        now = time.time()
-        if lap_type == "Vélo 1":
-            self.total_rouleur_1 += 1
-            rider = self.app.rider_selector.get() or "Vélo1"
-            lap_number = self.total_rouleur_1
-            self.last_rouleur_1_time = now
-            self.app.label_rouleur_1_total.config(text=f"Total Rosaire (Bike 1): {self.total_rouleur_1}")
-            self.rouleur_1_laps.append((lap_number, rider, self.format_time(now), "N/A", format_lap_duration(dummy_duration)))
-        elif lap_type == "Peloton":
-            self.total_peloton += 1
-            rider = "N/A"
-            lap_number = self.total_peloton
-            self.last_peloton_time = now
-            self.app.label_peloton_total.config(text=f"Total Peloton: {self.total_peloton}")
-            self.peloton_laps.append((lap_number, rider, self.format_time(now), "N/A", format_lap_duration(dummy_duration)))
-        else:
-            self.total_tma += 1
-            rider = "TMA"
-            lap_number = self.total_tma
-            self.last_tma_time = now
-            self.app.label_tma_total.config(text=f"Total TMA: {self.total_tma}")
-            self.tma_laps.append((lap_number, rider, self.format_time(now), "N/A", format_lap_duration(dummy_duration)))
-
-        store_lap_data(
-            lap_type=lap_type,
-            lap_number=lap_number,
-            rider_name=rider,
-            lap_time=self.format_time(now),
-            time_diff="N/A",
-            cumulative_time=int((self.start_time and now - self.start_time) or 0),
-            lap_duration=dummy_duration
-        )
-        self.update_lap_history()
+        rider = self.app.rider_selector.get() if lap_type == BIKE1 else None
+        self.engine.add_manual_lap(lap_type, dummy_duration, rider)
 
     # ============== Update Lap History ==============
-    def update_lap_history(self):
+    def update_lap_history(self, groups=(BIKE1, PELOTON, TMA)):
         """
-        Met à jour les TreeViews, gap.
+        Met à jour les TreeViews des groupes concernés (par différence), gap.
         Le “current” est mis à jour dans update_timer() (en direct).
         """
-        # Bike1
-        for item in self.app.bike1_tree.get_children():
-            self.app.bike1_tree.delete(item)
-        for lap in self.rouleur_1_laps[-10:]:
-            self.app.bike1_tree.insert("", "end", values=(lap[0], lap[1], lap[2], lap[3], lap[4]))
-
-        # Peloton
-        for item in self.app.peloton_tree.get_children():
-            self.app.peloton_tree.delete(item)
-        for lap in self.peloton_laps[-10:]:
-            self.app.peloton_tree.insert("", "end", values=(lap[0], lap[1], lap[2], lap[3], lap[4]))
-
-        # TMA
-        for item in self.app.tma_tree.get_children():
-            self.app.tma_tree.delete(item)
-        for lap in self.tma_laps[-10:]:
-            self.app.tma_tree.insert("", "end", values=(lap[0], lap[1], lap[2], lap[3], lap[4]))
+        for group in groups:
+            self.lap_view(group).sync()
 
         self.update_gap_display()
 
+    def lap_view(self, group):
+        view = self.lap_views.get(group)
+        if view is None:
+            tree = {BIKE1: self.app.bike1_tree, PELOTON: self.app.peloton_tree, TMA: self.app.tma_tree}[group]
+            view = self.lap_views[group] = LapTableView(tree, self.engine.groups[group].laps)
+        return view
+
     def update_gap_display(self):
-        """
-        Gap principal entre Bike1 et Peloton en tours.
-        Si ex aequo => compare le timestamp => +/- Xs
-        """
-        lap_diff = self.total_rouleur_1 - self.total_peloton
-        if lap_diff > 0:
-            self.app.label_gap.config(text=f"Current gap: Bike 1 is {lap_diff} lap(s) ahead.")
-        elif lap_diff < 0:
-            self.app.label_gap.config(text=f"Current gap: Peloton is {abs(lap_diff)} lap(s) ahead.")
-        else:
-            if self.last_rouleur_1_time and self.last_peloton_time:
-                gap_sec = int(self.last_peloton_time - self.last_rouleur_1_time)
-                if gap_sec > 0:
-                    self.app.label_gap.config(text=f"Current gap: Same lap. Peloton leads by {gap_sec}s.")
-                elif gap_sec < 0:
-                    self.app.label_gap.config(text=f"Current gap: Same lap. Bike 1 leads by {abs(gap_sec)}s.")
-                else:
-                    self.app.label_gap.config(text="Current gap: Exactly simultaneous!")
-            else:
-                self.app.label_gap.config(text="Current gap: N/A")
+        self.render.set_text(self.app.label_gap, self.engine.gap_text())
 
     # ============== Update Table Headers ==============
-    def update_table_headers(self):
-        """Chaque seconde => calcule “current” + écarts."""
-        # Bike1
-        curr_b1 = self.compute_current_lap_time("Vélo 1")
-        curr_b1_str = self.format_secs_as_HHMMSS(curr_b1) if curr_b1 is not None else "N/A"
-        self.app.header_bike1_current.config(text=f"Vélo 1 Current: {curr_b1_str}")
-
-        avg_b1 = self.compute_avg_of_last_5(self.rouleur_1_laps)
-        if avg_b1:
-            self.app.header_bike1_avg5.config(text=f"Moyenne (5 derniers): {format_lap_duration(avg_b1)}")
-        else:
-            self.app.header_bike1_avg5.config(text="Moyenne (5 derniers): N/A")
-
-        diff_b1_pel = self.compute_diff_current("Vélo 1", "Peloton")
-        diff_b1_tma = self.compute_diff_current("Vélo 1", "TMA")
-        self.app.header_bike1_diff1.config(text=f"Écart vs Peloton: {diff_b1_pel}")
-        self.app.header_bike1_diff2.config(text=f"Écart vs TMA: {diff_b1_tma}")
-
-        # Peloton
-        curr_pel = self.compute_current_lap_time("Peloton")
-        curr_pel_str = self.format_secs_as_HHMMSS(curr_pel) if curr_pel is not None else "N/A"
-        self.app.header_peloton_current.config(text=f"Peloton Current: {curr_pel_str}")
-
-        avg_pel = self.compute_avg_of_last_5(self.peloton_laps)
-        if avg_pel:
-            self.app.header_peloton_avg5.config(text=f"Moyenne (5 derniers): {format_lap_duration(avg_pel)}")
-        else:
-            self.app.header_peloton_avg5.config(text="Moyenne (5 derniers): N/A")
-
-        diff_pel_b1 = self.compute_diff_current("Peloton", "Vélo 1")
-        diff_pel_tma = self.compute_diff_current("Peloton", "TMA")
-        self.app.header_peloton_diff1.config(text=f"Écart vs Vélo 1: {diff_pel_b1}")
-        self.app.header_peloton_diff2.config(text=f"Écart vs TMA: {diff_pel_tma}")
-
-        # TMA
-        curr_tma = self.compute_current_lap_time("TMA")
-        curr_tma_str = self.format_secs_as_HHMMSS(curr_tma) if curr_tma is not None else "N/A"
-        self.app.header_tma_current.config(text=f"TMA Current: {curr_tma_str}")
+    def header_labels(self):
+        """(groupe, titre, current, moyenne, écart 1, écart 2, groupes comparés)"""
+        app = self.app
+        return (
+            (BIKE1, "Vélo 1", app.header_bike1_current, app.header_bike1_avg5,
+             app.header_bike1_diff1, app.header_bike1_diff2, (PELOTON, TMA)),
+            (PELOTON, "Peloton", app.header_peloton_current, app.header_peloton_avg5,
+             app.header_peloton_diff1, app.header_peloton_diff2, (BIKE1, TMA)),
+            (TMA, "TMA", app.header_tma_current, app.header_tma_avg5,
+             app.header_tma_diff1, app.header_tma_diff2, (BIKE1, PELOTON)),
+        )
 
-        avg_tma = self.compute_avg_of_last_5(self.tma_laps)
-        if avg_tma:
-            self.app.header_tma_avg5.config(text=f"Moyenne (5 derniers): {format_lap_duration(avg_tma)}")
-        else:
-            self.app.header_tma_avg5.config(text="Moyenne (5 derniers): N/A")
+    def update_table_headers(self):
+        self.update_current_headers()
+        self.update_pace_headers()
 
-        diff_tma_b1 = self.compute_diff_current("TMA", "Vélo 1")
-        diff_tma_pel = self.compute_diff_current("TMA", "Peloton")
-        self.app.header_tma_diff1.config(text=f"Écart vs Vélo 1: {diff_tma_b1}")
-        self.app.header_tma_diff2.config(text=f"Écart vs Peloton: {diff_tma_pel}")
+    def update_current_headers(self):
+        """Chaque seconde => temps “current” de chaque groupe."""
+        for group, title, lbl_current, _, _, _, _ in self.header_labels():
+            curr = self.engine.compute_current_lap_time(group)
+            curr_str = format_secs_as_hhmmss(curr) if curr is not None else "N/A"
+            self.render.set_text(lbl_current, f"{title} Current: {curr_str}")
 
-    # -------------- Logique “Current” & écarts --------------
-    def compute_current_lap_time(self, group_type):
+    def update_pace_headers(self):
         """
-        Rend le temps (s) écoulé depuis le dernier “record” (ou start_time).
+        Moyennes (5 derniers, 30 dernières min) et écarts : ne dépendent que des derniers passages
+        (tB - tA = dernier passage A - dernier passage B), donc recalculés aux tours seulement.
         """
-        now = time.time()
-        if not self.start_time:
-            return None
-
-        if group_type == "Vélo 1":
-            ref = self.last_rouleur_1_time or self.start_time
-        elif group_type == "Peloton":
-            ref = self.last_peloton_time or self.start_time
-        else:
-            ref = self.last_tma_time or self.start_time
+        engine = self.engine
+        for group, _, _, lbl_avg5, lbl_diff1, lbl_diff2, others in self.header_labels():
+            avg = engine.compute_avg_of_last_5(group)
+            recent = engine.compute_recent_pace(group)
+            avg_str = format_lap_duration(avg) if avg else "N/A"
+            recent_str = format_lap_duration(recent) if recent else "N/A"
+            self.render.set_text(lbl_avg5, f"Moyenne (5 derniers): {avg_str}  |  30 min: {recent_str}")
 
-        return now - ref
-
-    def compute_diff_current(self, groupA, groupB):
-        """
-        diff = tB - tA
-         * si diff < 0 => A est en avance de abs(diff)
-         * si diff > 0 => A est en retard de diff
-        """
-        tA = self.compute_current_lap_time(groupA)
-        tB = self.compute_current_lap_time(groupB)
-        if tA is None or tB is None:
-            return "N/A"
-        diff = int(tB - tA)
-        if diff == 0:
-            return "+0s"
-        elif diff > 0:
-            return f"+{diff}s"  # A est plus lent
-        else:
-            return f"-{abs(diff)}s"  # A est plus rapide
-
-    def compute_avg_of_last_5(self, laps_list):
-        if not laps_list:
-            return None
-        last_5 = laps_list[-5:]
-        total_sec = 0
-        count = 0
-        for lap in last_5:
-            dur_str = lap[4]  # ex. “0:01:20”
-            val_sec = self.parse_hms_to_sec(dur_str)
-            if val_sec is not None:
-                total_sec += val_sec
-                count += 1
-        if count == 0:
-            return None
-        return total_sec / count
-
-    def parse_hms_to_sec(self, timestr):
-        if timestr in ("N/A", None):
-            return None
-        parts = timestr.split(":")
-        try:
-            if len(parts) == 3:
-                h, m, s = int(parts[0]), int(parts[1]), int(parts[2])
-                return h*3600 + m*60 + s
-            elif len(parts) == 2:
-                m, s = int(parts[0]), int(parts[1])
-                return m*60 + s
-        except:
-            return None
-        return None
-
-    def format_secs_as_HHMMSS(self, secs):
-        if secs < 0:
-            secs = 0
-        td = int(secs)
-        return str(timedelta(seconds=td))
-
-    def format_time(self, t):
-        """Convertit un timestamp absolu “t” en “HH:MM:SS” depuis self.start_time."""
-        if self.start_time:
-            return str(timedelta(seconds=int(t - self.start_time)))
-        return "N/A"
+            self.render.set_text(lbl_diff1, f"Écart vs {others[0]}: {engine.compute_diff_current(group, others[0])}")
+            self.render.set_text(lbl_diff2, f"Écart vs {others[1]}: {engine.compute_diff_current(group, others[1])}")
 
     # -------------- Stats / Export / Gérer Tours --------------
     def show_stats_window(self):
+        self.load()
         stats_win = Toplevel(self.app.root)
         stats_win.title("Statistiques Avancées")
 
         (avg_bike1, min_bike1, count_bike1,
-         avg_peloton, min_peloton, count_peloton) = fetch_stats_for_all()
+         avg_peloton, min_peloton, count_peloton) = self.engine.stats.stats_for_all()
 
         overall_text = (
             f"Overall Stats:\n\n"
@@ -607,7 +408,7 @@ class CyclingCore:
         tree.column("fastest", width=100, anchor="center")
         tree.pack(padx=5, pady=5)
 
-        rows = fetch_stats_per_rider()
+        rows = self.engine.stats.stats_per_rider()
         for r in rows:
             rider_name, lap_count, avg_dur, min_dur = r
             tree.insert("", "end", values=(
@@ -618,69 +419,105 @@ class CyclingCore:
             ))
 
     def export_csv(self):
+        self.load()
         filename = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+            filetypes=[
+                ("CSV files", "*.csv"),
+                ("JSON Lines", "*.jsonl"),
+                ("Compressés (gzip)", "*.csv.gz *.jsonl.gz"),
+                ("All files", "*.*"),
+            ]
         )
         if not filename:
             return
-        with sqlite3.connect('data/laps_data.db') as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM laps ORDER BY id ASC")
-            rows = cursor.fetchall()
 
-        columns = ["id", "type", "lap_number", "rider_name", "lap_time", "time_diff", "cumulative_time", "lap_duration"]
+        from .export import ExportJob
+
+        # Export en flux sur un thread : la fenêtre principale reste réactive,
+        # la progression est relevée par la boucle Tk.
+        job = ExportJob(filename).start()
+
+        win = Toplevel(self.app.root)
+        win.title("Export")
+        label = ttk.Label(win, text=f"Export vers {filename}…")
+        label.pack(padx=10, pady=5)
+        bar = ttk.Progressbar(win, length=300, maximum=1.0)
+        bar.pack(padx=10, pady=5)
+        ttk.Button(win, text="Annuler", command=job.cancel).pack(pady=5)
+        win.protocol("WM_DELETE_WINDOW", job.cancel)
+
+        def poll():
+            bar["value"] = job.fraction
+            label.config(text=f"Export vers {filename}… {job.done}/{job.total} tours")
+            if not job.finished:
+                self.app.root.after(100, poll)
+                return
+            win.destroy()
+            if job.error is not None:
+                messagebox.showerror("Export CSV", f"Erreur lors de l'export: {job.error}")
+            elif job.cancelled:
+                messagebox.showinfo("Export CSV", "Export annulé.")
+            else:
+                messagebox.showinfo("Export CSV", f"Export réussi: {filename}")
+
+        poll()
+
+    def import_laps(self):
+        self.load()
+        filename = filedialog.askopenfilename(
+            filetypes=[
+                ("Exports", "*.csv *.jsonl *.csv.gz *.jsonl.gz"),
+                ("All files", "*.*"),
+            ]
+        )
+        if not filename:
+            return
+        from .importer import parse_file
+
         try:
-            with open(filename, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(columns)
-                for row in rows:
-                    writer.writerow(row)
-            messagebox.showinfo("Export CSV", f"Export réussi: {filename}")
+            rows, report = parse_file(filename)
+            report.inserted = self.engine.import_laps(rows)
         except Exception as e:
-            messagebox.showerror("Export CSV", f"Erreur lors de l'export: {e}")
+            messagebox.showerror("Import", f"Erreur lors de l'import: {e}")
+            return
+        messagebox.showinfo("Import", report.summary())
 
     def open_lap_management_window(self):
+        self.load()
         mgmt_win = Toplevel(self.app.root)
         mgmt_win.title("Gestion des Tours")
 
-        tree = ttk.Treeview(
-            mgmt_win,
-            columns=("id", "type", "lap_number", "rider_name", "lap_time", "time_diff", "cumulative_time", "lap_duration"),
-            show="headings", height=20
-        )
-        for col in ("id", "type", "lap_number", "rider_name", "lap_time", "time_diff", "cumulative_time", "lap_duration"):
+        tree = ttk.Treeview(mgmt_win, columns=LAP_COLUMNS, show="headings", height=20)
+        for col in LAP_COLUMNS:
             tree.heading(col, text=col)
             tree.column(col, anchor="center", width=100)
         tree.pack(side="left", fill="both", expand=True)
 
-        scrollbar = ttk.Scrollbar(mgmt_win, orient="vertical", command=tree.yview)
+        # Fenêtre virtualisée : seules 20 lignes existent dans le Treeview, la barre
+        # de défilement pilote la pagination (voir LapGrid).
+        scrollbar = ttk.Scrollbar(mgmt_win, orient="vertical")
         scrollbar.pack(side="right", fill="y")
-        tree.configure(yscrollcommand=scrollbar.set)
+        grid = LapGrid(tree, scrollbar, page_size=20, format_row=format_management_row)
 
         btn_frame = ttk.Frame(mgmt_win)
         btn_frame.pack(pady=5)
 
-        edit_btn = ttk.Button(btn_frame, text="Modifier", command=lambda: self.edit_lap_record(tree))
+        edit_btn = ttk.Button(btn_frame, text="Modifier", command=lambda: self.edit_lap_record(grid))
         edit_btn.pack(side="left", padx=5)
-        delete_btn = ttk.Button(btn_frame, text="Supprimer", command=lambda: self.delete_lap_record(tree))
+        delete_btn = ttk.Button(btn_frame, text="Supprimer", command=lambda: self.delete_lap_record(grid))
         delete_btn.pack(side="left", padx=5)
-        refresh_btn = ttk.Button(btn_frame, text="Rafraîchir", command=lambda: self.refresh_management_view(tree))
+        refresh_btn = ttk.Button(btn_frame, text="Rafraîchir", command=lambda: self.refresh_management_view(grid))
         refresh_btn.pack(side="left", padx=5)
 
-        self.refresh_management_view(tree)
+        grid.load()
 
-    def refresh_management_view(self, tree):
-        for row in tree.get_children():
-            tree.delete(row)
-        with sqlite3.connect('data/laps_data.db') as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM laps ORDER BY lap_number ASC, id ASC")
-            rows = cursor.fetchall()
-        for r in rows:
-            tree.insert("", "end", values=r)
+    def refresh_management_view(self, grid):
+        grid.refresh()
 
-    def edit_lap_record(self, tree):
+    def edit_lap_record(self, grid):
+        self.load()
+        tree = grid.tree
         selection = tree.selection()
         if not selection:
             messagebox.showwarning("Attention", "Veuillez sélectionner un tour à modifier.")
@@ -697,16 +534,14 @@ class CyclingCore:
         if new_rider is None:
             return
 
-        with sqlite3.connect('data/laps_data.db') as conn:
-            cursor = conn.cursor()
-            cursor.execute("UPDATE laps SET lap_number = ?, rider_name = ? WHERE id = ?", (new_lap_number, new_rider, lap_id))
-            conn.commit()
+        self.engine.edit_lap(lap_id, new_lap_number, new_rider)
 
         messagebox.showinfo("Info", "Tour modifié avec succès.")
-        self.refresh_management_view(tree)
-        self.reload_laps_from_db()
+        self.refresh_management_view(grid)
 
-    def delete_lap_record(self, tree):
+    def delete_lap_record(self, grid):
+        self.load()
+        tree = grid.tree
         selection = tree.selection()
         if not selection:
             messagebox.showwarning("Attention", "Veuillez sélectionner un tour à supprimer.")
@@ -716,38 +551,10 @@ class CyclingCore:
         confirm = messagebox.askyesno("Confirmer", f"Supprimer le tour ID {lap_id} ?")
         if not confirm:
             return
-        with sqlite3.connect('data/laps_data.db') as conn:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM laps WHERE id = ?", (lap_id,))
-            conn.commit()
+        self.engine.delete_lap(lap_id)
         messagebox.showinfo("Info", "Tour supprimé.")
-        self.refresh_management_view(tree)
-        self.reload_laps_from_db()
+        self.refresh_management_view(grid)
 
     def reload_laps_from_db(self):
-        self.rouleur_1_laps.clear()
-        self.peloton_laps.clear()
-        self.tma_laps.clear()
-
-        self.total_rouleur_1 = 0
-        self.total_peloton = 0
-        self.total_tma = 0
-
-        rows = reload_from_db()
-        for (lap_number, rider_name, lap_time, time_diff, lap_dur, lap_type) in rows:
-            lap_number = int(lap_number)
-            if lap_type == "Vélo 1":
-                self.rouleur_1_laps.append((lap_number, rider_name, lap_time, time_diff, format_lap_duration(float(lap_dur))))
-                self.total_rouleur_1 = max(self.total_rouleur_1, lap_number)
-            elif lap_type == "Peloton":
-                self.peloton_laps.append((lap_number, rider_name, lap_time, time_diff, format_lap_duration(float(lap_dur))))
-                self.total_peloton = max(self.total_peloton, lap_number)
-            else:
-                self.tma_laps.append((lap_number, rider_name, lap_time, time_diff, format_lap_duration(float(lap_dur))))
-                self.total_tma = max(self.total_tma, lap_number)
-
-        self.app.label_rouleur_1_total.config(text=f"Total Rosaire (Bike 1): {self.total_rouleur_1}")
-        self.app.label_peloton_total.config(text=f"Total Peloton: {self.total_peloton}")
-        self.app.label_tma_total.config(text=f"Total TMA: {self.total_tma}")
-
-        self.update_lap_history()
+        self.load()
+        self.engine.reload_from_db()
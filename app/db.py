@@ -1,93 +1,427 @@
 import sqlite3
+from contextlib import contextmanager
+
+from .utils import parse_secs
+
+DB_PATH = "data/laps_data.db"
+
+
+class Database:
+    """
+    Connexion SQLite unique et longue durée.
+    Ouverte une seule fois (journal WAL, synchronous/cache_size réglés) :
+    un tour enregistré = un INSERT, sans connect/parse/commit/close.
+    Les requêtes préparées sont gardées en cache par sqlite3 (cached_statements).
+    """
+
+    def __init__(self, path=DB_PATH, synchronous="NORMAL", cache_size=-8000, cached_statements=128):
+        self.path = path
+        # isolation_level=None => autocommit : chaque INSERT isolé est sa propre transaction,
+        # les opérations multi-requêtes passent par transaction().
+        self.conn = sqlite3.connect(path, isolation_level=None, cached_statements=cached_statements)
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA synchronous={synchronous}")
+        self.conn.execute(f"PRAGMA cache_size={int(cache_size)}")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+
+    def execute(self, sql, params=()):
+        return self.conn.execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.conn.executemany(sql, seq_of_params)
+
+    def fetchone(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchone()
+
+    def fetchall(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self):
+        """BEGIN ... COMMIT (ROLLBACK en cas d'exception). Réentrant."""
+        if self.conn.in_transaction:
+            yield self.conn
+            return
+        self.conn.execute("BEGIN")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        else:
+            self.conn.execute("COMMIT")
+
+    def close(self):
+        try:
+            self.conn.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass
+        self.conn.close()
+
+
+_db = None
+_writer = None
+
+
+def configure_db(path=DB_PATH, **pragmas):
+    """Remplace la connexion par défaut (autre fichier, ':memory:', autres pragmas)."""
+    global _db
+    stop_writer()
+    if _db is not None:
+        _db.close()
+    _db = Database(path, **pragmas)
+    return _db
+
+
+def get_db():
+    global _db
+    if _db is None:
+        _db = Database()
+    return _db
+
+
+def start_writer(**options):
+    """
+    Active l'écriture différée (WriteBehindQueue) : les écritures des fonctions
+    ci-dessous partent sur un thread dédié, les lectures attendent d'abord que
+    la file soit vidée. Sans effet sur une base ':memory:' (non partageable).
+    """
+    global _writer
+    db = get_db()
+    if _writer is None and db.path != ":memory:":
+        from .writer import WriteBehindQueue
+        _writer = WriteBehindQueue(db.path, **options)
+    return _writer
+
+
+def stop_writer(timeout=None):
+    """Vide la file d'écriture puis arrête le thread (à appeler à la fermeture)."""
+    global _writer
+    if _writer is not None:
+        _writer.close(timeout)
+        _writer = None
+
+
+def get_writer():
+    return _writer
+
+
+def flush_writes(timeout=None):
+    return _writer.flush(timeout) if _writer is not None else True
+
+
+def _write(sql, params=()):
+    if _writer is not None:
+        _writer.submit(sql, params)
+    else:
+        get_db().execute(sql, params)
+
+
+def _write_many(sql, seq_of_params):
+    if _writer is not None:
+        _writer.submit_many(sql, seq_of_params)
+    else:
+        db = get_db()
+        with db.transaction():
+            db.executemany(sql, seq_of_params)
+
+
+def _reader():
+    # Lecture cohérente : tout ce qui a été soumis au writer doit être en base
+    if _writer is not None:
+        _writer.flush()
+    return get_db()
+
+
+SCHEMA_VERSION = 4
+LAP_TYPES = ("Vélo 1", "Peloton", "TMA")
+
+# v2 : durées et temps en secondes (REAL), index pour les stats et le rechargement.
+# lap_time / cumulative_time = secondes écoulées depuis le départ.
+# lap_duration en fin d'index => AVG/MIN des stats lus directement dans l'index (covering).
+_SCHEMA_V2 = """
+    CREATE TABLE IF NOT EXISTS laps (
+        id INTEGER PRIMARY KEY,
+        type TEXT NOT NULL,
+        lap_number INTEGER NOT NULL,
+        rider_name TEXT,
+        lap_time REAL,
+        time_diff TEXT,
+        cumulative_time REAL,
+        lap_duration REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_laps_type_id ON laps(type, id);
+    CREATE INDEX IF NOT EXISTS idx_laps_type_lap_number ON laps(type, lap_number);
+    CREATE INDEX IF NOT EXISTS idx_laps_type_duration ON laps(type, lap_duration);
+    CREATE INDEX IF NOT EXISTS idx_laps_rider_type ON laps(rider_name, type, lap_duration);
+"""
+
+# v3 : pagination par clé (lap_number, id) de la fenêtre de gestion (id = rowid, implicite dans l'index)
+_SCHEMA_V3 = """
+    CREATE INDEX IF NOT EXISTS idx_laps_lap_number ON laps(lap_number);
+"""
+
+# v4 : course en cours (une seule ligne) pour la reprise après crash / fermeture
+_SCHEMA_V4 = """
+    CREATE TABLE IF NOT EXISTS race_session (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        start_wall REAL,
+        state TEXT NOT NULL DEFAULT '{}',
+        updated_wall REAL
+    );
+"""
+
+
+def _create_schema(db, script=_SCHEMA_V2 + _SCHEMA_V3 + _SCHEMA_V4):
+    # executescript() ferait un COMMIT implicite : on exécute requête par requête
+    # pour rester dans la transaction de init_db().
+    for statement in script.split(";"):
+        if statement.strip():
+            db.execute(statement)
+
+
+def _migrate_v1_to_v2(db):
+    """Ancien schéma (tout en TEXT, sans index) => v2, sur place."""
+    db.conn.create_function("to_seconds", 1, parse_secs, deterministic=True)
+    db.execute("ALTER TABLE laps RENAME TO laps_v1")
+    _create_schema(db, _SCHEMA_V2)
+    db.execute("""
+        INSERT INTO laps
+        (id, type, lap_number, rider_name, lap_time, time_diff, cumulative_time, lap_duration)
+        SELECT id, type, CAST(lap_number AS INTEGER), rider_name,
+               COALESCE(to_seconds(lap_time), to_seconds(cumulative_time)),
+               time_diff, to_seconds(cumulative_time), to_seconds(lap_duration)
+        FROM laps_v1
+    """)
+    db.execute("DROP TABLE laps_v1")
+
+
+def _migrate_v2_to_v3(db):
+    _create_schema(db, _SCHEMA_V3)
+
+
+def _migrate_v3_to_v4(db):
+    _create_schema(db, _SCHEMA_V4)
+
+
+_MIGRATIONS = {
+    1: _migrate_v1_to_v2,
+    2: _migrate_v2_to_v3,
+    3: _migrate_v3_to_v4,
+}
+
+
 def init_db():
-    with sqlite3.connect("data/laps_data.db") as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS laps (
-                id INTEGER PRIMARY KEY,
-                type TEXT,
-                lap_number INTEGER,
-                rider_name TEXT,
-                lap_time TEXT,
-                time_diff TEXT,
-                cumulative_time TEXT,
-                lap_duration TEXT
-            )
-        ''')
-        conn.commit()
-
-def store_lap_data(lap_type, lap_number, rider_name, lap_time, time_diff, cumulative_time, lap_duration):
-    with sqlite3.connect("data/laps_data.db") as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
+    """
+    Crée le schéma courant ou migre la base existante (PRAGMA user_version).
+    Une base sans user_version mais avec une table laps est considérée v1.
+    """
+    db = get_db()
+    version = db.fetchone("PRAGMA user_version")[0]
+    if version >= SCHEMA_VERSION:
+        return
+    with db.transaction():
+        has_laps = db.fetchone("SELECT 1 FROM sqlite_master WHERE type='table' AND name='laps'")
+        if not has_laps:
+            _create_schema(db)
+        else:
+            version = max(version, 1)
+            while version < SCHEMA_VERSION:
+                _MIGRATIONS[version](db)
+                version += 1
+            db.execute("ANALYZE")
+        db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+
+_INSERT_LAP_ROW = """
+    INSERT INTO laps
+    (id, type, lap_number, rider_name, lap_time, time_diff, cumulative_time, lap_duration)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def store_lap_data(lap_type, lap_number, rider_name, lap_time, time_diff, cumulative_time, lap_duration, lap_id=None):
+    """lap_id : id choisi par l'appelant (journal d'annulation), sinon attribué par SQLite."""
+    _write(_INSERT_LAP_ROW, (lap_id, lap_type, lap_number, rider_name, lap_time, time_diff, cumulative_time, lap_duration))
+
+def restore_laps(rows):
+    """Réinsère des lignes complètes (LAP_COLUMNS, id compris), en un lot."""
+    _write_many(_INSERT_LAP_ROW, rows)
+
+def fetch_max_lap_id():
+    return _reader().fetchone("SELECT MAX(id) FROM laps")[0] or 0
+
+def insert_laps(rows):
+    """
+    Import en masse : rows = (type, lap_number, rider_name, lap_time, time_diff,
+    cumulative_time, lap_duration). Un seul executemany dans une seule transaction ;
+    un tour dont le couple (type, lap_number) existe déjà (en base ou plus haut dans
+    rows) est ignoré (index idx_laps_type_lap_number). Rend le nombre de tours insérés.
+    """
+    db = _reader()
+    before = db.conn.total_changes
+    with db.transaction():
+        db.executemany("""
             INSERT INTO laps
             (type, lap_number, rider_name, lap_time, time_diff, cumulative_time, lap_duration)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (lap_type, lap_number, rider_name, lap_time, time_diff, str(cumulative_time), str(lap_duration)))
-        conn.commit()
-
-def remove_last_db_entry(lap_type):
-    with sqlite3.connect("data/laps_data.db") as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id FROM laps
-            WHERE type = ?
-            ORDER BY id DESC
-            LIMIT 1
-        """, (lap_type,))
-        row = cursor.fetchone()
-        if row:
-            last_id = row[0]
-            cursor.execute("DELETE FROM laps WHERE id = ?", (last_id,))
-            conn.commit()
+            SELECT ?1, ?2, ?3, ?4, ?5, ?6, ?7
+            WHERE NOT EXISTS (SELECT 1 FROM laps WHERE type = ?1 AND lap_number = ?2)
+        """, rows)
+    return db.conn.total_changes - before
 
 def clear_all_laps_db():
-    with sqlite3.connect("data/laps_data.db") as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM laps")
-        conn.commit()
+    _write("DELETE FROM laps")
+
+def fetch_last_cumulative_time(lap_type):
+    row = _reader().fetchone("""
+        SELECT cumulative_time FROM laps
+        WHERE type = ?
+        ORDER BY id DESC
+        LIMIT 1
+    """, (lap_type,))
+    return float(row[0]) if row else None
+
+def fetch_all_laps(order_by="id ASC"):
+    return _reader().fetchall(f"SELECT * FROM laps ORDER BY {order_by}")
+
+LAP_COLUMNS = ("id", "type", "lap_number", "rider_name", "lap_time", "time_diff", "cumulative_time", "lap_duration")
+
+def count_laps(db=None):
+    return (db or _reader()).fetchone("SELECT COUNT(*) FROM laps")[0]
+
+def fetch_laps_after(key, limit, db=None):
+    """
+    Page suivante en pagination par clé : `limit` tours strictement après key=(lap_number, id),
+    dans l'ordre (lap_number, id). key=None => depuis le début. `db` : autre connexion (thread).
+    """
+    db = db or _reader()
+    if key is None:
+        return db.fetchall("SELECT * FROM laps ORDER BY lap_number, id LIMIT ?", (limit,))
+    return db.fetchall(
+        "SELECT * FROM laps WHERE (lap_number, id) > (?, ?) ORDER BY lap_number, id LIMIT ?",
+        (key[0], key[1], limit))
+
+def fetch_laps_from(key, limit, db=None):
+    """Comme fetch_laps_after, mais key incluse (rafraîchissement de la page affichée)."""
+    db = db or _reader()
+    return db.fetchall(
+        "SELECT * FROM laps WHERE (lap_number, id) >= (?, ?) ORDER BY lap_number, id LIMIT ?",
+        (key[0], key[1], limit))
+
+def fetch_laps_before(key, limit, db=None):
+    """Les `limit` tours juste avant key=(lap_number, id), rendus dans l'ordre croissant."""
+    db = db or _reader()
+    if key is None:
+        rows = db.fetchall("SELECT * FROM laps ORDER BY lap_number DESC, id DESC LIMIT ?", (limit,))
+    else:
+        rows = db.fetchall(
+            "SELECT * FROM laps WHERE (lap_number, id) < (?, ?) ORDER BY lap_number DESC, id DESC LIMIT ?",
+            (key[0], key[1], limit))
+    rows.reverse()
+    return rows
+
+def fetch_lap_key_at(offset, db=None):
+    """Clé (lap_number, id) du tour à la position `offset` (saut direct via la barre de défilement)."""
+    row = (db or _reader()).fetchone(
+        "SELECT lap_number, id FROM laps ORDER BY lap_number, id LIMIT 1 OFFSET ?", (max(offset, 0),))
+    return tuple(row) if row else None
+
+def iter_laps(chunk_size=1000, db=None):
+    """
+    Tous les tours par id croissant, par paquets de `chunk_size` lignes (fetchmany) :
+    la mémoire reste constante quelle que soit la taille de la table.
+    """
+    cursor = (db or _reader()).execute("SELECT * FROM laps ORDER BY id")
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cursor.close()
+
+def fetch_lap_row(lap_id):
+    """Ligne complète (LAP_COLUMNS) du tour, ou None."""
+    return _reader().fetchone("SELECT * FROM laps WHERE id = ?", (lap_id,))
+
+def fetch_last_lap_row(lap_type):
+    """Dernière ligne enregistrée (plus grand id) d'un type, ou None."""
+    return _reader().fetchone("SELECT * FROM laps WHERE type = ? ORDER BY id DESC LIMIT 1", (lap_type,))
+
+def fetch_lap_durations():
+    return _reader().fetchall("SELECT type, rider_name, lap_duration FROM laps")
+
+def update_lap_record(lap_id, lap_number, rider_name):
+    _write("UPDATE laps SET lap_number = ?, rider_name = ? WHERE id = ?", (lap_number, rider_name, lap_id))
+
+def delete_lap_by_id(lap_id):
+    _write("DELETE FROM laps WHERE id = ?", (lap_id,))
+
+def fetch_lap_tail(lap_type, limit):
+    """
+    Les `limit` derniers tours d'un type, dans l'ordre de reload_from_db (lap_number, id) et
+    sous la même forme : parcours de la fin de l'index (type, lap_number), indépendant
+    de la taille de la table.
+    """
+    rows = _reader().fetchall("""
+        SELECT lap_number, rider_name, lap_time, time_diff, lap_duration, type, id
+        FROM laps
+        WHERE type = ?
+        ORDER BY lap_number DESC, id DESC
+        LIMIT ?
+    """, (lap_type, limit))
+    rows.reverse()
+    return rows
+
+def save_race_session(start_wall, state, updated_wall):
+    """state : instantané JSON de RaceEngine.snapshot() (une seule ligne, remplacée à chaque fois)."""
+    _write("""
+        INSERT OR REPLACE INTO race_session (id, start_wall, state, updated_wall)
+        VALUES (1, ?, ?, ?)
+    """, (start_wall, state, updated_wall))
+
+def fetch_race_session():
+    """(start_wall, state, updated_wall) de la course enregistrée, ou None."""
+    return _reader().fetchone("SELECT start_wall, state, updated_wall FROM race_session WHERE id = 1")
 
 def reload_from_db():
-    with sqlite3.connect("data/laps_data.db") as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT lap_number, rider_name, lap_time, time_diff, lap_duration, type
+    """
+    Tours groupés par type, triés par (lap_number, id) dans chaque type :
+    chaque requête parcourt l'index (type, lap_number) au lieu de trier toute la table.
+    lap_time et lap_duration sont rendus en secondes ; id en dernière colonne.
+    """
+    db = _reader()
+    data = []
+    for lap_type in LAP_TYPES:
+        rows = db.fetchall("""
+            SELECT lap_number, rider_name, lap_time, time_diff, lap_duration, type, id
             FROM laps
+            WHERE type = ?
             ORDER BY lap_number ASC, id ASC
-        """)
-        rows = cursor.fetchall()
-    data = []
-    for row in rows:
-        lap_number, rider_name, lap_time, time_diff, lap_duration, lap_type = row
-        data.append((int(lap_number), rider_name, lap_time, time_diff, lap_duration, lap_type))
+        """, (lap_type,))
+        data.extend(rows)
     return data
 
 def fetch_stats_for_all():
-    with sqlite3.connect("data/laps_data.db") as conn:
-        cursor = conn.cursor()
+    db = _reader()
 
-        cursor.execute("SELECT AVG(lap_duration), MIN(lap_duration), COUNT(*) FROM laps WHERE type='Vélo 1'")
-        row_bike1 = cursor.fetchone()
-        avg_bike1 = float(row_bike1[0]) if row_bike1 and row_bike1[0] else 0
-        min_bike1 = float(row_bike1[1]) if row_bike1 and row_bike1[1] else 0
-        count_bike1 = int(row_bike1[2]) if row_bike1 and row_bike1[2] else 0
+    row_bike1 = db.fetchone("SELECT AVG(lap_duration), MIN(lap_duration), COUNT(*) FROM laps WHERE type='Vélo 1'")
+    avg_bike1 = float(row_bike1[0]) if row_bike1 and row_bike1[0] else 0
+    min_bike1 = float(row_bike1[1]) if row_bike1 and row_bike1[1] else 0
+    count_bike1 = int(row_bike1[2]) if row_bike1 and row_bike1[2] else 0
 
-        cursor.execute("SELECT AVG(lap_duration), MIN(lap_duration), COUNT(*) FROM laps WHERE type='Peloton'")
-        row_peloton = cursor.fetchone()
-        avg_peloton = float(row_peloton[0]) if row_peloton and row_peloton[0] else 0
-        min_peloton = float(row_peloton[1]) if row_peloton and row_peloton[1] else 0
-        count_peloton = int(row_peloton[2]) if row_peloton and row_peloton[2] else 0
+    row_peloton = db.fetchone("SELECT AVG(lap_duration), MIN(lap_duration), COUNT(*) FROM laps WHERE type='Peloton'")
+    avg_peloton = float(row_peloton[0]) if row_peloton and row_peloton[0] else 0
+    min_peloton = float(row_peloton[1]) if row_peloton and row_peloton[1] else 0
+    count_peloton = int(row_peloton[2]) if row_peloton and row_peloton[2] else 0
 
     return (avg_bike1, min_bike1, count_bike1, avg_peloton, min_peloton, count_peloton)
 
 def fetch_stats_per_rider():
-    with sqlite3.connect("data/laps_data.db") as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT rider_name, COUNT(*), AVG(lap_duration), MIN(lap_duration)
-            FROM laps
-            WHERE type='Vélo 1'
-            GROUP BY rider_name
-        """)
-        rows = cursor.fetchall()
-    return rows
+    return _reader().fetchall("""
+        SELECT rider_name, COUNT(*), AVG(lap_duration), MIN(lap_duration)
+        FROM laps
+        WHERE type='Vélo 1'
+        GROUP BY rider_name
+    """)
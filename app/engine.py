@@ -0,0 +1,616 @@
+import json
+
+from .clock import MonotonicClock
+from .db import (
+    LAP_TYPES,
+    store_lap_data,
+    reload_from_db,
+    clear_all_laps_db,
+    fetch_last_cumulative_time,
+    update_lap_record,
+    delete_lap_by_id,
+    insert_laps,
+    fetch_lap_tail,
+    save_race_session,
+    fetch_race_session,
+    fetch_all_laps,
+    fetch_lap_row,
+    fetch_last_lap_row,
+    fetch_max_lap_id,
+    restore_laps,
+)
+from .journal import Journal, LapAdded, LapEdited, LapDeleted, LapsReset
+from .laps import LapStore, RiderTable
+from .stats import AggregateStore, RollingPace
+from .utils import format_secs_as_hhmmss
+
+BIKE1 = "Vélo 1"
+PELOTON = "Peloton"
+TMA = "TMA"
+
+# Écart minimal entre deux tours d'un même groupe (s)
+MIN_LAP_TIME = 30
+PACE_WINDOW = 1800.0  # fenêtre de l'allure récente affichée (s)
+
+# Complément utilisé dans "Il faut au moins 30s entre deux tours ..."
+_GROUP_LABELS = {BIKE1: "Vélo 1", PELOTON: "du Peloton", TMA: "TMA"}
+# Rider affiché dans les tableaux quand celui stocké n'a pas de sens ("N/A" pour le peloton)
+_ROW_LABELS = {PELOTON: "Peloton"}
+
+DEFAULT_RIDERS = [
+    "Lionceau", "Tarpan", "Tamarin", "Ouandji", "Pajero", "Bengali",
+    "Kitfox", "Banteng", "Xérus", "Capybara", "Mustela", "Aquila",
+    "Chaoui", "Steenbock", "Lycaon", "Kowari", "Jaco", "Markhor",
+    "Alaskan", "Chikaree", "Margay", "Mink", "Springbok"
+]
+
+
+def to_ms(seconds):
+    """Arrondi à la milliseconde : résolution de tous les temps stockés (mémoire et base)."""
+    return round(seconds, 3)
+
+
+class RaceError(Exception):
+    """Action refusée par le moteur (le message est destiné à l'utilisateur)."""
+
+
+class RaceNotStarted(RaceError):
+    def __init__(self):
+        super().__init__("Démarrez d'abord le chronomètre.")
+
+
+class LapTooShort(RaceError):
+    def __init__(self, group, min_lap_time):
+        super().__init__(f"Il faut au moins {min_lap_time}s entre deux tours {_GROUP_LABELS[group]}.")
+        self.group = group
+
+
+class NothingToUndo(RaceError):
+    def __init__(self):
+        super().__init__("Aucun tour enregistré à annuler.")
+
+
+class NothingToRedo(RaceError):
+    def __init__(self):
+        super().__init__("Aucune opération annulée à rétablir.")
+
+
+class GroupState:
+    """État de chronométrage d'un groupe (Vélo 1, Peloton ou TMA)."""
+
+    def __init__(self, name, riders, pace):
+        self.name = name
+        self.last_time = None
+        self.laps = LapStore(riders, pace, label=_ROW_LABELS.get(name))
+        self.total = 0
+        # False après une reprise partielle : seuls les derniers tours sont en mémoire
+        self.complete = True
+
+    @property
+    def pace(self):
+        return self.laps.pace
+
+
+# Événements après lesquels l'instantané de course est réécrit en base
+_SESSION_EVENTS = frozenset((
+    "started", "lap_recorded", "lap_undone", "lap_redone", "lap_changed", "reset", "reloaded",
+    "queue_changed", "rider_changed", "riders_changed",
+))
+
+# Tours relus par groupe à la reprise : fenêtres d'allure et tableaux “Derniers tours”
+RESUME_TAIL = 200
+# Au-delà, la course enregistrée est considérée terminée et n'est pas reprise
+RESUME_MAX_AGE = 25 * 3600
+
+
+class RaceEngine:
+    """
+    Logique de course sans aucune dépendance à Tk : chrono, tours par groupe,
+    annulation, écarts et file des rouleurs.
+    Chaque changement d'état est notifié aux abonnés : callback(event, **data).
+
+    Événements : "started", "lap_recorded" (group, lap), "lap_undone" (group),
+    "lap_redone" (group), "lap_changed" (group), "reset", "reloaded", "resumed",
+    "queue_changed", "rider_changed", "riders_changed".
+
+    Les opérations sur les tours passent par `journal` : undo_last_lap() / redo()
+    les défont et refont sans limite, base, mémoire et agrégats ensemble.
+
+    Une fois la course démarrée, chaque changement d'état réécrit un instantané
+    (snapshot()) dans la table race_session ; resume() le relit au redémarrage.
+
+    `stats` (AggregateStore) suit toutes les écritures en base : il doit être
+    initialisé une fois avec stats.rebuild() quand la base contient déjà des tours.
+    groups[groupe].pace (RollingPace) tient les moyennes glissantes sur les durées brutes.
+    """
+
+    def __init__(self, clock=None, min_lap_time=MIN_LAP_TIME, riders=None,
+                 pace_windows=(5, 10), pace_time_windows=(PACE_WINDOW,), pace_alpha=0.3):
+        self.clock = clock or MonotonicClock()
+        self.min_lap_time = min_lap_time
+        self.start_time = None
+        self.rider_table = RiderTable()
+        self.groups = {
+            name: GroupState(name, self.rider_table, RollingPace(pace_windows, pace_time_windows, pace_alpha))
+            for name in LAP_TYPES
+        }
+        self.stats = AggregateStore()
+        self.journal = Journal()
+        self._next_id = None
+
+        self.riders = list(riders or DEFAULT_RIDERS)
+        self.next_rouleurs_queue = []
+        self.current_rouleur = self.riders[0]
+
+        self._listeners = []
+
+    # ============== Abonnements ==============
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        self._listeners.remove(callback)
+
+    def _emit(self, event, **data):
+        if event in _SESSION_EVENTS:
+            self.save_session()
+        for callback in list(self._listeners):
+            callback(event, **data)
+
+    # ============== Chrono principal ==============
+    def start(self):
+        """
+        Démarre le chrono => start_time = now,
+        last_time de chaque groupe = start_time pour réinitialiser les 'current' à 0.
+        """
+        if self.start_time is not None:
+            return
+        self.start_time = self.clock()
+        for group in self.groups.values():
+            group.last_time = self.start_time
+        self._emit("started")
+
+    def elapsed(self):
+        if self.start_time is None:
+            return None
+        return self.clock() - self.start_time
+
+    def format_time(self, t):
+        """Convertit un timestamp absolu “t” en “HH:MM:SS” depuis start_time."""
+        if self.start_time is not None:
+            return format_secs_as_hhmmss(t - self.start_time)
+        return "N/A"
+
+    # ============== Session persistée ==============
+    def snapshot(self):
+        """État compact de la course : totaux, fin du dernier tour par groupe (s depuis le départ), file."""
+        return {
+            "totals": {name: group.total for name, group in self.groups.items()},
+            "last": {
+                name: None if group.last_time is None else to_ms(group.last_time - self.start_time)
+                for name, group in self.groups.items()
+            },
+            "riders": self.riders,
+            "queue": self.next_rouleurs_queue,
+            "current": self.current_rouleur,
+        }
+
+    def save_session(self):
+        if self.start_time is None:
+            return
+        save_race_session(
+            self.clock.wall(self.start_time),
+            json.dumps(self.snapshot(), ensure_ascii=False),
+            self.clock.wall(),
+        )
+
+    def resume(self, tail=RESUME_TAIL, max_age=RESUME_MAX_AGE):
+        """
+        Reprend la course enregistrée (crash, fermeture) : départ, totaux, fins de tours
+        et file des rouleurs viennent de l'instantané, les tours en mémoire se limitent
+        aux `tail` derniers de chaque groupe (lus en fin d'index) et les agrégats sont
+        recalculés à la première lecture. Coût indépendant du nombre de tours en base.
+        Rend True si une course a été reprise.
+        """
+        session = fetch_race_session()
+        if session is None or session[0] is None:
+            return False
+        start_wall, state, _ = session
+        start_time = self.clock.from_wall(start_wall)
+        if self.clock() - start_time > max_age:
+            return False
+        state = json.loads(state)
+
+        self.start_time = start_time
+        self.riders = list(state.get("riders") or self.riders)
+        self.next_rouleurs_queue = list(state.get("queue") or [])
+        self.current_rouleur = state.get("current") or self.current_rouleur
+
+        totals = state.get("totals", {})
+        last = state.get("last", {})
+        for name, group in self.groups.items():
+            group.laps.clear()
+            rows = fetch_lap_tail(name, tail)
+            for (lap_number, rider_name, lap_time, time_diff, lap_dur, _, lap_id) in rows:
+                group.laps.append(int(lap_number), rider_name, lap_time, lap_dur, lap_id)
+            group.complete = len(rows) < tail
+            # Un tour validé en base juste avant un crash peut manquer à l'instantané
+            group.total = max(totals.get(name, 0), group.laps.lap_numbers[-1] if group.laps else 0)
+            offset = last.get(name)
+            if group.laps and group.laps.timestamps[-1] > (offset if offset is not None else -1.0):
+                offset = group.laps.timestamps[-1]
+            group.last_time = None if offset is None else start_time + offset
+
+        self.stats.invalidate()
+        self.journal.clear()
+        self._emit("resumed")
+        return True
+
+    # ============== Enregistrement des tours ==============
+    def record_lap(self, group_name, at=None):
+        """
+        Enregistre un tour pour le groupe au temps courant, ou à l'instant `at` (échelle de
+        self.clock) pour un passage horodaté ailleurs (poste distant, voir ingest.py).
+        Lève RaceNotStarted / LapTooShort si le tour est refusé.
+        """
+        if self.start_time is None:
+            raise RaceNotStarted()
+        group = self.groups[group_name]
+        now = self.clock() if at is None else to_ms(at)
+        if group.last_time is not None and (now - group.last_time < self.min_lap_time):
+            raise LapTooShort(group_name, self.min_lap_time)
+
+        if group_name == BIKE1:
+            rider = self.current_rouleur or "Vélo1"
+        elif group_name == PELOTON:
+            rider = "N/A"
+        else:
+            rider = "TMA"
+
+        elapsed = to_ms(now - self.start_time)
+        lap_duration = to_ms(now - group.last_time) if group.last_time is not None else elapsed
+        row = (self._allocate_id(), group_name, group.total + 1, rider, elapsed, "N/A", elapsed, lap_duration)
+        return self._add_lap(group, row, now)
+
+    def add_manual_lap(self, group_name, duration, rider=None):
+        """Ajoute un tour saisi à la main (durée approximative en secondes)."""
+        group = self.groups[group_name]
+        now = self.clock()
+        if group_name == BIKE1:
+            rider = rider or "Vélo1"
+        elif group_name == PELOTON:
+            rider = "N/A"
+        else:
+            rider = "TMA"
+
+        elapsed = to_ms(now - self.start_time) if self.start_time is not None else None
+        row = (self._allocate_id(), group_name, group.total + 1, rider, elapsed, "N/A",
+               elapsed if elapsed is not None else 0, duration)
+        return self._add_lap(group, row, now)
+
+    def _add_lap(self, group, row, now):
+        op = LapAdded(row, group.total, group.last_time, row[2], now)
+        op.redo(self)
+        self.journal.record(op)
+        lap = group.laps.row(-1)
+        self._emit("lap_recorded", group=group.name, lap=lap)
+        return lap
+
+    # ============== Primitives (base + mémoire + agrégats) ==============
+    # Lignes complètes au format LAP_COLUMNS. Utilisées par les opérations du journal.
+    def _allocate_id(self):
+        """Id du prochain tour, choisi ici pour que le journal puisse le supprimer / le réinsérer."""
+        if self._next_id is None:
+            self._next_id = fetch_max_lap_id() + 1
+        lap_id = self._next_id
+        self._next_id += 1
+        return lap_id
+
+    def _group_of(self, row):
+        return self.groups.get(row[1], self.groups[TMA])
+
+    def _insert_row(self, row):
+        lap_id, lap_type, lap_number, rider, lap_time, time_diff, cumulative_time, duration = row
+        store_lap_data(lap_type, lap_number, rider, lap_time, time_diff, cumulative_time, duration, lap_id=lap_id)
+        self.stats.add(lap_type, rider, duration)
+        group = self._group_of(row)
+        laps = group.laps
+        # Reprise partielle : un tour plus ancien que ceux chargés reste seulement en base
+        if group.complete or not laps or (lap_number, lap_id) > (laps.lap_numbers[0], laps.ids[0]):
+            laps.insert(lap_number, rider, lap_time, duration, lap_id)
+        return group
+
+    def _delete_row(self, row):
+        lap_id, lap_type, lap_number, rider, _, _, _, duration = row
+        delete_lap_by_id(lap_id)
+        self.stats.remove(lap_type, rider, duration)
+        group = self._group_of(row)
+        index = group.laps.index_of(lap_number, lap_id)
+        if index is not None:
+            group.laps.remove(index)
+        return group
+
+    def _update_row(self, before, after):
+        lap_id, lap_type, _, old_rider, _, _, _, duration = before
+        update_lap_record(lap_id, after[2], after[3])
+        self.stats.change_rider(lap_type, old_rider, after[3], duration)
+        group = self._group_of(before)
+        laps = group.laps
+        index = laps.index_of(before[2], lap_id)
+        if index is not None and before[2] == after[2]:
+            laps.rider_ids[index] = self.rider_table.intern(after[3])
+        else:
+            if index is not None:
+                laps.remove(index)
+            if group.complete or not laps or (after[2], lap_id) > (laps.lap_numbers[0], laps.ids[0]):
+                laps.insert(after[2], after[3], before[4], duration, lap_id)
+        return group
+
+    def _recount_total(self, group):
+        """total = plus grand numéro de tour du groupe (comme reload_from_db)."""
+        if group.laps:
+            group.total = group.laps.lap_numbers[-1]
+        else:
+            tail = fetch_lap_tail(group.name, 1)
+            group.total = int(tail[0][0]) if tail else 0
+
+    def _derive_last_time(self, group):
+        """Fin du dernier tour restant, à la milliseconde, depuis la mémoire (sinon relue en base)."""
+        if group.laps:
+            previous = group.laps.timestamps[-1]
+            if previous == previous and self.start_time is not None:  # NaN : tour manuel avant départ
+                return self.start_time + previous
+        return self.find_last_timestamp_from_db(group.name)
+
+    # ============== Undo / Redo / Reset ==============
+    def undo_last_lap(self):
+        """
+        Annule la dernière opération du journal (tour, saisie manuelle, modification,
+        suppression, réinitialisation). Journal vide (ex. après une reprise) : annule le
+        dernier tour du groupe enregistré le plus récemment.
+        Rend le nom du groupe concerné (None si rien à annuler dans ce groupe / réinitialisation).
+        """
+        if self.journal.done:
+            op = self.journal.done.pop()
+            group_name = op.undo(self)
+            self.journal.undone.append(op)
+            if group_name is not None:
+                self._emit("lap_undone", group=group_name)
+            return group_name
+
+        times = [(name, g.last_time) for name, g in self.groups.items() if g.last_time is not None]
+        if not times:
+            raise NothingToUndo()
+
+        last_type, _ = max(times, key=lambda x: x[1])
+        group = self.groups[last_type]
+        if group.total <= 0:
+            return None
+        row = fetch_lap_row(group.laps.ids[-1]) if group.laps else fetch_last_lap_row(last_type)
+        if row is None:
+            return None
+
+        op = LapAdded(tuple(row), group.total - 1, None, group.total, group.last_time)
+        op.undo(self)
+        group.last_time = op.prev_last_time = self._derive_last_time(group)
+        self.journal.undone.append(op)
+
+        self._emit("lap_undone", group=last_type)
+        return last_type
+
+    def redo(self):
+        """Rétablit la dernière opération annulée. Rend le groupe concerné ; NothingToRedo sinon."""
+        if not self.journal.undone:
+            raise NothingToRedo()
+        op = self.journal.undone.pop()
+        group_name = op.redo(self)
+        self.journal.done.append(op)
+        if group_name is not None:
+            self._emit("lap_redone", group=group_name)
+        return group_name
+
+    def find_last_timestamp_from_db(self, lap_type):
+        ctime = fetch_last_cumulative_time(lap_type)
+        if ctime is not None:
+            return (self.start_time or 0) + ctime
+        return None
+
+    def reset(self):
+        # Les lignes effacées restent dans le journal : la réinitialisation s'annule aussi
+        op = LapsReset(
+            [tuple(row) for row in fetch_all_laps("id ASC")],
+            {name: (group.total, group.last_time) for name, group in self.groups.items()},
+            (self.stats.groups, self.stats.riders, self.stats.stale),
+        )
+        self._clear_laps()
+        self.journal.record(op)
+
+    def _clear_laps(self):
+        for group in self.groups.values():
+            group.laps.clear()
+            group.complete = True
+            group.total = 0
+            group.last_time = None
+        clear_all_laps_db()
+        # Nouveaux dictionnaires : ceux d'avant restent dans l'opération LapsReset
+        self.stats.groups, self.stats.riders, self.stats.stale = {}, {}, False
+        self._emit("reset")
+
+    def _restore_reset(self, op):
+        restore_laps(op.rows)
+        self.stats.groups, self.stats.riders, self.stats.stale = op.stats
+        self._load_laps()
+        for name, (total, last_time) in op.groups.items():
+            self.groups[name].total = total
+            self.groups[name].last_time = last_time
+        self._emit("reloaded")
+
+    def edit_lap(self, lap_id, lap_number, rider_name):
+        """Modifie numéro de tour et rider d'un tour existant (fenêtre de gestion)."""
+        before = fetch_lap_row(int(lap_id))
+        if before is None:
+            return
+        before = tuple(before)
+        after = before[:2] + (int(lap_number), rider_name) + before[4:]
+        group = self._group_of(before)
+        op = LapEdited(before, after, group.total)
+        op.redo(self)
+        self.journal.record(op)
+        self._emit("lap_changed", group=group.name)
+
+    def delete_lap(self, lap_id):
+        row = fetch_lap_row(int(lap_id))
+        if row is None:
+            return
+        row = tuple(row)
+        group = self._group_of(row)
+        op = LapDeleted(row, group.total)
+        op.redo(self)
+        self.journal.record(op)
+        self._emit("lap_changed", group=group.name)
+
+    def import_laps(self, rows):
+        """
+        Import en masse (lignes au format insert_laps) : une transaction, puis une seule
+        reconstruction des agrégats et des tours en mémoire. Rend le nombre de tours insérés.
+        L'import ne s'annule pas : le journal est vidé.
+        """
+        inserted = insert_laps(rows)
+        if inserted:
+            self.journal.clear()
+            self._next_id = None
+            self.stats.rebuild()
+            self.reload_from_db()
+        return inserted
+
+    def reload_from_db(self):
+        """Reconstruit les listes de tours et les totaux à partir de la base."""
+        self._load_laps()
+        self._emit("reloaded")
+
+    def _load_laps(self):
+        for group in self.groups.values():
+            group.laps.clear()
+            group.complete = True
+            group.total = 0
+
+        for (lap_number, rider_name, lap_time, time_diff, lap_dur, lap_type, lap_id) in reload_from_db():
+            lap_number = int(lap_number)
+            group = self.groups.get(lap_type, self.groups[TMA])
+            group.laps.append(lap_number, rider_name, lap_time, lap_dur, lap_id)
+            group.total = max(group.total, lap_number)
+
+    # -------------- Logique “Current” & écarts --------------
+    def compute_current_lap_time(self, group_name):
+        """
+        Rend le temps (s) écoulé depuis le dernier “record” (ou start_time).
+        """
+        if self.start_time is None:
+            return None
+        last_time = self.groups[group_name].last_time
+        ref = last_time if last_time is not None else self.start_time
+        return self.clock() - ref
+
+    def compute_diff_current(self, groupA, groupB):
+        """
+        diff = tB - tA
+         * si diff < 0 => A est en avance de abs(diff)
+         * si diff > 0 => A est en retard de diff
+        """
+        tA = self.compute_current_lap_time(groupA)
+        tB = self.compute_current_lap_time(groupB)
+        if tA is None or tB is None:
+            return "N/A"
+        diff = int(tB - tA)
+        if diff == 0:
+            return "+0s"
+        elif diff > 0:
+            return f"+{diff}s"  # A est plus lent
+        else:
+            return f"-{abs(diff)}s"  # A est plus rapide
+
+    def compute_avg_of_last_5(self, group_name):
+        return self.groups[group_name].pace.mean_last(5)
+
+    def compute_recent_pace(self, group_name):
+        """Durée moyenne des tours finis dans les PACE_WINDOW s avant le dernier passage."""
+        return self.groups[group_name].pace.mean_over(PACE_WINDOW)
+
+    def lap_progress(self, group_names=LAP_TYPES, max_fraction=0.995):
+        """
+        Avancement estimé de chaque groupe dans son tour en cours (0 = ligne, 1 = tour bouclé) :
+        temps depuis le dernier tour / allure récente (EWMA des durées). Une seule lecture
+        d'horloge pour tous les groupes ; un groupe en retard sur son allure reste juste
+        avant la ligne (max_fraction). None si la course n'a pas démarré ou sans allure connue.
+        """
+        if self.start_time is None:
+            return [None for _ in group_names]
+        now = self.clock()
+        fractions = []
+        for name in group_names:
+            group = self.groups[name]
+            pace = group.pace.ewma
+            if not pace or pace <= 0:
+                fractions.append(None)
+                continue
+            ref = group.last_time if group.last_time is not None else self.start_time
+            fractions.append(min(max((now - ref) / pace, 0.0), max_fraction))
+        return fractions
+
+    def gap_text(self):
+        """
+        Gap principal entre Bike1 et Peloton en tours.
+        Si ex aequo => compare le timestamp => +/- Xs
+        """
+        bike1 = self.groups[BIKE1]
+        peloton = self.groups[PELOTON]
+        lap_diff = bike1.total - peloton.total
+        if lap_diff > 0:
+            return f"Current gap: Bike 1 is {lap_diff} lap(s) ahead."
+        elif lap_diff < 0:
+            return f"Current gap: Peloton is {abs(lap_diff)} lap(s) ahead."
+        if bike1.last_time is not None and peloton.last_time is not None:
+            gap_sec = int(peloton.last_time - bike1.last_time)
+            if gap_sec > 0:
+                return f"Current gap: Same lap. Peloton leads by {gap_sec}s."
+            elif gap_sec < 0:
+                return f"Current gap: Same lap. Bike 1 leads by {abs(gap_sec)}s."
+            return "Current gap: Exactly simultaneous!"
+        return "Current gap: N/A"
+
+    # ============== Rouleurs ==============
+    def add_rider(self, name):
+        self.riders.append(name)
+        self._emit("riders_changed")
+
+    def next_rouleur(self):
+        """Passe au premier rouleur de la file. Rend False si la file est vide."""
+        if not self.next_rouleurs_queue:
+            return False
+        self.current_rouleur = self.next_rouleurs_queue.pop(0)
+        self._emit("queue_changed")
+        self._emit("rider_changed")
+        return True
+
+    def add_to_queue(self, rider):
+        self.next_rouleurs_queue.append(rider)
+        self._emit("queue_changed")
+
+    def remove_from_queue(self, index):
+        if 0 <= index < len(self.next_rouleurs_queue):
+            del self.next_rouleurs_queue[index]
+            self._emit("queue_changed")
+
+    def move_rider(self, index, offset):
+        """Échange le rouleur d'index `index` avec son voisin (offset -1 ou +1)."""
+        target = index + offset
+        queue = self.next_rouleurs_queue
+        if not (0 <= index < len(queue) and 0 <= target < len(queue)):
+            return False
+        queue[index], queue[target] = queue[target], queue[index]
+        self._emit("queue_changed")
+        return True
+
+    def reset_queue(self):
+        self.next_rouleurs_queue = []
+        self._emit("queue_changed")
@@ -0,0 +1,128 @@
+import csv
+import gzip
+import json
+import os
+import threading
+
+from .db import Database, LAP_COLUMNS, get_db, flush_writes, count_laps, iter_laps
+
+FORMATS = ("csv", "jsonl")
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def guess_format(path):
+    """(format, gzip) d'après l'extension : .csv, .jsonl, éventuellement suivis de .gz."""
+    name = path.lower()
+    compressed = name.endswith(".gz")
+    if compressed:
+        name = name[:-3]
+    return ("jsonl" if name.endswith((".jsonl", ".json")) else "csv"), compressed
+
+
+def _open(path, compressed):
+    if compressed:
+        return gzip.open(path, "wt", newline="", encoding="utf-8")
+    return open(path, "w", newline="", encoding="utf-8")
+
+
+def export_laps(path, fmt=None, compressed=None, chunk_size=1000, progress=None, cancelled=None, db=None):
+    """
+    Écrit tous les tours dans `path` en flux (iter_laps, `chunk_size` lignes à la fois).
+    progress(done, total) est appelé après chaque paquet ; si cancelled() devient vrai,
+    l'export s'arrête (ExportCancelled). Le fichier est écrit à côté puis renommé :
+    un export annulé ou en erreur ne laisse jamais de fichier partiel. Rend le nombre de tours.
+    """
+    guessed_fmt, guessed_gz = guess_format(path)
+    fmt = fmt or guessed_fmt
+    compressed = guessed_gz if compressed is None else compressed
+    if fmt not in FORMATS:
+        raise ValueError(f"Format d'export inconnu: {fmt}")
+
+    total = count_laps(db)
+    done = 0
+    tmp_path = path + ".part"
+    try:
+        with _open(tmp_path, compressed) as f:
+            if fmt == "csv":
+                writer = csv.writer(f)
+                writer.writerow(LAP_COLUMNS)
+            for rows in iter_laps(chunk_size, db):
+                if cancelled is not None and cancelled():
+                    raise ExportCancelled()
+                if fmt == "csv":
+                    writer.writerows(rows)
+                else:
+                    f.writelines(json.dumps(dict(zip(LAP_COLUMNS, row)), ensure_ascii=False) + "\n" for row in rows)
+                done += len(rows)
+                if progress is not None:
+                    progress(done, max(total, done))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return done
+
+
+class ExportJob:
+    """
+    export_laps() sur un thread dédié (connexion SQLite propre, lecture sur un instantané WAL).
+    Aucun appel Tk depuis le thread : la boucle Tk relit done / total / finished / error
+    (voir poll() côté CyclingCore). cancel() arrête l'export au prochain paquet.
+    """
+
+    def __init__(self, path, fmt=None, compressed=None, chunk_size=1000):
+        self.path = path
+        self.fmt = fmt
+        self.compressed = compressed
+        self.chunk_size = chunk_size
+        self.done = 0
+        self.total = 0
+        self.finished = False
+        self.cancelled = False
+        self.error = None
+        self._cancel = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # Les tours encore dans la file d'écriture doivent faire partie de l'export
+        flush_writes()
+        db_path = get_db().path
+        if db_path == ":memory:":
+            # Base non partageable entre threads : export synchrone
+            self._run(None)
+        else:
+            self._thread = threading.Thread(target=self._run, args=(db_path,), name="lap-export", daemon=True)
+            self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def fraction(self):
+        return self.done / self.total if self.total else (1.0 if self.finished else 0.0)
+
+    def _progress(self, done, total):
+        self.done, self.total = done, total
+
+    def _run(self, db_path):
+        db = Database(db_path) if db_path else get_db()
+        try:
+            export_laps(self.path, self.fmt, self.compressed, self.chunk_size,
+                        progress=self._progress, cancelled=self._cancel.is_set, db=db)
+        except ExportCancelled:
+            self.cancelled = True
+        except Exception as e:
+            self.error = e
+        finally:
+            if db_path:
+                db.close()
+            self.finished = True
@@ -0,0 +1,107 @@
+import csv
+import gzip
+import json
+
+from .db import LAP_TYPES
+from .export import guess_format
+from .utils import parse_secs
+
+MAX_REPORTED_ERRORS = 20
+
+
+class ImportReport:
+    """Bilan d'un import : lignes lues, tours insérés, doublons ignorés, lignes rejetées."""
+
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = []  # (ligne, message), au plus MAX_REPORTED_ERRORS
+
+    @property
+    def duplicates(self):
+        return self.read - self.rejected - self.inserted
+
+    def reject(self, line, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def summary(self):
+        text = (f"{self.inserted} tours importés, {self.duplicates} doublons ignorés, "
+                f"{self.rejected} lignes rejetées (sur {self.read}).")
+        for line, message in self.errors:
+            text += f"\nLigne {line}: {message}"
+        return text
+
+
+def read_records(path):
+    """
+    (numéro de ligne, enregistrement) pour un fichier CSV (dict ; en-tête = noms de
+    colonnes, comme export_csv) ou JSONL (ligne brute, décodée par parse_record),
+    éventuellement gzip (.gz). Lecture en flux.
+    """
+    fmt, compressed = guess_format(path)
+    opener = gzip.open if compressed else open
+    with opener(path, "rt", newline="", encoding="utf-8-sig") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_number, line
+
+
+def _seconds(record, key, required=False):
+    value = record.get(key)
+    if value is None or value == "" or value == "N/A":
+        if required:
+            raise ValueError(f"{key} manquant")
+        return None
+    secs = parse_secs(value)
+    if secs is None or secs < 0:
+        raise ValueError(f"{key} invalide: {value!r}")
+    return secs
+
+
+def parse_record(record):
+    """Enregistrement importé => ligne pour insert_laps. ValueError si invalide."""
+    if isinstance(record, str):
+        try:
+            record = json.loads(record)
+        except ValueError as e:
+            raise ValueError(f"JSON invalide ({e})")
+    if not isinstance(record, dict):
+        raise ValueError("enregistrement JSON attendu")
+    lap_type = str(record.get("type") or "").strip()
+    if lap_type not in LAP_TYPES:
+        raise ValueError(f"type invalide: {lap_type!r}")
+    try:
+        lap_number = int(float(record.get("lap_number")))
+    except (TypeError, ValueError):
+        raise ValueError(f"lap_number invalide: {record.get('lap_number')!r}")
+    if lap_number < 1:
+        raise ValueError(f"lap_number invalide: {lap_number}")
+    lap_duration = _seconds(record, "lap_duration", required=True)
+    if lap_duration <= 0:
+        raise ValueError("lap_duration nulle")
+
+    rider_name = str(record.get("rider_name") or "").strip() or "N/A"
+    time_diff = record.get("time_diff") or None
+    return (lap_type, lap_number, rider_name, _seconds(record, "lap_time"),
+            time_diff, _seconds(record, "cumulative_time"), lap_duration)
+
+
+def parse_file(path, report=None):
+    """Lit et valide tout le fichier ; rend (lignes valides, ImportReport)."""
+    report = report or ImportReport()
+    rows = []
+    for line, record in read_records(path):
+        report.read += 1
+        try:
+            rows.append(parse_record(record))
+        except ValueError as e:
+            report.reject(line, str(e))
+    return rows, report
@@ -0,0 +1,199 @@
+"""
+Réception des tours envoyés par d'autres postes de chronométrage (réseau local).
+
+Protocole : TCP, une ligne JSON UTF-8 par passage, une ligne de réponse par passage.
+    {"group": "Peloton", "t": 1718000000.123, "station": "arrivée"}
+    => "OK <n>"        passage mis en file (n : numéro d'ordre sur le serveur)
+    => "DUP <écart>"   un autre poste a déjà signalé ce passage (écart en s)
+    => "ERR <message>" ligne invalide, ou horodatage absurde
+t : horodatage Unix du passage sur le poste en secondes (par défaut : heure de réception),
+    refusé s'il n'est pas fini ou s'il s'écarte de plus de max_skew de l'heure de réception ;
+station : nom libre du poste, repris dans les journaux.
+
+Le serveur asyncio tourne sur son propre thread. Il écarte les doublons (deux postes
+qui signalent le même passage) : un passage à moins de min_lap_time du dernier passage
+accepté du groupe est refusé. Les passages acceptés vont dans une file thread-safe,
+vidée par la boucle Tk (CyclingCore.drain_ingest), seule à toucher au moteur ; un
+passage que le moteur refuse est rendu par reject() et ne compte plus pour les doublons.
+
+Essai en local : printf '{"group": "TMA"}\\n' | nc 127.0.0.1 24024
+"""
+import asyncio
+import json
+import math
+import queue
+import threading
+import time
+
+from .db import LAP_TYPES
+from .engine import MIN_LAP_TIME
+
+DEFAULT_PORT = 24024
+MAX_LINE = 4096
+MAX_SKEW = 300.0  # écart toléré (s) entre l'horloge du poste et celle du serveur
+
+
+class LapEvent:
+    __slots__ = ("seq", "group", "wall", "station", "received", "previous")
+
+    def __init__(self, seq, group, wall, station, received, previous=None):
+        self.seq = seq
+        self.group = group
+        self.wall = wall          # horodatage Unix du passage (poste)
+        self.station = station
+        self.received = received  # time.time() à la réception
+        self.previous = previous  # dernier passage accepté du groupe avant celui-ci (reject)
+
+
+class IngestServer:
+    """
+    start() lance le serveur et rend self une fois l'écoute ouverte (port=0 : port libre,
+    lu ensuite dans self.port) ; stop() ferme les connexions et arrête le thread.
+    accepted / duplicates / errors / refused / stations : compteurs (lus depuis n'importe
+    quel thread) ; refused compte les passages rendus par reject().
+    """
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, min_lap_time=MIN_LAP_TIME, groups=LAP_TYPES,
+                 max_skew=MAX_SKEW):
+        self.host = host
+        self.port = port
+        self.min_lap_time = min_lap_time
+        self.max_skew = max_skew
+        self.groups = frozenset(groups)
+        self.events = queue.SimpleQueue()
+        self._last = {}           # groupe -> horodatage du dernier passage accepté
+        self._last_lock = threading.Lock()  # accept() (thread asyncio) / reject() (thread Tk)
+        self.accepted = 0
+        self.duplicates = 0
+        self.errors = 0
+        self.refused = 0
+        self.stations = {}        # station -> nb de lignes reçues
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+
+    # ============== Cycle de vie ==============
+    def start(self, timeout=5.0):
+        self._thread = threading.Thread(target=self._run, name="lap-ingest", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout)
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def stop(self, timeout=5.0):
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        loop = self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            self._server = loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port, limit=MAX_LINE))
+        except OSError as e:
+            self._error = e
+            self._ready.set()
+            loop.close()
+            return
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            self._server.close()
+            loop.run_until_complete(self._server.wait_closed())
+            for task in asyncio.all_tasks(loop):
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*asyncio.all_tasks(loop), return_exceptions=True))
+            loop.close()
+
+    # ============== Connexions ==============
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Ligne plus longue que MAX_LINE : on coupe la connexion
+                    writer.write(b"ERR ligne trop longue\n")
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    writer.write(self.accept(line).encode() + b"\n")
+                    await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def accept(self, line, received=None):
+        """Une ligne du protocole => réponse ; passage mis en file s'il est accepté."""
+        received = time.time() if received is None else received
+        try:
+            record = json.loads(line)
+            group = record["group"]
+            wall = float(record.get("t", received))
+            station = str(record.get("station", "?"))
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            self.errors += 1
+            return f"ERR ligne invalide ({e})"
+        if not isinstance(group, str) or group not in self.groups:
+            self.errors += 1
+            return f"ERR groupe inconnu : {group}"
+        # NaN / inf ou t en ms : le moteur le prendrait pour l'heure du passage
+        if not math.isfinite(wall) or abs(wall - received) > self.max_skew:
+            self.errors += 1
+            return f"ERR horodatage hors limites : {wall}"
+        self.stations[station] = self.stations.get(station, 0) + 1
+
+        with self._last_lock:
+            last = self._last.get(group)
+            if last is not None and wall - last < self.min_lap_time:
+                self.duplicates += 1
+                return f"DUP {wall - last:.3f}"
+            self._last[group] = wall
+        self.accepted += 1
+        self.events.put(LapEvent(self.accepted, group, wall, station, received, last))
+        return f"OK {self.accepted}"
+
+    def reject(self, event):
+        """
+        Le moteur a refusé `event` (course non démarrée, tour trop court) : le dernier
+        passage du groupe redevient celui d'avant, pour qu'un vrai passage dans les
+        min_lap_time suivants ne soit pas pris pour un doublon. Sans effet si un passage
+        plus récent du groupe a été accepté entre-temps.
+        """
+        with self._last_lock:
+            if self._last.get(event.group) == event.wall:
+                if event.previous is None:
+                    del self._last[event.group]
+                else:
+                    self._last[event.group] = event.previous
+        self.refused += 1
+
+    def drain(self, limit=None):
+        """Passages en attente (thread consommateur), au plus `limit`."""
+        out = []
+        while limit is None or len(out) < limit:
+            try:
+                out.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return out
+
+    def metrics(self):
+        return {
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+            "refused": self.refused,
+            "pending": self.events.qsize(),
+            "stations": dict(self.stations),
+        }
+
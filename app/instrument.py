@@ -0,0 +1,213 @@
+"""
+Instrumentation optionnelle des callbacks Tk (activée par CHRONO24_INSTRUMENT, voir main.py).
+
+Instrumentation.wrap() remplace des méthodes d'une instance (ou des fonctions d'un module)
+par des versions chronométrées : un histogramme de latence par callback, et un signalement
+de chaque appel de premier niveau qui bloque la boucle Tk plus de `threshold_ms`.
+Rien n'est enveloppé quand l'instrumentation est désactivée : aucun coût en course.
+Mesures faites sur le thread Tk uniquement (la file d'écriture n'est pas couverte).
+"""
+import sys
+import time
+import types
+from collections import deque
+from functools import wraps
+
+REPORT_PATH = "data/instrumentation.txt"
+
+# Callbacks enveloppés par défaut (attributs absents ignorés)
+CORE_CALLBACKS = (
+    "on_tick", "update_current_headers", "update_pace_headers", "repaint",
+    "update_lap_history", "update_gap_display", "update_queue_display",
+    "update_current_rouleur_display", "record_lap", "undo_last_lap", "redo_last_lap",
+    "reset_laps", "add_dummy_lap", "next_rouleur", "add_to_queue",
+    "show_stats_window", "export_csv", "import_laps", "open_lap_management_window",
+    "reload_laps_from_db", "load",
+)
+ENGINE_CALLBACKS = ("_emit", "save_session", "reload_from_db", "resume")
+STATS_CALLBACKS = ("stats_for_all", "stats_per_rider", "rebuild", "_ensure")
+# Fonctions de app.db telles qu'importées par engine.py / stats.py
+DB_FUNCTIONS = ("store_lap_data", "reload_from_db", "fetch_stats_for_all",
+                "fetch_stats_per_rider", "fetch_lap_durations", "save_race_session")
+SIMULATION_CALLBACKS = ("start_simulation", "update_simulation", "start_live", "update_live")
+
+
+class LatencyHistogram:
+    """
+    Histogramme à cases de puissances de 2 en µs : la case i compte les appels
+    de durée < 2**i µs (et >= 2**(i-1)). Mémoire constante quel que soit le nombre d'appels.
+    """
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.buckets = [0] * 32
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        us = int(seconds * 1e6)
+        self.buckets[min(us.bit_length(), 31)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        """Borne haute (s) de la case qui contient le q-ième centile."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return min(2 ** i / 1e6, self.max)
+        return self.max
+
+    def bars(self):
+        """[(borne haute en µs, nb d'appels)] des cases non vides."""
+        return [(2 ** i, n) for i, n in enumerate(self.buckets) if n]
+
+
+class Instrumentation:
+    """
+    Histogrammes par callback + liste des blocages. Les appels imbriqués (repaint =>
+    update_lap_history) sont tous mesurés, seul l'appel de premier niveau (celui qui
+    rend la main à Tk) est comparé au seuil.
+    """
+
+    def __init__(self, threshold_ms=50.0, clock=time.perf_counter, max_blocks=200, log=True):
+        self.threshold = threshold_ms / 1000
+        self.clock = clock
+        self.log = log
+        self.histograms = {}
+        self.blocks = deque(maxlen=max_blocks)   # (heure murale, callback, durée s)
+        self.block_count = 0
+        self.started = time.time()
+        self._depth = 0
+        self._wrapped = []                       # (objet, nom, original) pour unwrap()
+
+    # ============== Enveloppes ==============
+    def wrap(self, obj, names, prefix):
+        """Enveloppe obj.<nom> pour chaque nom présent ; rend le nombre d'attributs enveloppés."""
+        count = 0
+        for name in names:
+            original = getattr(obj, name, None)
+            if original is None or not callable(original):
+                continue
+            setattr(obj, name, self._timed(f"{prefix}.{name}", original))
+            self._wrapped.append((obj, name, original))
+            count += 1
+        return count
+
+    def unwrap(self):
+        """Remet les originaux (dans l'ordre inverse : un double wrap se défait proprement)."""
+        while self._wrapped:
+            obj, name, original = self._wrapped.pop()
+            if isinstance(obj, types.ModuleType):
+                setattr(obj, name, original)
+            else:
+                # Méthode liée posée sur l'instance : on la retire pour retrouver celle de la classe
+                try:
+                    delattr(obj, name)
+                except AttributeError:
+                    pass
+                if getattr(obj, name, None) != original:
+                    setattr(obj, name, original)
+
+    def _timed(self, name, fn):
+        histogram = self.histograms.setdefault(name, LatencyHistogram())
+        clock = self.clock
+
+        @wraps(fn)
+        def timed(*args, **kwargs):
+            self._depth += 1
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                self._depth -= 1
+                histogram.add(elapsed)
+                if self._depth == 0 and elapsed > self.threshold:
+                    self._blocked(name, elapsed)
+
+        return timed
+
+    def _blocked(self, name, elapsed):
+        self.block_count += 1
+        self.blocks.append((time.time(), name, elapsed))
+        if self.log:
+            print(f"Callback bloquant : {name} {elapsed * 1e3:.1f} ms", file=sys.stderr)
+
+    def instrument_core(self, core):
+        """CyclingCore, son moteur, ses agrégats et les requêtes SQL qu'ils appellent."""
+        from . import engine, stats
+        self.wrap(core, CORE_CALLBACKS, "core")
+        self.wrap(core.engine, ENGINE_CALLBACKS, "engine")
+        self.wrap(core.engine.stats, STATS_CALLBACKS, "stats")
+        self.wrap(engine, DB_FUNCTIONS, "db")
+        self.wrap(stats, DB_FUNCTIONS, "db")
+
+    def instrument_simulation(self, simulation):
+        self.wrap(simulation, SIMULATION_CALLBACKS, "simulation")
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.clear()
+        self.blocks.clear()
+        self.block_count = 0
+        self.started = time.time()
+
+    # ============== Rapport ==============
+    def report(self):
+        lines = [
+            f"Instrumentation depuis {time.strftime('%H:%M:%S', time.localtime(self.started))}, "
+            f"seuil de blocage {self.threshold * 1e3:g} ms, {self.block_count} blocage(s)",
+            "",
+            f"{'callback':<40}{'appels':>8}{'moy. ms':>10}{'p50 ms':>10}{'p99 ms':>10}"
+            f"{'max ms':>10}{'total s':>10}",
+        ]
+        ranked = sorted(self.histograms.items(), key=lambda item: -item[1].total)
+        for name, h in ranked:
+            if not h.count:
+                continue
+            lines.append(
+                f"{name:<40}{h.count:>8}{h.mean * 1e3:>10.2f}{h.percentile(50) * 1e3:>10.2f}"
+                f"{h.percentile(99) * 1e3:>10.2f}{h.max * 1e3:>10.2f}{h.total:>10.2f}"
+            )
+
+        lines += ["", "Histogrammes (nb d'appels par borne haute) :"]
+        for name, h in ranked:
+            if h.count:
+                bars = "  ".join(f"<{_format_us(bound)}:{n}" for bound, n in h.bars())
+                lines.append(f"  {name} : {bars}")
+
+        if self.blocks:
+            lines += ["", f"Derniers blocages (> {self.threshold * 1e3:g} ms) :"]
+            for wall, name, elapsed in reversed(self.blocks):
+                lines.append(f"  {time.strftime('%H:%M:%S', time.localtime(wall))}  "
+                             f"{name:<40}{elapsed * 1e3:10.1f} ms")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path=REPORT_PATH):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.report())
+        return path
+
+
+def _format_us(us):
+    if us >= 1_000_000:
+        return f"{us / 1e6:g}s"
+    if us >= 1000:
+        return f"{us / 1e3:g}ms"
+    return f"{us}µs"
@@ -0,0 +1,121 @@
+"""
+Journal des opérations sur les tours, pour annuler / rétablir sans limite.
+
+Chaque opération garde de quoi se défaire et se refaire (lignes complètes de la
+table laps, au format LAP_COLUMNS, id compris) et passe par les primitives du
+RaceEngine, qui tiennent ensemble base, tours en mémoire et agrégats.
+undo() / redo() rendent le groupe concerné (None pour une réinitialisation).
+"""
+
+
+class LapAdded:
+    """Tour enregistré (bouton ou saisie manuelle)."""
+
+    __slots__ = ("row", "prev_total", "prev_last_time", "total", "last_time")
+
+    def __init__(self, row, prev_total, prev_last_time, total, last_time):
+        self.row = row
+        self.prev_total = prev_total
+        self.prev_last_time = prev_last_time
+        self.total = total
+        self.last_time = last_time
+
+    def undo(self, engine):
+        group = engine._delete_row(self.row)
+        group.total = self.prev_total
+        group.last_time = self.prev_last_time
+        return group.name
+
+    def redo(self, engine):
+        group = engine._insert_row(self.row)
+        group.total = self.total
+        group.last_time = self.last_time
+        return group.name
+
+
+class LapEdited:
+    """Numéro de tour / rider modifiés depuis la fenêtre de gestion."""
+
+    __slots__ = ("before", "after", "prev_total")
+
+    def __init__(self, before, after, prev_total):
+        self.before = before
+        self.after = after
+        self.prev_total = prev_total
+
+    def undo(self, engine):
+        group = engine._update_row(self.after, self.before)
+        group.total = self.prev_total
+        return group.name
+
+    def redo(self, engine):
+        group = engine._update_row(self.before, self.after)
+        engine._recount_total(group)
+        return group.name
+
+
+class LapDeleted:
+    """Tour supprimé depuis la fenêtre de gestion."""
+
+    __slots__ = ("row", "prev_total")
+
+    def __init__(self, row, prev_total):
+        self.row = row
+        self.prev_total = prev_total
+
+    def undo(self, engine):
+        group = engine._insert_row(self.row)
+        group.total = self.prev_total
+        return group.name
+
+    def redo(self, engine):
+        group = engine._delete_row(self.row)
+        engine._recount_total(group)
+        return group.name
+
+
+class LapsReset:
+    """Réinitialisation : toutes les lignes et l'état des groupes avant l'effacement."""
+
+    __slots__ = ("rows", "groups", "stats")
+
+    def __init__(self, rows, groups, stats):
+        self.rows = rows        # lignes complètes, par id
+        self.groups = groups    # nom -> (total, last_time)
+        self.stats = stats      # (groups, riders, stale) de l'AggregateStore
+
+    def undo(self, engine):
+        engine._restore_reset(self)
+        return None
+
+    def redo(self, engine):
+        engine._clear_laps()
+        return None
+
+
+class Journal:
+    """Deux piles : opérations faites (undo) et défaites (redo). O(1) par pas."""
+
+    def __init__(self):
+        self.done = []
+        self.undone = []
+
+    def __len__(self):
+        return len(self.done)
+
+    def record(self, op):
+        """Nouvelle opération : ce qui avait été défait ne peut plus être rétabli."""
+        self.done.append(op)
+        self.undone.clear()
+
+    def clear(self):
+        self.done.clear()
+        self.undone.clear()
+
+    @property
+    def can_undo(self):
+        return bool(self.done)
+
+    @property
+    def can_redo(self):
+        return bool(self.undone)
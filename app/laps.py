@@ -0,0 +1,141 @@
+import math
+from array import array
+from bisect import bisect_left
+
+from .stats import RollingPace
+from .utils import format_lap_duration, format_secs_as_hhmmss
+
+
+class RiderTable:
+    """Noms de riders internés : chaque nom est stocké une fois, les tours gardent un id."""
+
+    def __init__(self):
+        self.names = []
+        self._ids = {}
+
+    def intern(self, name):
+        rider_id = self._ids.get(name)
+        if rider_id is None:
+            rider_id = self._ids[name] = len(self.names)
+            self.names.append(name)
+        return rider_id
+
+    def name(self, rider_id):
+        return self.names[rider_id]
+
+
+class LapStore:
+    """
+    Tours d'un groupe en colonnes numériques (array) : numéro, id du rider,
+    fin du tour et durée en secondes depuis le départ.
+    Les chaînes affichées ("H:MM:SS") ne sont construites qu'à la lecture (row / tail).
+    Les colonnes timestamps / durations sont celles du RollingPace du groupe :
+    les moyennes glissantes suivent chaque append / pop sans copie.
+    Les riders sont ceux enregistrés en base ; `label`, s'il est donné, est affiché
+    à leur place (ex. "Peloton", stocké "N/A").
+    Les tours restent triés par (lap_number, id), comme reload_from_db ; `ids` garde
+    l'id en base de chaque tour (0 si inconnu).
+    """
+
+    __slots__ = ("riders", "lap_numbers", "rider_ids", "ids", "pace", "label")
+
+    def __init__(self, riders, pace=None, label=None):
+        self.riders = riders
+        self.label = label
+        self.lap_numbers = array("i")
+        self.rider_ids = array("I")
+        self.ids = array("q")
+        self.pace = pace if pace is not None else RollingPace()
+
+    @property
+    def timestamps(self):
+        return self.pace.timestamps
+
+    @property
+    def durations(self):
+        return self.pace.durations
+
+    def __len__(self):
+        return len(self.lap_numbers)
+
+    def append(self, lap_number, rider, timestamp, duration, lap_id=0):
+        """timestamp : secondes depuis le départ ; duration : secondes (None si inconnus, gardés en NaN)."""
+        self.lap_numbers.append(lap_number)
+        self.rider_ids.append(self.riders.intern(rider))
+        self.ids.append(lap_id)
+        self.pace.push(math.nan if timestamp is None else timestamp, math.nan if duration is None else duration)
+
+    def pop(self):
+        if not self.lap_numbers:
+            return None
+        self.lap_numbers.pop()
+        self.rider_ids.pop()
+        self.ids.pop()
+        return self.pace.pop()
+
+    def clear(self):
+        del self.lap_numbers[:]
+        del self.rider_ids[:]
+        del self.ids[:]
+        self.pace.clear()
+
+    # -------------- Accès par id (journal d'annulation) --------------
+    def _position(self, lap_number, lap_id):
+        """Premier index dont la clé (lap_number, id) est >= celle donnée."""
+        i = bisect_left(self.lap_numbers, lap_number)
+        while i < len(self.lap_numbers) and self.lap_numbers[i] == lap_number and self.ids[i] < lap_id:
+            i += 1
+        return i
+
+    def index_of(self, lap_number, lap_id):
+        """Index du tour (lap_number, id), ou None s'il n'est pas en mémoire."""
+        i = self._position(lap_number, lap_id)
+        if i < len(self.ids) and self.ids[i] == lap_id and self.lap_numbers[i] == lap_number:
+            return i
+        return None
+
+    def _take_suffix(self, start):
+        # Dépile jusqu'à `start` (pop restaure exactement les fenêtres d'allure)
+        suffix = []
+        while len(self) > start:
+            i = len(self) - 1
+            suffix.append((self.lap_numbers[i], self.rider(i), self.timestamps[i], self.durations[i], self.ids[i]))
+            self.pop()
+        return suffix
+
+    def _restore_suffix(self, suffix):
+        for lap_number, rider, timestamp, duration, lap_id in reversed(suffix):
+            self.append(lap_number, rider, timestamp, duration, lap_id)
+
+    def insert(self, lap_number, rider, timestamp, duration, lap_id):
+        """Insère un tour à sa place ; O(1) en fin de liste (cas courant), O(k) à k tours de la fin."""
+        if not self.lap_numbers or (lap_number, lap_id) > (self.lap_numbers[-1], self.ids[-1]):
+            self.append(lap_number, rider, timestamp, duration, lap_id)
+            return
+        suffix = self._take_suffix(self._position(lap_number, lap_id))
+        self.append(lap_number, rider, timestamp, duration, lap_id)
+        self._restore_suffix(suffix)
+
+    def remove(self, index):
+        """Retire le tour `index` ; O(k) à k tours de la fin."""
+        suffix = self._take_suffix(index)
+        suffix.pop()
+        self._restore_suffix(suffix)
+
+    def rider(self, index):
+        return self.riders.name(self.rider_ids[index])
+
+    def row(self, index):
+        """(lap_number, rider, lap_time, time_diff, lap_duration) formatés pour l'affichage."""
+        timestamp = self.timestamps[index]
+        return (
+            self.lap_numbers[index],
+            self.label or self.riders.name(self.rider_ids[index]),
+            "N/A" if math.isnan(timestamp) else format_secs_as_hhmmss(timestamp),
+            "N/A",
+            format_lap_duration(self.durations[index]),
+        )
+
+    def tail(self, n):
+        """Les n derniers tours, formatés."""
+        return [self.row(i) for i in range(max(len(self) - n, 0), len(self))]
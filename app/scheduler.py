@@ -0,0 +1,156 @@
+import math
+import time
+from collections import deque
+
+
+class RenderScheduler:
+    """
+    Ordonnanceur d'affichage pour la boucle Tk :
+    - ticks périodiques recalés sur l'horloge monotone (pas de dérive sur 24h,
+      contrairement à un after(1000) re-planifié après chaque exécution) ;
+    - request(callback) : plusieurs changements d'état dans le même tour de boucle
+      donnent un seul repaint, via un unique after_idle ;
+    - set_text(widget, text) : n'appelle .config que si le texte a changé.
+    """
+
+    def __init__(self, root, clock=time.monotonic):
+        self.root = root
+        self.clock = clock
+        self._pending = {}       # callbacks à exécuter au prochain idle (ordre conservé, sans doublon)
+        self._idle_scheduled = False
+        self._texts = {}         # id(widget) -> (widget, dernier texte appliqué)
+        self.config_calls = 0
+        self.config_skipped = 0
+        self.repaints = 0
+
+    # ============== Ticks ==============
+    def start_ticks(self, callback, period=1.0, origin=None):
+        """
+        Appelle callback() toutes les `period` secondes, aux instants origin + k * period
+        de l'horloge monotone. Chaque délai est recalculé depuis l'origine : un tick en
+        retard ne décale pas les suivants.
+        """
+        origin = self.clock() if origin is None else origin
+
+        def tick():
+            callback()
+            now = self.clock()
+            next_tick = origin + (math.floor((now - origin) / period) + 1) * period
+            self.root.after(max(1, math.ceil((next_tick - now) * 1000)), tick)
+
+        tick()
+
+    # ============== Repaint coalescé ==============
+    def request(self, callback):
+        self._pending[callback] = None
+        if not self._idle_scheduled:
+            self._idle_scheduled = True
+            self.root.after_idle(self.flush)
+
+    def flush(self):
+        self._idle_scheduled = False
+        pending, self._pending = self._pending, {}
+        for callback in pending:
+            callback()
+        if pending:
+            self.repaints += 1
+
+    # ============== Labels ==============
+    def set_text(self, widget, text):
+        key = id(widget)
+        cached = self._texts.get(key)
+        if cached is not None and cached[0] is widget and cached[1] == text:
+            self.config_skipped += 1
+            return False
+        widget.config(text=text)
+        self._texts[key] = (widget, text)
+        self.config_calls += 1
+        return True
+
+
+class FrameLoop:
+    """
+    Boucle d'animation à cadence cible (fps) pour un widget Tk. Chaque frame est
+    planifiée sur la grille origin + k / fps de l'horloge monotone : le temps passé
+    dans callback() et le retard de Tk ne s'accumulent pas, et une frame manquée
+    est sautée au lieu d'être rattrapée en rafale.
+
+    stats() donne les mesures des `window` dernières frames (intervalle réel,
+    durée du callback, frames sautées).
+    """
+
+    def __init__(self, widget, callback, fps=30.0, clock=time.monotonic, window=120):
+        self.widget = widget
+        self.callback = callback
+        self.period = 1.0 / fps
+        self.clock = clock
+        self.running = False
+        self.frames = 0
+        self.skipped = 0
+        self._origin = None
+        self._last = None
+        self._next_index = 0
+        self._after_id = None
+        self._intervals = deque(maxlen=window)
+        self._work = deque(maxlen=window)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._origin = self.clock()
+        self._last = None
+        self._next_index = 0
+        self._frame()
+
+    def stop(self):
+        self.running = False
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass  # widget déjà détruit
+            self._after_id = None
+
+    def _frame(self):
+        self._after_id = None
+        if not self.running:
+            return
+        t0 = self.clock()
+        if self._last is not None:
+            self._intervals.append(t0 - self._last)
+        self._last = t0
+        self.callback()
+        now = self.clock()
+        self._work.append(now - t0)
+        self.frames += 1
+        if not self.running:  # arrêtée par le callback
+            return
+
+        # Prochaine case de la grille encore dans le futur ; les cases dépassées sont sautées
+        index = max(self._next_index + 1, math.floor((now - self._origin) / self.period) + 1)
+        self.skipped += index - self._next_index - 1
+        self._next_index = index
+        delay = self._origin + index * self.period - now
+        self._after_id = self.widget.after(max(1, round(delay * 1000)), self._frame)
+
+    def stats(self):
+        intervals = self._intervals
+        work = self._work
+        if not intervals:
+            mean_interval = 0.0
+            jitter = 0.0
+        else:
+            mean_interval = sum(intervals) / len(intervals)
+            jitter = math.sqrt(sum((i - mean_interval) ** 2 for i in intervals) / len(intervals))
+        return {
+            "target_fps": 1.0 / self.period,
+            "fps": 1.0 / mean_interval if mean_interval else 0.0,
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "interval_ms": mean_interval * 1000,
+            "max_interval_ms": max(intervals, default=0.0) * 1000,
+            "jitter_ms": jitter * 1000,
+            "work_ms": (sum(work) / len(work) if work else 0.0) * 1000,
+            "max_work_ms": max(work, default=0.0) * 1000,
+        }
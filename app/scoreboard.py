@@ -0,0 +1,204 @@
+"""
+Tableau d'affichage en lecture seule pour les écrans des spectateurs (HTTP + Server-Sent Events).
+
+Le thread Tk construit un instantané JSON de la course (totaux, écart, temps en cours,
+moyennes, rouleur) à chaque changement d'état et à chaque seconde (Scoreboard.publish).
+Le corps est encodé une seule fois en bytes, immuable, puis servi tel quel à tous les
+clients : 50 écrans coûtent une construction par changement, pas une par requête.
+
+    GET /                 page HTML minimale (EventSource)
+    GET /scoreboard.json  dernier instantané (ETag par version, 304 si inchangé)
+    GET /events           flux SSE : un événement par nouvelle version, commentaire
+                          de maintien toutes les KEEPALIVE secondes sinon
+"""
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .db import LAP_TYPES
+
+DEFAULT_PORT = 8024
+KEEPALIVE = 15.0
+
+_PAGE = """<!DOCTYPE html>
+<html lang="fr"><head><meta charset="utf-8"><title>Chrono 24h</title>
+<style>body{font-family:Helvetica,sans-serif;background:#111;color:#eee;text-align:center}
+table{margin:auto;font-size:2em}td,th{padding:.2em 1em}#gap{font-size:1.8em;color:#f55}</style>
+</head><body><h1 id="elapsed">--:--:--</h1><p id="rider"></p><p id="gap"></p>
+<table><thead><tr><th></th><th>Tours</th><th>En cours</th><th>Moy. 5</th></tr></thead>
+<tbody id="groups"></tbody></table>
+<script>
+function hms(s){if(s===null)return"N/A";s=Math.floor(s);return new Date(s*1000).toISOString().substr(11,8)}
+new EventSource("events").onmessage=function(e){var d=JSON.parse(e.data),rows="";
+document.getElementById("elapsed").textContent=hms(d.elapsed);
+document.getElementById("rider").textContent="Rouleur actuel : "+d.current_rider;
+document.getElementById("gap").textContent=d.gap;
+for(var g in d.groups){var x=d.groups[g];rows+="<tr><th>"+g+"</th><td>"+x.total+"</td><td>"+hms(x.current)+"</td><td>"+hms(x.avg5)+"</td></tr>"}
+document.getElementById("groups").innerHTML=rows};
+</script></body></html>
+""".encode()
+
+
+def build_snapshot(engine):
+    """État affichable de la course (dict sérialisable), lu sur le thread Tk."""
+    elapsed = engine.elapsed()
+    groups = {}
+    for name in LAP_TYPES:
+        group = engine.groups[name]
+        laps = group.laps
+        current = engine.compute_current_lap_time(name)
+        groups[name] = {
+            "total": group.total,
+            "current": None if current is None else int(current),
+            "avg5": engine.compute_avg_of_last_5(name),
+            "last_lap": laps.durations[-1] if laps and math.isfinite(laps.durations[-1]) else None,
+            "diff": {other: engine.compute_diff_current(name, other) for other in LAP_TYPES if other != name},
+        }
+    return {
+        "started": engine.start_time is not None,
+        "elapsed": None if elapsed is None else int(elapsed),
+        "gap": engine.gap_text(),
+        "current_rider": engine.current_rouleur,
+        "queue": list(engine.next_rouleurs_queue),
+        "groups": groups,
+    }
+
+
+class Scoreboard:
+    """
+    Dernier instantané publié : (version, corps JSON en bytes). publish() ne crée une
+    nouvelle version que si le contenu a changé ; les threads HTTP ne font que lire la
+    référence courante et attendre la suivante (wait_for).
+    """
+
+    def __init__(self, engine, host="0.0.0.0", port=DEFAULT_PORT):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.builds = 0
+        self.served = 0
+        self._content = None
+        self._current = (0, b"{}")
+        self.boot = int(time.time())  # préfixe d'ETag : versions d'un lancement précédent invalides
+        self._cond = threading.Condition()
+        self._server = None
+        self._thread = None
+
+    # ============== Publication (thread Tk) ==============
+    def publish(self):
+        """Reconstruit l'instantané ; rend la version courante (inchangée si rien n'a bougé)."""
+        snapshot = build_snapshot(self.engine)
+        content = json.dumps(snapshot, sort_keys=True, ensure_ascii=False)
+        self.builds += 1
+        if content == self._content:
+            return self._current[0]
+        self._content = content
+        version = self._current[0] + 1
+        snapshot["version"] = version
+        snapshot["updated"] = round(time.time(), 3)
+        payload = json.dumps(snapshot, sort_keys=True, ensure_ascii=False).encode()
+        with self._cond:
+            self._current = (version, payload)
+            self._cond.notify_all()
+        return version
+
+    @property
+    def current(self):
+        return self._current
+
+    def wait_for(self, version, timeout=None):
+        """Premier instantané plus récent que `version` (ou le courant après timeout)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._current[0] > version or self._server is None, timeout)
+            return self._current
+
+    # ============== Serveur HTTP ==============
+    def start(self):
+        handler = type("ScoreboardHandler", (_Handler,), {"scoreboard": self})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="scoreboard", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        server, self._server = self._server, None
+        with self._cond:
+            self._cond.notify_all()   # libère les flux SSE en attente
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._server is not None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    scoreboard = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # pas de ligne par requête dans le terminal de course
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/scoreboard.json":
+            self.send_snapshot()
+        elif path == "/events":
+            self.send_events()
+        elif path in ("/", "/index.html"):
+            self.send_body(_PAGE, "text/html; charset=utf-8")
+        else:
+            self.send_error(404)
+
+    def send_body(self, body, content_type, headers=()):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_snapshot(self):
+        version, payload = self.scoreboard.current
+        etag = f'"{self.scoreboard.boot}-{version}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.scoreboard.served += 1
+        self.send_body(payload, "application/json", (("ETag", etag), ("Cache-Control", "no-cache")))
+
+    def send_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        scoreboard = self.scoreboard
+        version, payload = scoreboard.current
+        try:
+            while scoreboard.running:
+                if version:
+                    scoreboard.served += 1
+                    self.wfile.write(b"id: %d\ndata: %s\n\n" % (version, payload))
+                else:
+                    self.wfile.write(b": attente\n\n")
+                self.wfile.flush()
+                seen = version
+                version, payload = scoreboard.wait_for(seen, KEEPALIVE)
+                while version == seen and scoreboard.running:
+                    self.wfile.write(b": ping\n\n")
+                    self.wfile.flush()
+                    version, payload = scoreboard.wait_for(seen, KEEPALIVE)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
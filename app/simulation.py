@@ -1,20 +1,61 @@
 import tkinter as tk
-import time
-import json
+
+from .clock import MonotonicClock
+from .scheduler import FrameLoop
+from .track import load_track
+
+# Écart maximal (pixels) entre le tracé dessiné et le tracé complet
+DRAW_TOLERANCE = 0.5
+# Groupes suivis par la carte en direct et couleur de leur marqueur
+LIVE_MARKERS = {"Vélo 1": "red", "Peloton": "green", "TMA": "orange"}
+
 
 class SimulationManager:
-    def __init__(self, app):
+    def __init__(self, app, clock=None, fps=30.0):
         self.app = app
+        self.clock = clock or MonotonicClock()
+        self.fps = fps
         self.simulation_running = False  # Indicateur de l'état de la simulation
         self.start_time = None
         self.duration_seconds = 240.0  # 4 min par défaut
+        self.loop = None
+
+        # Tracé chargé au premier usage (cache binaire, voir track.load_track)
+        self._track_levels = None
+        self._track_loaded = False
+
+    @property
+    def track_levels(self):
+        if not self._track_loaded:
+            self._track_loaded = True
+            self._track_levels = load_track()
+            if self._track_levels is None:
+                print("Fichier coordinates_transformed.json introuvable.")
+        return self._track_levels
 
-        try:
-            with open("data/coordinates_transformed.json", "r") as f:
-                self.coordinates = json.load(f)
-        except FileNotFoundError:
-            self.coordinates = []
-            print("Fichier coordinates_transformed.json introuvable.")
+    @property
+    def track(self):
+        """Tracé pleine résolution (positions des marqueurs), None sans fichier de coordonnées."""
+        levels = self.track_levels
+        return levels.full if levels else None
+
+    def open_window(self, title):
+        """Fenêtre carte : tracé (une polyligne), canvas et ligne de stats d'animation."""
+        self.win = tk.Toplevel(self.app.root)
+        self.win.title(title)
+
+        # Pour détecter la fermeture -> on repasse simulation_running à False
+        self.win.protocol("WM_DELETE_WINDOW", self.on_close_window)
+
+        self.canvas = tk.Canvas(self.win, width=400, height=400, bg="white")
+        self.canvas.pack()
+        self.stats_label = tk.Label(self.win, text="", font=("Helvetica", 8), fg="gray")
+        self.stats_label.pack(anchor="e")
+
+        # Trace le parcours : une seule polyligne (un item canvas pour tout le tracé),
+        # au niveau de détail invisible à l'écran (écart < DRAW_TOLERANCE pixel)
+        outline = self.track_levels.lod(DRAW_TOLERANCE)
+        self.canvas.create_line(*(c for point in outline.points() for c in point), fill="blue")
 
     def start_simulation(self, duration=None):
         """
@@ -27,65 +68,107 @@ class SimulationManager:
 
         if duration is not None:
             self.duration_seconds = duration
-        if not self.coordinates:
+        if self.track is None:
             return
 
         # Crée/rouvre la fenêtre
         self.simulation_running = True
-        self.start_time = time.time()
-
-        self.win = tk.Toplevel(self.app.root)
-        self.win.title("Simulation")
-
-        # Pour détecter la fermeture -> on repasse simulation_running à False
-        self.win.protocol("WM_DELETE_WINDOW", self.on_close_window)
-
-        self.canvas = tk.Canvas(self.win, width=400, height=400, bg="white")
-        self.canvas.pack()
+        self.start_time = self.clock()
 
-        # Trace le parcours
-        for i in range(1, len(self.coordinates)):
-            self.canvas.create_line(
-                self.coordinates[i - 1][0], self.coordinates[i - 1][1],
-                self.coordinates[i][0], self.coordinates[i][1],
-                fill="blue"
-            )
+        self.open_window("Simulation")
 
         # Crée le point rouge
-        if self.coordinates:
-            x0, y0 = self.coordinates[0]
-            self.dot = self.canvas.create_oval(x0-5, y0-5, x0+5, y0+5, fill="red")
-        else:
-            self.dot = None
+        x0, y0 = self.track.position(0.0)
+        self.dot = self.canvas.create_oval(x0-5, y0-5, x0+5, y0+5, fill="red")
 
-        self.update_simulation()
+        # Animation à cadence fixe, recalée sur l'horloge (voir FrameLoop)
+        self.loop = FrameLoop(self.win, self.update_simulation, fps=self.fps, clock=self.clock)
+        self.loop.start()
 
     def update_simulation(self):
-        if not self.simulation_running or not self.coordinates:
+        if not self.simulation_running:
             return
 
-        elapsed = time.time() - self.start_time
+        elapsed = self.clock() - self.start_time
         total = self.duration_seconds
         progress = elapsed / total
 
         if progress < 1.0:
-            index = int(progress * len(self.coordinates))
-            if index >= len(self.coordinates):
-                index = len(self.coordinates) - 1
-            x, y = self.coordinates[index]
-            if self.dot:
-                self.canvas.coords(self.dot, x-5, y-5, x+5, y+5)
-            self.win.after(50, self.update_simulation)
+            x, y = self.track.position(progress)
+            self.canvas.coords(self.dot, x-5, y-5, x+5, y+5)
+            if self.loop.frames % round(self.fps) == 0:
+                self.show_frame_stats()
         else:
             # Fin de la simulation
+            self.loop.stop()
             self.simulation_running = False
             self.app.simulation_active = False  # Mise à jour de l'état dans l'application
 
+    # ============== Carte en direct ==============
+    def start_live(self):
+        """
+        Carte en direct : un marqueur par groupe (Vélo 1, Peloton, TMA), placé d'après
+        le temps écoulé dans son tour et son allure récente (RaceEngine.lap_progress).
+        """
+        if self.simulation_running or self.track is None:
+            return
+        self.simulation_running = True
+        self.app.simulation_active = True
+        self.open_window("Carte en direct")
+
+        x0, y0 = self.track.position(0.0)
+        self.live_groups = list(LIVE_MARKERS)
+        self.markers = []
+        for name in self.live_groups:
+            color = LIVE_MARKERS[name]
+            dot = self.canvas.create_oval(x0-6, y0-6, x0+6, y0+6, fill=color, outline="white")
+            label = self.canvas.create_text(x0, y0-12, text=name, fill=color, font=("Helvetica", 8, "bold"))
+            self.markers.append((dot, label))
+        self._marker_states = [None] * len(self.markers)
+
+        self.loop = FrameLoop(self.win, self.update_live, fps=self.fps, clock=self.clock)
+        self.loop.start()
+
+    def update_live(self):
+        if not self.simulation_running:
+            return
+        engine = self.app.core.engine
+        # Une passe pour tous les groupes : fractions puis positions (Track.positions)
+        fractions = engine.lap_progress(self.live_groups)
+        positions = self.track.positions([f or 0.0 for f in fractions])
+        coords = self.canvas.coords
+        states = self._marker_states
+        for i, ((dot, label), fraction, (x, y)) in enumerate(zip(self.markers, fractions, positions)):
+            coords(dot, x-6, y-6, x+6, y+6)
+            coords(label, x, y-12)
+            # Marqueur masqué tant que le groupe n'a pas d'allure (itemconfigure seulement au changement)
+            state = "hidden" if fraction is None else "normal"
+            if states[i] != state:
+                self.canvas.itemconfigure(dot, state=state)
+                self.canvas.itemconfigure(label, state=state)
+                states[i] = state
+        if self.loop.frames % round(self.fps) == 0:
+            self.show_frame_stats()
+
+    def frame_stats(self):
+        """Mesures de la boucle d'animation (voir FrameLoop.stats), None hors simulation."""
+        return self.loop.stats() if self.loop else None
+
+    def show_frame_stats(self):
+        stats = self.loop.stats()
+        self.stats_label.config(
+            text=f"{stats['fps']:.1f}/{stats['target_fps']:.0f} i/s — "
+                 f"frame {stats['work_ms']:.1f} ms (max {stats['max_work_ms']:.1f}), "
+                 f"gigue {stats['jitter_ms']:.1f} ms, {stats['skipped']} sautées"
+        )
+
     def on_close_window(self):
         """
         Appelé quand on ferme la fenêtre simulation. On repasse la variable
         simulation_running à False pour autoriser un nouveau lancement.
         """
+        if self.loop:
+            self.loop.stop()
         self.simulation_running = False
         self.app.simulation_active = False  # Mise à jour de l'état dans l'application
         self.win.destroy()
@@ -0,0 +1,372 @@
+import heapq
+import math
+from array import array
+from collections import Counter
+
+from .db import LAP_TYPES, fetch_lap_durations, fetch_stats_for_all, fetch_stats_per_rider
+
+
+class RunningAggregate:
+    """
+    count / somme / somme des carrés / min / max d'une série de durées,
+    mis à jour à chaque ajout ou retrait sans relire les données.
+    Min et max sont tenus dans deux tas avec suppression paresseuse :
+    un retrait est O(1), la lecture du min/max purge les valeurs retirées.
+    """
+
+    __slots__ = ("rows", "count", "total", "total_sq",
+                 "_min_heap", "_max_heap", "_min_removed", "_max_removed")
+
+    def __init__(self):
+        self.rows = 0        # COUNT(*) : lignes, y compris durée inconnue
+        self.count = 0       # durées connues
+        self.total = 0.0
+        self.total_sq = 0.0
+        self._min_heap = []
+        self._max_heap = []
+        self._min_removed = Counter()
+        self._max_removed = Counter()
+
+    def add(self, duration):
+        self.rows += 1
+        if duration is None:
+            return
+        self.count += 1
+        self.total += duration
+        self.total_sq += duration * duration
+        heapq.heappush(self._min_heap, duration)
+        heapq.heappush(self._max_heap, -duration)
+
+    def remove(self, duration):
+        self.rows -= 1
+        if duration is None:
+            return
+        self.count -= 1
+        if self.count == 0:
+            # Plus aucune valeur : on repart de zéro (évite aussi la dérive des flottants)
+            self.total = self.total_sq = 0.0
+            self._min_heap.clear()
+            self._max_heap.clear()
+            self._min_removed.clear()
+            self._max_removed.clear()
+            return
+        self.total -= duration
+        self.total_sq -= duration * duration
+        self._min_removed[duration] += 1
+        self._max_removed[-duration] += 1
+
+    @staticmethod
+    def _top(heap, removed):
+        while heap:
+            value = heap[0]
+            pending = removed.get(value)
+            if not pending:
+                return value
+            heapq.heappop(heap)
+            if pending == 1:
+                del removed[value]
+            else:
+                removed[value] = pending - 1
+        return None
+
+    @property
+    def min(self):
+        return self._top(self._min_heap, self._min_removed)
+
+    @property
+    def max(self):
+        top = self._top(self._max_heap, self._max_removed)
+        return -top if top is not None else None
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return 0.0
+        mean = self.total / self.count
+        return max(self.total_sq / self.count - mean * mean, 0.0)
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+
+class AggregateStore:
+    """
+    Agrégats des durées de tours par groupe et par (groupe, rider), tenus à jour
+    par le RaceEngine à chaque enregistrement / annulation / modification / suppression.
+    La fenêtre de statistiques les lit directement au lieu de refaire les GROUP BY.
+
+    invalidate() marque les agrégats comme périmés : les mises à jour sont ignorées
+    et la première lecture refait rebuild() (reprise de course sans scan au démarrage).
+    """
+
+    def __init__(self):
+        self.groups = {}
+        self.riders = {}
+        self.stale = False
+
+    def clear(self):
+        self.groups.clear()
+        self.riders.clear()
+
+    def _group(self, lap_type):
+        agg = self.groups.get(lap_type)
+        if agg is None:
+            agg = self.groups[lap_type] = RunningAggregate()
+        return agg
+
+    def _rider(self, lap_type, rider_name):
+        key = (lap_type, rider_name)
+        agg = self.riders.get(key)
+        if agg is None:
+            agg = self.riders[key] = RunningAggregate()
+        return agg
+
+    def invalidate(self):
+        self.clear()
+        self.stale = True
+
+    def _ensure(self):
+        if self.stale:
+            self.rebuild()
+
+    def add(self, lap_type, rider_name, duration):
+        if self.stale:
+            return
+        self._group(lap_type).add(duration)
+        self._rider(lap_type, rider_name).add(duration)
+
+    def remove(self, lap_type, rider_name, duration):
+        if self.stale:
+            return
+        self._group(lap_type).remove(duration)
+        agg = self._rider(lap_type, rider_name)
+        agg.remove(duration)
+        if agg.rows <= 0:
+            del self.riders[(lap_type, rider_name)]
+
+    def change_rider(self, lap_type, old_rider, new_rider, duration):
+        if old_rider == new_rider or self.stale:
+            return
+        self.remove(lap_type, old_rider, duration)
+        self.add(lap_type, new_rider, duration)
+
+    def rebuild(self):
+        """Reconstruit tous les agrégats depuis la base (une seule passe, au démarrage)."""
+        self.clear()
+        self.stale = False
+        for lap_type, rider_name, duration in fetch_lap_durations():
+            self.add(lap_type, rider_name, duration)
+
+    # -------------- Lecture (mêmes formes que fetch_stats_*) --------------
+    def group_stats(self, lap_type):
+        """(moyenne, min, nombre de tours) ; 0 quand il n'y a rien, comme la version SQL."""
+        self._ensure()
+        agg = self.groups.get(lap_type)
+        if agg is None or agg.rows == 0:
+            return (0, 0, 0)
+        return (agg.mean or 0, agg.min or 0, agg.rows)
+
+    def stats_for_all(self):
+        return self.group_stats(LAP_TYPES[0]) + self.group_stats(LAP_TYPES[1])
+
+    def stats_per_rider(self, lap_type=LAP_TYPES[0]):
+        self._ensure()
+        rows = []
+        for (typ, rider_name), agg in self.riders.items():
+            if typ == lap_type and agg.rows > 0:
+                rows.append((rider_name, agg.rows, agg.mean, agg.min))
+        rows.sort(key=lambda r: (r[0] is not None, r[0] or ""))
+        return rows
+
+    def verify_against_db(self, tolerance=1e-6):
+        """
+        Compare les agrégats aux requêtes SQL (fetch_stats_for_all / fetch_stats_per_rider).
+        Rend la liste des écarts trouvés (vide si tout est cohérent).
+        """
+        def close(a, b):
+            if a is None or b is None:
+                return a == b
+            return abs(float(a) - float(b)) <= tolerance * max(1.0, abs(float(b)))
+
+        mismatches = []
+        for name, ours, sql in zip(
+            ("avg_bike1", "min_bike1", "count_bike1", "avg_peloton", "min_peloton", "count_peloton"),
+            self.stats_for_all(),
+            fetch_stats_for_all()
+        ):
+            if not close(ours, sql):
+                mismatches.append((name, ours, sql))
+
+        ours_riders = {r[0]: r[1:] for r in self.stats_per_rider()}
+        sql_riders = {r[0]: r[1:] for r in fetch_stats_per_rider()}
+        for rider_name in set(ours_riders) | set(sql_riders):
+            ours = ours_riders.get(rider_name)
+            sql = sql_riders.get(rider_name)
+            if ours is None or sql is None or not all(close(a, b) for a, b in zip(ours, sql)):
+                mismatches.append((rider_name, ours, sql))
+        return mismatches
+
+
+class RollingPace:
+    """
+    Allures glissantes d'un groupe, sur les durées brutes (float, secondes) :
+    moyenne des N derniers tours (windows), moyenne des tours des X dernières
+    secondes (time_windows) et moyenne exponentielle (EWMA, coefficient alpha).
+    Tout est mis à jour en O(1) amorti par push() / pop(), jamais à l'affichage.
+    Un tour sans fin connue (timestamp NaN : tour manuel avant le départ) n'entre
+    dans aucune fenêtre de temps ; un tour de durée inconnue (NaN) n'entre dans
+    aucune moyenne, il occupe seulement sa place dans les N derniers.
+    """
+
+    def __init__(self, windows=(5, 10), time_windows=(1800.0,), alpha=0.3):
+        self.alpha = alpha
+        self.timestamps = array("d")   # fin du tour, en secondes depuis le départ
+        self.durations = array("d")
+        self._ewmas = array("d")
+        self._sums = {n: 0.0 for n in windows}
+        self._counts = {n: 0 for n in windows}   # durées connues dans la fenêtre
+        self._time_sums = {s: 0.0 for s in time_windows}
+        self._time_counts = {s: 0 for s in time_windows}
+        self._time_starts = {s: 0 for s in time_windows}  # index du plus ancien tour dans la fenêtre
+        # Début de fenêtre avant chaque push : pop() le restaure exactement,
+        # même quand les fins de tours ne sont pas croissantes (tours modifiés / manuels)
+        self._time_history = {s: array("i") for s in time_windows}
+
+    def __len__(self):
+        return len(self.durations)
+
+    def clear(self):
+        del self.timestamps[:]
+        del self.durations[:]
+        del self._ewmas[:]
+        for n in self._sums:
+            self._sums[n] = 0.0
+            self._counts[n] = 0
+        for s in self._time_sums:
+            self._time_sums[s] = 0.0
+            self._time_counts[s] = 0
+            self._time_starts[s] = 0
+            del self._time_history[s][:]
+
+    def push(self, timestamp, duration):
+        durations = self.durations
+        timestamps = self.timestamps
+        durations.append(duration)
+        timestamps.append(timestamp)
+        length = len(durations)
+
+        known = math.isfinite(duration)
+        for n in self._sums:
+            if known:
+                self._sums[n] += duration
+                self._counts[n] += 1
+            if length > n and math.isfinite(durations[length - n - 1]):
+                self._sums[n] -= durations[length - n - 1]
+                self._counts[n] -= 1
+
+        timed = math.isfinite(timestamp)
+        for s in self._time_sums:
+            lo = self._time_starts[s]
+            self._time_history[s].append(lo)
+            if not timed:
+                continue
+            total = self._time_sums[s]
+            count = self._time_counts[s]
+            if known:
+                total += duration
+                count += 1
+            cutoff = timestamp - s
+            # `not >=` : les fins NaN sortent aussi (NaN < x est toujours faux)
+            while not timestamps[lo] >= cutoff:
+                if math.isfinite(timestamps[lo]) and math.isfinite(durations[lo]):
+                    total -= durations[lo]
+                    count -= 1
+                lo += 1
+            self._time_sums[s] = total
+            self._time_counts[s] = count
+            self._time_starts[s] = lo
+
+        prev = self._ewmas[-1] if self._ewmas else math.nan
+        if not known:
+            self._ewmas.append(prev)
+        elif math.isnan(prev):
+            self._ewmas.append(duration)
+        else:
+            self._ewmas.append(self.alpha * duration + (1 - self.alpha) * prev)
+
+    def pop(self):
+        """Retire le dernier tour (annulation) et restaure les fenêtres telles qu'avant."""
+        if not self.durations:
+            return None
+        durations = self.durations
+        timestamps = self.timestamps
+        duration = durations.pop()
+        timestamp = timestamps.pop()
+        self._ewmas.pop()
+        length = len(durations)
+
+        known = math.isfinite(duration)
+        for n in self._sums:
+            if length == 0:
+                self._sums[n] = 0.0
+                self._counts[n] = 0
+                continue
+            if known:
+                self._sums[n] -= duration
+                self._counts[n] -= 1
+            # Le tour sorti de la fenêtre lors du push correspondant y revient
+            if length >= n and math.isfinite(durations[length - n]):
+                self._sums[n] += durations[length - n]
+                self._counts[n] += 1
+
+        timed = math.isfinite(timestamp)
+        for s in self._time_sums:
+            # Les tours sortis de la fenêtre lors du push correspondant y reviennent
+            lo = self._time_history[s].pop()
+            if length:
+                total = self._time_sums[s]
+                count = self._time_counts[s]
+                if timed and known:
+                    total -= duration
+                    count -= 1
+                for i in range(lo, min(self._time_starts[s], length)):
+                    if math.isfinite(timestamps[i]) and math.isfinite(durations[i]):
+                        total += durations[i]
+                        count += 1
+            else:
+                total, count = 0.0, 0
+            self._time_sums[s] = total
+            self._time_counts[s] = count
+            self._time_starts[s] = lo
+        return duration
+
+    def rebuild(self, laps):
+        """laps : itérable de (timestamp, durée)."""
+        self.clear()
+        for timestamp, duration in laps:
+            self.push(timestamp, duration)
+
+    def mean_last(self, n):
+        """Moyenne des durées connues parmi les n derniers tours (n doit faire partie de `windows`)."""
+        count = self._counts[n]
+        if not count:
+            return None
+        return self._sums[n] / count
+
+    def mean_over(self, seconds):
+        """Moyenne des tours terminés dans les `seconds` dernières secondes (fenêtre configurée)."""
+        count = self._time_counts[seconds]
+        if count <= 0:
+            return None
+        return self._time_sums[seconds] / count
+
+    @property
+    def ewma(self):
+        if not self._ewmas or math.isnan(self._ewmas[-1]):
+            return None
+        return self._ewmas[-1]
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import math
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+
+COORDINATES_PATH = "data/coordinates_transformed.json"
+# Niveaux de détail précalculés (tolérance Douglas-Peucker, en unités du tracé / pixels)
+LOD_TOLERANCES = (0.5, 1.0, 2.0, 4.0)
+
+_MAGIC = b"TRK1"
+_HEADER = struct.Struct("<4sqq20sI")   # magic, mtime_ns, taille, sha1 de la source, nb de niveaux
+_LEVEL = struct.Struct("<dI")          # tolérance, nb de points (suivis des colonnes x, y, cum)
+
+
+class Track:
+    """
+    Circuit paramétré par l'abscisse curviligne : la table des distances cumulées
+    (cum[i] = longueur du tracé jusqu'au point i) permet de placer n'importe quelle
+    fraction de tour par recherche dichotomique + interpolation linéaire, en O(log n),
+    indépendamment de la densité des points.
+
+    Le tracé est fermé (dernier point relié au premier) sauf closed=False.
+    """
+
+    __slots__ = ("xs", "ys", "cum", "length")
+
+    def __init__(self, points, closed=True):
+        self._build(array("d", (p[0] for p in points)), array("d", (p[1] for p in points)), closed)
+
+    @classmethod
+    def from_arrays(cls, xs, ys, closed=True):
+        track = cls.__new__(cls)
+        track._build(array("d", xs), array("d", ys), closed)
+        return track
+
+    @classmethod
+    def from_columns(cls, xs, ys, cum):
+        """Tracé déjà construit (colonnes lues du cache binaire) : aucun calcul."""
+        track = cls.__new__(cls)
+        track.xs, track.ys, track.cum = xs, ys, cum
+        track.length = cum[-1] if len(cum) else 0.0
+        return track
+
+    def _build(self, xs, ys, closed):
+        if closed and len(xs) > 1 and (xs[0], ys[0]) != (xs[-1], ys[-1]):
+            xs.append(xs[0])
+            ys.append(ys[0])
+        cum = array("d", [0.0] * len(xs))
+        for i in range(1, len(xs)):
+            cum[i] = cum[i - 1] + math.hypot(xs[i] - xs[i - 1], ys[i] - ys[i - 1])
+        self.xs = xs
+        self.ys = ys
+        self.cum = cum
+        self.length = cum[-1] if len(cum) else 0.0
+
+    def __len__(self):
+        return len(self.xs)
+
+    def points(self):
+        """(x, y) des sommets, tracé fermé compris."""
+        return list(zip(self.xs, self.ys))
+
+    def position(self, fraction):
+        """(x, y) à `fraction` de tour (ramenée dans [0, 1[ : 1.25 => 0.25)."""
+        return self.positions((fraction,))[0]
+
+    def positions(self, fractions):
+        """
+        Version groupée de position() : un seul appel pour tous les marqueurs d'une frame
+        (variables locales liées une fois, pas d'appel de méthode par point).
+        """
+        xs, ys, cum, length = self.xs, self.ys, self.cum, self.length
+        last = len(cum) - 1
+        if last < 1 or length <= 0.0:
+            origin = (xs[0], ys[0]) if len(xs) else (0.0, 0.0)
+            return [origin for _ in fractions]
+
+        out = []
+        for fraction in fractions:
+            distance = (fraction % 1.0) * length
+            i = bisect_right(cum, distance, 1, last) - 1
+            start = cum[i]
+            span = cum[i + 1] - start
+            t = (distance - start) / span if span else 0.0
+            out.append((xs[i] + (xs[i + 1] - xs[i]) * t, ys[i] + (ys[i + 1] - ys[i]) * t))
+        return out
+
+
+# ============== Simplification ==============
+def simplify(xs, ys, tolerance):
+    """
+    Douglas-Peucker (itératif) : indices des points à garder pour que le tracé simplifié
+    ne s'écarte jamais de plus de `tolerance` du tracé d'origine. Extrémités toujours gardées.
+    """
+    n = len(xs)
+    if n < 3:
+        return list(range(n))
+    keep = bytearray(n)
+    keep[0] = keep[n - 1] = 1
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xs[first], ys[first]
+        dx, dy = xs[last] - ax, ys[last] - ay
+        norm = math.hypot(dx, dy)
+        worst, index = -1.0, None
+        for i in range(first + 1, last):
+            if norm:
+                d = abs(dy * (xs[i] - ax) - dx * (ys[i] - ay)) / norm
+            else:
+                d = math.hypot(xs[i] - ax, ys[i] - ay)
+            if d > worst:
+                worst, index = d, i
+        if index is not None and worst > tolerance:
+            keep[index] = 1
+            stack.append((first, index))
+            stack.append((index, last))
+    return [i for i in range(n) if keep[i]]
+
+
+# ============== Cache binaire ==============
+class TrackLevels:
+    """Tracé pleine résolution (levels[0.0]) et niveaux simplifiés, indexés par tolérance."""
+
+    def __init__(self, levels):
+        self.levels = levels
+
+    @property
+    def full(self):
+        return self.levels[0.0]
+
+    def lod(self, tolerance):
+        """Niveau le plus simplifié dont la tolérance ne dépasse pas celle demandée."""
+        best = 0.0
+        for level in self.levels:
+            if best < level <= tolerance:
+                best = level
+        return self.levels[best]
+
+
+def _sha1(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).digest()
+
+
+def compile_track(source=COORDINATES_PATH, cache=None, tolerances=LOD_TOLERANCES):
+    """
+    JSON [[x, y], ...] => fichier binaire `cache` (par défaut source + ".bin") :
+    en-tête (mtime, taille et SHA-1 de la source) puis, par niveau de détail, les
+    colonnes x, y et distances cumulées du tracé fermé en float64 brut (array('d')).
+    Rend les TrackLevels construits.
+    """
+    cache = cache or source + ".bin"
+    with open(source, "rb") as f:
+        raw = f.read()
+    points = json.loads(raw)
+    xs = array("d", (p[0] for p in points))
+    ys = array("d", (p[1] for p in points))
+
+    levels = {0.0: Track.from_arrays(xs, ys)}
+    for tolerance in tolerances:
+        kept = simplify(xs, ys, tolerance)
+        levels[tolerance] = Track.from_arrays((xs[i] for i in kept), (ys[i] for i in kept))
+
+    stat = os.stat(source)
+    try:
+        tmp = cache + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, stat.st_mtime_ns, stat.st_size, hashlib.sha1(raw).digest(), len(levels)))
+            for tolerance, track in levels.items():
+                f.write(_LEVEL.pack(tolerance, len(track)))
+                for column in (track.xs, track.ys, track.cum):
+                    f.write(column.tobytes())
+        os.replace(tmp, cache)
+    except OSError as e:
+        # Dossier en lecture seule : on garde le résultat en mémoire
+        print(f"Cache du tracé non écrit ({e})", file=sys.stderr)
+    return TrackLevels(levels)
+
+
+def _read_cache(cache, source):
+    """TrackLevels depuis le cache s'il correspond encore à la source, sinon None."""
+    try:
+        with open(cache, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < _HEADER.size:
+        return None
+    magic, mtime_ns, size, digest, count = _HEADER.unpack_from(data)
+    if magic != _MAGIC or array("d").itemsize != 8 or sys.byteorder != "little":
+        return None
+    stat = os.stat(source)
+    if (mtime_ns, size) != (stat.st_mtime_ns, stat.st_size):
+        # Source touchée : on ne garde le cache que si le contenu est identique (SHA-1)
+        if digest != _sha1(source):
+            return None
+        try:
+            with open(cache, "r+b") as f:
+                f.write(_HEADER.pack(_MAGIC, stat.st_mtime_ns, stat.st_size, digest, count))
+        except OSError:
+            pass
+
+    levels = {}
+    offset = _HEADER.size
+    try:
+        for _ in range(count):
+            tolerance, n = _LEVEL.unpack_from(data, offset)
+            offset += _LEVEL.size
+            columns = []
+            for _ in range(3):
+                column = array("d")
+                column.frombytes(data[offset:offset + 8 * n])
+                offset += 8 * n
+                if len(column) != n:
+                    return None
+                columns.append(column)
+            levels[tolerance] = Track.from_columns(*columns)
+    except (struct.error, ValueError):
+        return None
+    return TrackLevels(levels) if 0.0 in levels else None
+
+
+def load_track(source=COORDINATES_PATH, cache=None):
+    """
+    Tracé et niveaux de détail : lus depuis le cache binaire s'il est à jour (mtime/taille,
+    sinon SHA-1), recompilés depuis le JSON sinon. None si la source n'existe pas.
+    """
+    if not os.path.exists(source):
+        return None
+    cache = cache or source + ".bin"
+    return _read_cache(cache, source) or compile_track(source, cache)
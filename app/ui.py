@@ -1,25 +1,57 @@
+import sys
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, BooleanVar
 
+from .clock import MonotonicClock
 from .core import CyclingCore
-from .simulation import SimulationManager
 from .utils import format_lap_duration
 
 class CyclingEventApp:
-    def __init__(self, root):
+    def __init__(self, root, instrument_ms=None, ingest_port=None, scoreboard_port=None):
         self.root = root
         self.root.title("Chronomètre 24h - Vélo du Bois de la Cambre")
         self.root.geometry("1200x700")
 
-        self.core = CyclingCore(self)
-        self.simulation = SimulationManager(self)
+        self.clock = MonotonicClock()
+        self.core = CyclingCore(self, clock=self.clock)
+        self._simulation = None  # voir la propriété simulation
         self.simulation_active = False
 
+        # Instrumentation optionnelle : avant build_ui, pour que les boutons gardent les méthodes enveloppées
+        self.instrumentation = None
+        if instrument_ms is not None:
+            from .instrument import Instrumentation
+            self.instrumentation = Instrumentation(threshold_ms=instrument_ms)
+            self.instrumentation.instrument_core(self.core)
+
         # Construction de l'interface
         self.build_ui()
 
         # Lancement de la mise à jour du chrono
         self.core.update_timer()
+        # Base et reprise de course après le premier rendu (les tâches idle de Tk,
+        # dont l'affichage des widgets, passent dans l'ordre)
+        self.root.after_idle(self.core.load)
+        # Réception des tours des autres postes (chronométreurs sur le réseau local)
+        if ingest_port is not None:
+            self.core.start_ingest(ingest_port)
+        # Tableau d'affichage HTTP / SSE pour les écrans des spectateurs
+        if scoreboard_port is not None:
+            self.core.start_scoreboard(scoreboard_port)
+
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.bind("<Control-z>", lambda e: self.core.undo_last_lap())
+        self.root.bind("<Control-y>", lambda e: self.core.redo_last_lap())
+
+    @property
+    def simulation(self):
+        """SimulationManager (et son tracé) importé et créé au premier usage."""
+        if self._simulation is None:
+            from .simulation import SimulationManager
+            self._simulation = SimulationManager(self, clock=self.clock)
+            if self.instrumentation is not None:
+                self.instrumentation.instrument_simulation(self._simulation)
+        return self._simulation
 
     def build_ui(self):
         # ===============================
@@ -81,11 +113,14 @@ class CyclingEventApp:
         undo_button = ttk.Button(button_frame, text="Annuler Dernier Tour", command=self.core.undo_last_lap)
         undo_button.grid(row=0, column=5, padx=5)
 
+        redo_button = ttk.Button(button_frame, text="Rétablir", command=self.core.redo_last_lap)
+        redo_button.grid(row=0, column=6, padx=5)
+
         reset_button = ttk.Button(button_frame, text="Réinitialiser", command=self.core.reset_laps)
-        reset_button.grid(row=0, column=6, padx=5)
+        reset_button.grid(row=0, column=7, padx=5)
 
         manage_button = ttk.Button(button_frame, text="Gérer Tours", command=self.core.open_lap_management_window)
-        manage_button.grid(row=0, column=7, padx=5)
+        manage_button.grid(row=0, column=8, padx=5)
 
         # ===============================
         # Section 3 : Sélection du Rider + File d'attente (Réorganisée et centrée)
@@ -205,8 +240,11 @@ class CyclingEventApp:
         export_button = ttk.Button(bottom_frame, text="Exporter CSV", command=self.core.export_csv)
         export_button.grid(row=0, column=1, padx=5)
 
+        import_button = ttk.Button(bottom_frame, text="Importer", command=self.core.import_laps)
+        import_button.grid(row=0, column=2, padx=5)
+
         sim_frame = ttk.Labelframe(bottom_frame, text="Simulation", padding=10)
-        sim_frame.grid(row=0, column=2, padx=10)
+        sim_frame.grid(row=0, column=3, padx=10)
 
         ttk.Label(sim_frame, text="Durée (min, secondes) :").grid(row=0, column=0, padx=5)
         self.sim_duration_entry = ttk.Entry(sim_frame, width=7)
@@ -216,6 +254,13 @@ class CyclingEventApp:
         sim_button = ttk.Button(sim_frame, text="Démarrer", command=self.start_sim_with_duration)
         sim_button.grid(row=0, column=2, padx=5)
 
+        live_button = ttk.Button(sim_frame, text="Carte en direct", command=self.start_live_map)
+        live_button.grid(row=0, column=3, padx=5)
+
+        if self.instrumentation is not None:
+            diag_button = ttk.Button(bottom_frame, text="Diagnostics", command=self.open_diagnostics_window)
+            diag_button.grid(row=0, column=4, padx=5)
+
     def build_table_with_header(self, parent_frame, type_label):
         # En-tête du tableau
         header_frame = ttk.Frame(parent_frame)
@@ -225,7 +270,7 @@ class CyclingEventApp:
                                   font=("Helvetica", 14, "bold"))
         label_current.pack(anchor="w")
 
-        label_avg5 = ttk.Label(header_frame, text="Moyenne (5 derniers): N/A",
+        label_avg5 = ttk.Label(header_frame, text="Moyenne (5 derniers): N/A  |  30 min: N/A",
                                font=("Helvetica", 10))
         label_avg5.pack(anchor="w")
 
@@ -329,5 +374,51 @@ class CyclingEventApp:
             except ValueError:
                 messagebox.showerror("Erreur", "Veuillez entrer un nombre valide ou une durée au format 'minutes:secondes'.")
 
+    def start_live_map(self):
+        if self.simulation_active:
+            messagebox.showwarning("Erreur", "Une simulation est déjà en cours.")
+            return
+        self.simulation.start_live()
+
+    def open_diagnostics_window(self):
+        """Rapport d'instrumentation, rafraîchi chaque seconde tant que la fenêtre est ouverte."""
+        instrumentation = self.instrumentation
+        win = tk.Toplevel(self.root)
+        win.title("Diagnostics")
+        text = tk.Text(win, width=110, height=35, font=("Courier", 10))
+        text.pack(fill="both", expand=True, padx=5, pady=5)
+
+        def refresh():
+            if not win.winfo_exists():
+                return
+            text.delete("1.0", "end")
+            text.insert("1.0", instrumentation.report())
+            win.after(1000, refresh)
+
+        def save():
+            from tkinter import filedialog
+            filename = filedialog.asksaveasfilename(parent=win, defaultextension=".txt",
+                                                    filetypes=[("Texte", "*.txt"), ("All files", "*.*")])
+            if filename:
+                instrumentation.dump(filename)
+
+        buttons = ttk.Frame(win)
+        buttons.pack(pady=5)
+        ttk.Button(buttons, text="Enregistrer…", command=save).grid(row=0, column=0, padx=5)
+        ttk.Button(buttons, text="Remettre à zéro", command=instrumentation.reset).grid(row=0, column=1, padx=5)
+        refresh()
+
+    def on_close(self):
+        self.core.shutdown()
+        if self.instrumentation is not None:
+            try:
+                print(f"Rapport d'instrumentation : {self.instrumentation.dump()}")
+            except OSError as e:
+                print(f"Rapport d'instrumentation non écrit ({e})", file=sys.stderr)
+        self.root.destroy()
+
     def run(self):
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            self.core.shutdown()
@@ -8,3 +8,25 @@ def format_lap_duration(sec):
         return str(timedelta(seconds=int(sec)))
     except:
         return "N/A"
+
+def format_secs_as_hhmmss(secs):
+    if secs < 0:
+        secs = 0
+    return str(timedelta(seconds=int(secs)))
+
+def parse_secs(value):
+    """'H:MM:SS' / 'MM:SS' / '371' / 371 => secondes (float), sinon None ('N/A', vide...)."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).strip()
+    try:
+        if ":" in value:
+            total = 0.0
+            for part in value.split(":"):
+                total = total * 60 + float(part)
+            return total
+        return float(value)
+    except ValueError:
+        return None
@@ -0,0 +1,273 @@
+import queue
+import threading
+
+from .db import (
+    Database,
+    get_db,
+    flush_writes,
+    count_laps,
+    fetch_laps_after,
+    fetch_laps_before,
+    fetch_laps_from,
+    fetch_lap_key_at,
+)
+from .utils import format_secs_as_hhmmss
+
+
+def sync_tree(tree, shown, wanted):
+    """
+    Aligne les lignes d'un Treeview (contenu connu : `shown`, iid -> values) sur `wanted`
+    (même forme, dans l'ordre d'affichage). Rend le nombre d'appels Tk effectués.
+    """
+    calls = 0
+    stale = [iid for iid in shown if iid not in wanted]
+    if stale:
+        tree.delete(*stale)
+        calls += 1
+
+    order = [iid for iid in shown if iid in wanted]  # ordre actuel du widget
+    for position, (iid, values) in enumerate(wanted.items()):
+        current = shown.get(iid)
+        if current is None:
+            tree.insert("", position, iid=iid, values=values)
+            order.insert(position, iid)
+            calls += 1
+            continue
+        if order[position] != iid:
+            # Ligne restée à l'écran mais déplacée (numéro de tour modifié)
+            tree.move(iid, "", position)
+            order.remove(iid)
+            order.insert(position, iid)
+            calls += 1
+        if current != values:
+            tree.item(iid, values=values)
+            calls += 1
+    return calls
+
+
+class LapTableView:
+    """
+    Tient un Treeview “Derniers tours” aligné sur la fin d'un LapStore, par différence :
+    seules les lignes ajoutées, sorties de la fenêtre ou modifiées donnent lieu à un
+    appel Tk. L'iid d'une ligne est l'index du tour dans le LapStore (stable tant que
+    le tour existe), et le contenu affiché est gardé en cache pour ne jamais relire le widget.
+
+    tk_calls / last_tk_calls comptent les appels Tk (insert, delete, move, item) faits
+    au total / lors du dernier sync().
+    """
+
+    def __init__(self, tree, laps, size=10):
+        self.tree = tree
+        self.laps = laps
+        self.size = size
+        self._shown = {}  # iid -> values, dans l'ordre d'affichage
+        self.tk_calls = 0
+        self.last_tk_calls = 0
+        self.syncs = 0
+
+    def sync(self):
+        laps = self.laps
+        end = len(laps)
+        first = max(end - self.size, 0)
+        wanted = {str(i): laps.row(i) for i in range(first, end)}
+
+        calls = sync_tree(self.tree, self._shown, wanted)
+
+        self._shown = wanted
+        self.last_tk_calls = calls
+        self.tk_calls += calls
+        self.syncs += 1
+        return calls
+
+
+def format_management_row(row):
+    """Ligne SQL de la table laps => valeurs affichées (lap_time, stocké en secondes, en H:MM:SS)."""
+    lap_time = format_secs_as_hhmmss(row[4]) if row[4] is not None else "N/A"
+    return (*row[:4], lap_time, *row[5:])
+
+
+def _row_key(row):
+    # (lap_number, id) : clé de tri / pagination de la table laps
+    return (row[2], row[0])
+
+
+class LapGrid:
+    """
+    Treeview virtualisé sur toute la table laps, trié par (lap_number, id) :
+    seules `page_size` lignes existent dans le widget. Le défilement (molette,
+    flèches, barre) déplace la fenêtre par pagination sur clé, la page précédente
+    et la suivante sont préchargées sur un thread (connexion SQLite dédiée) et
+    un refresh() ne touche que les lignes qui ont changé (iid = id du tour).
+
+    format_row(row) convertit une ligne SQL en valeurs affichées.
+    """
+
+    def __init__(self, tree, scrollbar, page_size=20, format_row=None, prefetch=True, poll_ms=20):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.page_size = page_size
+        self.format_row = format_row or tuple
+        self.poll_ms = poll_ms
+
+        self.rows = []       # lignes SQL affichées
+        self.ahead = []      # lignes préchargées juste après la fenêtre
+        self.behind = []     # lignes préchargées juste avant la fenêtre
+        self.offset = 0      # position (approximative) de la première ligne affichée
+        self.total = 0
+        self._shown = {}
+        self.tk_calls = 0
+
+        # Préchargement : requêtes et réponses passent par deux files, la boucle Tk
+        # relève les réponses par after() (jamais d'appel Tk depuis le thread).
+        self._generation = 0
+        self._requests = None
+        self._results = queue.Queue()
+        self._outstanding = 0   # requêtes envoyées au thread dont la réponse n'est pas relevée
+        self._polling = False
+        self._closed = False
+        if prefetch and get_db().path != ":memory:":
+            self._requests = queue.Queue()
+            threading.Thread(target=self._prefetch_worker, args=(get_db().path,), daemon=True).start()
+
+        scrollbar.configure(command=self.on_scrollbar)
+        tree.bind("<MouseWheel>", self.on_mousewheel)
+        tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        tree.bind("<Button-5>", lambda e: self.scroll(3))
+        tree.bind("<Prior>", lambda e: self.scroll(-self.page_size))
+        tree.bind("<Next>", lambda e: self.scroll(self.page_size))
+        tree.bind("<Destroy>", lambda e: self.close() if e.widget is tree else None)
+
+    # ============== Affichage ==============
+    def load(self, key=None):
+        """Affiche la page commençant à key=(lap_number, id) (début de table si None)."""
+        self.total = count_laps()
+        rows = fetch_laps_from(key, self.page_size) if key else fetch_laps_after(None, self.page_size)
+        if len(rows) < self.page_size:
+            # Fin de table : on complète vers le haut pour garder une page pleine
+            rows = fetch_laps_before(_row_key(rows[0]) if rows else None, self.page_size - len(rows)) + rows
+        self._set_rows(rows, clear_buffers=True)
+
+    def refresh(self):
+        """Relit la page affichée (après modification / suppression) ; seules les lignes changées sont touchées."""
+        self.load(_row_key(self.rows[0]) if self.rows else None)
+
+    def _set_rows(self, rows, clear_buffers=False):
+        self.rows = rows
+        if clear_buffers:
+            self.ahead, self.behind = [], []
+            self._generation += 1
+        wanted = {str(row[0]): self.format_row(row) for row in rows}
+        self.tk_calls += sync_tree(self.tree, self._shown, wanted)
+        self._shown = wanted
+        self._update_scrollbar()
+        self._request_prefetch()
+
+    def _update_scrollbar(self):
+        if not self.total:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        self.offset = max(0, min(self.offset, self.total - len(self.rows)))
+        self.scrollbar.set(self.offset / self.total, (self.offset + len(self.rows)) / self.total)
+
+    # ============== Navigation ==============
+    def scroll(self, delta):
+        """Décale la fenêtre de `delta` lignes (négatif = vers le haut)."""
+        if not self.rows or delta == 0:
+            return
+        if delta > 0:
+            if len(self.ahead) < delta:
+                self.ahead += fetch_laps_after(_row_key((self.ahead or self.rows)[-1]), delta - len(self.ahead))
+            moved = self.ahead[:delta]
+            if not moved:
+                return
+            self.ahead = self.ahead[len(moved):]
+            self.behind = (self.behind + self.rows[:len(moved)])[-self.page_size:]
+            self.offset += len(moved)
+            self._set_rows(self.rows[len(moved):] + moved)
+        else:
+            delta = -delta
+            if len(self.behind) < delta:
+                self.behind = fetch_laps_before(_row_key((self.behind or self.rows)[0]), delta - len(self.behind)) + self.behind
+            moved = self.behind[-delta:] if delta <= len(self.behind) else self.behind
+            if not moved:
+                return
+            self.behind = self.behind[:len(self.behind) - len(moved)]
+            self.ahead = (self.rows[len(self.rows) - len(moved):] + self.ahead)[:self.page_size]
+            self.offset -= len(moved)
+            self._set_rows(moved + self.rows[:len(self.rows) - len(moved)])
+
+    def jump(self, fraction):
+        """Saut direct à une position relative (barre de défilement)."""
+        self.total = count_laps()
+        self.offset = int(max(0.0, min(fraction, 1.0)) * max(self.total - self.page_size, 0))
+        self.load(fetch_lap_key_at(self.offset))
+
+    def on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self.jump(float(args[1]))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            self.scroll(step * (self.page_size if args[2] == "pages" else 1))
+
+    def on_mousewheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+
+    # ============== Préchargement ==============
+    def _request_prefetch(self):
+        if self._requests is None or not self.rows:
+            return
+        want_ahead = self.page_size - len(self.ahead)
+        want_behind = self.page_size - len(self.behind)
+        if want_ahead > 0:
+            self._requests.put((self._generation, "ahead", _row_key((self.ahead or self.rows)[-1]), want_ahead))
+            self._outstanding += 1
+        if want_behind > 0:
+            self._requests.put((self._generation, "behind", _row_key((self.behind or self.rows)[0]), want_behind))
+            self._outstanding += 1
+        if not self._polling:
+            self._polling = True
+            self.tree.after(self.poll_ms, self._poll_results)
+
+    def _prefetch_worker(self, path):
+        db = Database(path)
+        try:
+            while True:
+                request = self._requests.get()
+                if request is None:
+                    return
+                generation, direction, key, limit = request
+                flush_writes()
+                if direction == "ahead":
+                    rows = fetch_laps_after(key, limit, db=db)
+                else:
+                    rows = fetch_laps_before(key, limit, db=db)
+                self._results.put((generation, direction, key, rows))
+        finally:
+            db.close()
+
+    def _poll_results(self):
+        if self._closed:
+            return
+        while True:
+            try:
+                generation, direction, key, rows = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._outstanding -= 1
+            if generation != self._generation or not self.rows:
+                continue
+            # N'accepte la réponse que si elle prolonge encore exactement le tampon courant
+            if direction == "ahead" and key == _row_key((self.ahead or self.rows)[-1]):
+                self.ahead = (self.ahead + rows)[:self.page_size]
+            elif direction == "behind" and key == _row_key((self.behind or self.rows)[0]):
+                self.behind = (rows + self.behind)[-self.page_size:]
+        if self._outstanding > 0:
+            self.tree.after(self.poll_ms, self._poll_results)
+        else:
+            self._polling = False
+
+    def close(self):
+        self._closed = True
+        if self._requests is not None:
+            self._requests.put(None)
+            self._requests = None
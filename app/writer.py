@@ -0,0 +1,149 @@
+import sys
+import threading
+import time
+from collections import deque
+
+from .db import Database
+
+
+class WriteBehindQueue:
+    """
+    Écritures SQLite différées sur un thread dédié, pour que les clics de tours
+    ne bloquent jamais la boucle Tk sur le disque.
+
+    - File bornée (maxsize) : submit() ne bloque que si le disque a pris
+      `maxsize` écritures de retard.
+    - Group commit : le thread prend jusqu'à `batch_size` écritures d'un coup et
+      les valide dans une seule transaction.
+    - Ordre garanti : un seul thread, FIFO, lots validés dans l'ordre ; après un
+      crash la base contient toujours un préfixe des écritures soumises.
+    - flush() attend que tout ce qui a été soumis soit validé.
+    - on_commit(depth, batch_size, latency) est appelé depuis le thread d'écriture
+      après chaque commit ; metrics() donne un instantané des compteurs.
+    """
+
+    def __init__(self, path, maxsize=10_000, batch_size=500, on_commit=None, **pragmas):
+        self.path = path
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.on_commit = on_commit
+        self._pragmas = pragmas
+
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._committed = 0
+        self._closing = False
+
+        self.commits = 0
+        self.errors = 0
+        self.last_commit_latency = 0.0
+        self.max_commit_latency = 0.0
+        self.max_depth = 0
+
+        self._thread = threading.Thread(target=self._run, name="lap-writer", daemon=True)
+        self._thread.start()
+
+    # ============== Côté boucle Tk ==============
+    def submit(self, sql, params=()):
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("WriteBehindQueue fermée")
+            while len(self._items) >= self.maxsize:
+                self._cond.wait()
+            self._items.append((sql, params))
+            self._submitted += 1
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._cond.notify_all()
+
+    def submit_many(self, sql, seq_of_params):
+        """Plusieurs écritures sous un seul verrou : le thread les valide ensemble (lots de batch_size)."""
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("WriteBehindQueue fermée")
+            for params in seq_of_params:
+                while len(self._items) >= self.maxsize:
+                    self._cond.notify_all()
+                    self._cond.wait()
+                self._items.append((sql, params))
+                self._submitted += 1
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Attend que toutes les écritures soumises soient validées. Rend False si timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._submitted
+            while self._committed < target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Vide la file puis arrête le thread."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    @property
+    def depth(self):
+        return len(self._items)
+
+    def metrics(self):
+        return {
+            "depth": len(self._items),
+            "max_depth": self.max_depth,
+            "submitted": self._submitted,
+            "committed": self._committed,
+            "commits": self.commits,
+            "errors": self.errors,
+            "last_commit_latency": self.last_commit_latency,
+            "max_commit_latency": self.max_commit_latency,
+        }
+
+    # ============== Thread d'écriture ==============
+    def _run(self):
+        db = Database(self.path, **self._pragmas)
+        try:
+            while True:
+                with self._cond:
+                    while not self._items and not self._closing:
+                        self._cond.wait()
+                    if not self._items and self._closing:
+                        return
+                    batch = [self._items.popleft() for _ in range(min(self.batch_size, len(self._items)))]
+                    self._cond.notify_all()  # place libérée pour submit()
+
+                t0 = time.perf_counter()
+                self._write_batch(db, batch)
+                latency = time.perf_counter() - t0
+
+                with self._cond:
+                    self._committed += len(batch)
+                    self.commits += 1
+                    self.last_commit_latency = latency
+                    self.max_commit_latency = max(self.max_commit_latency, latency)
+                    depth = len(self._items)
+                    self._cond.notify_all()
+                if self.on_commit:
+                    self.on_commit(depth, len(batch), latency)
+        finally:
+            db.close()
+
+    def _write_batch(self, db, batch):
+        try:
+            with db.transaction():
+                for sql, params in batch:
+                    db.execute(sql, params)
+        except Exception:
+            # Le lot a été annulé : on rejoue une à une pour ne perdre que l'écriture fautive
+            for sql, params in batch:
+                try:
+                    db.execute(sql, params)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"Écriture perdue ({e}): {sql.strip()} {params}", file=sys.stderr)
@@ -0,0 +1,60 @@
+"""
+Micro-benchmark : latence par tour enregistré.
+Avant  = sqlite3.connect() + INSERT + commit + close à chaque tour.
+Après  = connexion longue durée (app.db.Database, WAL).
+
+Usage : python -m bench.bench_db_connection [nb_tours]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from app import db
+
+
+def legacy_store_lap_data(path, lap_type, lap_number, rider_name, lap_time, time_diff, cumulative_time, lap_duration):
+    # Copie de l'ancienne implémentation (une connexion par appel)
+    with sqlite3.connect(path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO laps
+            (type, lap_number, rider_name, lap_time, time_diff, cumulative_time, lap_duration)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (lap_type, lap_number, rider_name, lap_time, time_diff, str(cumulative_time), str(lap_duration)))
+        conn.commit()
+    conn.close()
+
+
+def run(n_laps=2000):
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        pooled_path = os.path.join(tmp, "pooled.db")
+
+        db.configure_db(legacy_path)
+        db.init_db()
+        db.get_db().close()
+
+        t0 = time.perf_counter()
+        for i in range(1, n_laps + 1):
+            legacy_store_lap_data(legacy_path, "Vélo 1", i, "Lionceau", "0:01:00", "N/A", i * 60, 60)
+        legacy = (time.perf_counter() - t0) / n_laps
+
+        db.configure_db(pooled_path)
+        db.init_db()
+        t0 = time.perf_counter()
+        for i in range(1, n_laps + 1):
+            db.store_lap_data("Vélo 1", i, "Lionceau", "0:01:00", "N/A", i * 60, 60)
+        pooled = (time.perf_counter() - t0) / n_laps
+        db.get_db().close()
+
+    print(f"{n_laps} tours")
+    print(f"  connexion par appel : {legacy * 1e6:9.1f} µs/tour")
+    print(f"  connexion partagée  : {pooled * 1e6:9.1f} µs/tour")
+    print(f"  gain                : x{legacy / pooled:.1f}")
+    return {"legacy_us": legacy * 1e6, "pooled_us": pooled * 1e6}
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
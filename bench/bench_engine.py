@@ -0,0 +1,40 @@
+"""
+Débit du RaceEngine sans affichage : N tours synthétiques (horloge simulée,
+base ':memory:') poussés dans la vraie logique d'enregistrement / annulation.
+
+Usage : python -m bench.bench_engine [nb_tours]
+"""
+import sys
+import time
+
+from app import db
+from app.clock import FakeClock
+from app.engine import RaceEngine, BIKE1, PELOTON, TMA
+
+def run(n_laps=300_000, undo_every=50):
+    db.configure_db(":memory:")
+    db.init_db()
+    clock = FakeClock()
+    engine = RaceEngine(clock=clock)
+    events = []
+    engine.subscribe(lambda event, **data: events.append(event))
+    engine.start()
+
+    groups = (BIKE1, PELOTON, TMA)
+    t0 = time.perf_counter()
+    for i in range(n_laps):
+        clock.advance(31)
+        engine.record_lap(groups[i % 3])
+        if undo_every and i % undo_every == 0:
+            engine.undo_last_lap()
+        if i % 1000 == 0:
+            engine.compute_avg_of_last_5(BIKE1)
+            engine.gap_text()
+    elapsed = time.perf_counter() - t0
+
+    print(f"{n_laps} tours en {elapsed:.2f} s => {n_laps / elapsed:,.0f} tours/s ({len(events)} événements)")
+    return {"laps": n_laps, "seconds": elapsed, "laps_per_second": n_laps / elapsed}
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 300_000)
@@ -0,0 +1,63 @@
+"""
+Import en masse d'un export (CSV / JSONL) de 100k tours dans une base qui en contient
+déjà la moitié : lecture + validation, INSERT dédoublonné (une transaction),
+reconstruction de l'état du RaceEngine.
+
+Usage : python -m bench.bench_import [nb_tours]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from app import db
+from app.clock import FakeClock
+from app.engine import RaceEngine
+from app.export import export_laps
+from app.importer import parse_file
+
+
+def fill(n_laps, seed=24):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_laps):
+        lap_type = db.LAP_TYPES[i % 3]
+        duration = rng.uniform(55.0, 75.0)
+        rows.append((lap_type, i // 3 + 1, f"Rider {rng.randrange(23)}", i * 20.0, "N/A", i * 20.0, duration))
+    return rows
+
+
+def run(n_laps=100_000):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure_db(os.path.join(tmp, "source.db"))
+        db.init_db()
+        db.insert_laps(fill(n_laps))
+        for ext in ("csv", "jsonl"):
+            export_laps(os.path.join(tmp, f"laps.{ext}"))
+
+        for ext in ("csv", "jsonl"):
+            db.configure_db(os.path.join(tmp, f"target_{ext}.db"))
+            db.init_db()
+            db.insert_laps(fill(n_laps)[: n_laps // 2])
+            engine = RaceEngine(clock=FakeClock())
+            engine.stats.rebuild()
+            engine.reload_from_db()
+
+            t0 = time.perf_counter()
+            rows, report = parse_file(os.path.join(tmp, f"laps.{ext}"))
+            t1 = time.perf_counter()
+            report.inserted = engine.import_laps(rows)
+            t2 = time.perf_counter()
+
+            assert report.inserted == n_laps - n_laps // 2 and engine.stats.verify_against_db() == []
+            print(f"{ext:5s} {n_laps} lignes : lecture+validation {t1 - t0:.2f} s, "
+                  f"insert+reconstruction {t2 - t1:.2f} s — {report.summary()}")
+            results[ext] = {"parse_s": t1 - t0, "import_s": t2 - t1, "inserted": report.inserted}
+        db.configure_db(":memory:")
+    return results
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,105 @@
+"""
+Débit du serveur de réception des tours (app/ingest.py) sur localhost : deux postes par
+groupe envoient chacun le même passage (horodatages décalés d'une seconde), le
+serveur écarte les doublons et le thread principal vide la file toutes les 50 ms vers le
+RaceEngine, comme la boucle Tk (CyclingCore.drain_ingest). Base temporaire.
+
+Mesures : événements par seconde, latence envoi => tour enregistré (médiane, p99, pire),
+et vérification des totaux (un tour par passage, aucun doublon).
+
+Usage : python -m bench.bench_ingest [passages_par_groupe] [événements_par_s]
+        (débit 0 : au plus vite)
+"""
+import json
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from app import db
+from app.clock import FakeClock
+from app.engine import RaceEngine, BIKE1, PELOTON, TMA
+from app.ingest import IngestServer
+
+POLL = 0.050
+GROUPS = (BIKE1, PELOTON, TMA)
+
+
+def station(port, name, group, laps, rate, sent, replies):
+    """Un poste : une connexion, une ligne par passage, attend la réponse avant la suivante."""
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        f = sock.makefile("rwb")
+        offset = 1.0 if name.endswith("b") else 0.0
+        start = time.perf_counter()
+        for i, wall in enumerate(laps):
+            if rate:
+                delay = start + i / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            sent[(name, wall + offset)] = time.perf_counter()
+            f.write(json.dumps({"group": group, "t": wall + offset, "station": name}).encode() + b"\n")
+            f.flush()
+            replies.append(f.readline().split(b" ", 1)[0].decode())
+
+
+def run(laps_per_group=2000, rate=0.0):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure_db(os.path.join(tmp, "ingest.db"))
+        db.init_db()
+        db.start_writer()
+        epoch = time.time() - 86400
+        engine = RaceEngine(clock=FakeClock(0.0, epoch=epoch))
+        engine.stats.invalidate()
+        engine.start()
+        # Course rejouée d'un bloc : passages jusqu'à ~17 h avant maintenant
+        server = IngestServer("127.0.0.1", 0, max_skew=2 * 86400).start()
+
+        # Passage i du groupe g à epoch + 31 s * (i + 1) (+ décalage par groupe)
+        laps = {g: [epoch + 31.0 * (i + 1) + k for i in range(laps_per_group)] for k, g in enumerate(GROUPS)}
+        sent, replies = {}, []
+        stations = [threading.Thread(target=station, args=(server.port, f"{g}-{s}", g, laps[g],
+                                                              rate / 6 if rate else 0, sent, replies))
+                    for g in GROUPS for s in "ab"]
+
+        recorded_at = {}
+        t0 = time.perf_counter()
+        for thread in stations:
+            thread.start()
+        expected = laps_per_group * len(GROUPS)
+        while len(recorded_at) < expected:
+            time.sleep(POLL)
+            now = time.perf_counter()
+            for event in server.drain():
+                engine.record_lap(event.group, at=engine.clock.from_wall(event.wall))
+                recorded_at[event.seq] = (event, now)
+            if not any(thread.is_alive() for thread in stations) and not server.events.qsize() \
+                    and len(recorded_at) < expected:
+                break
+        elapsed = time.perf_counter() - t0
+        for thread in stations:
+            thread.join()
+        server.stop()
+        db.stop_writer()
+        db.configure_db(":memory:")
+
+    # Latence : envoi du premier poste qui a signalé le passage => relève par la boucle
+    latencies = sorted(now - sent[(event.station, event.wall)] for event, now in recorded_at.values())
+
+    n_events = len(replies)
+    totals = {name: group.total for name, group in engine.groups.items()}
+    print(f"{n_events} lignes de 6 postes en {elapsed:.2f} s : {n_events / elapsed:.0f} événements/s "
+          f"(débit visé : {'max' if not rate else f'{rate:g}/s'})")
+    print(f"  réponses : OK {replies.count('OK')}, DUP {replies.count('DUP')}, ERR {replies.count('ERR')}")
+    print(f"  latence envoi => tour enregistré : médiane {statistics.median(latencies) * 1e3:.1f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.1f} ms, pire {latencies[-1] * 1e3:.1f} ms "
+          f"(relève toutes les {POLL * 1e3:.0f} ms)")
+    print(f"  totaux {totals} (attendus {laps_per_group} par groupe)")
+    return {"events_per_s": n_events / elapsed, "totals": totals,
+            "latency_median_ms": statistics.median(latencies) * 1e3, "latency_max_ms": latencies[-1] * 1e3}
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000, float(sys.argv[2]) if len(sys.argv) > 2 else 0.0)
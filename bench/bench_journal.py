@@ -0,0 +1,55 @@
+"""
+Coût d'un pas d'annulation / de rétablissement selon la taille de la course :
+N tours enregistrés, puis 1000 undo et 1000 redo (base temporaire, file d'écriture
+active comme dans l'application). Le temps par pas doit rester plat quand N grandit.
+
+Usage : python -m bench.bench_journal [nb_tours ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from app import db
+from app.clock import FakeClock
+from app.engine import RaceEngine, BIKE1, PELOTON, TMA
+
+
+def run_one(n_laps, steps=1000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure_db(os.path.join(tmp, "journal.db"))
+        db.init_db()
+        db.start_writer()
+        clock = FakeClock()
+        engine = RaceEngine(clock=clock)
+        engine.start()
+        groups = (BIKE1, PELOTON, TMA)
+        for i in range(n_laps):
+            clock.advance(31)
+            engine.record_lap(groups[i % 3])
+        db.flush_writes()
+
+        t0 = time.perf_counter()
+        for _ in range(steps):
+            engine.undo_last_lap()
+        t1 = time.perf_counter()
+        for _ in range(steps):
+            engine.redo()
+        t2 = time.perf_counter()
+        db.flush_writes()
+        assert engine.stats.verify_against_db() == []
+        db.configure_db(":memory:")
+    return (t1 - t0) / steps, (t2 - t1) / steps
+
+
+def run(sizes=(1_000, 10_000, 100_000)):
+    results = {}
+    for n in sizes:
+        undo, redo = run_one(n)
+        print(f"{n:>7} tours : undo {undo * 1e6:7.1f} µs/pas, redo {redo * 1e6:7.1f} µs/pas")
+        results[n] = {"undo_us": undo * 1e6, "redo_us": redo * 1e6}
+    return results
+
+
+if __name__ == "__main__":
+    run(tuple(int(a) for a in sys.argv[1:]) or (1_000, 10_000, 100_000))
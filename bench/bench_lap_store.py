@@ -0,0 +1,60 @@
+"""
+Mémoire par 10k tours (tracemalloc) : ancienne liste de tuples de chaînes
+formatées vs LapStore (colonnes array + riders internés).
+
+Usage : python -m bench.bench_lap_store [nb_tours]
+"""
+import sys
+import tracemalloc
+from datetime import timedelta
+
+from app.engine import DEFAULT_RIDERS
+from app.laps import LapStore, RiderTable
+from app.utils import format_lap_duration
+
+
+def build_tuple_list(n_laps):
+    # Représentation d'avant : (lap_number, rider, "H:MM:SS", "N/A", "H:MM:SS")
+    laps = []
+    elapsed = 0.0
+    for i in range(1, n_laps + 1):
+        duration = 60 + (i * 7919) % 60 + 0.25
+        elapsed += duration
+        rider = DEFAULT_RIDERS[(i // 10) % len(DEFAULT_RIDERS)]
+        laps.append((i, rider, str(timedelta(seconds=int(elapsed))), "N/A", format_lap_duration(duration)))
+    return laps
+
+
+def build_lap_store(n_laps):
+    store = LapStore(RiderTable())
+    elapsed = 0.0
+    for i in range(1, n_laps + 1):
+        duration = 60 + (i * 7919) % 60 + 0.25
+        elapsed += duration
+        store.append(i, DEFAULT_RIDERS[(i // 10) % len(DEFAULT_RIDERS)], elapsed, duration)
+    return store
+
+
+def measure(builder, n_laps):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    obj = builder(n_laps)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del obj
+    return size
+
+
+def run(n_laps=10_000):
+    old = measure(build_tuple_list, n_laps)
+    new = measure(build_lap_store, n_laps)
+    per_10k = 10_000 / n_laps
+    print(f"{n_laps} tours")
+    print(f"  liste de tuples : {old * per_10k / 1024:8.1f} Kio / 10k tours ({old / n_laps:.0f} o/tour)")
+    print(f"  LapStore        : {new * per_10k / 1024:8.1f} Kio / 10k tours ({new / n_laps:.0f} o/tour)")
+    return {"tuple_list_bytes": old, "lap_store_bytes": new}
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
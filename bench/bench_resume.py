@@ -0,0 +1,96 @@
+"""
+Reprise d'une course après crash sur une base de 50k tours : reconstruction complète
+(stats.rebuild + reload_from_db, l'ancien démarrage) vs RaceEngine.resume()
+(instantané race_session + derniers tours). Avec un affichage disponible, mesure aussi
+le temps jusqu'au premier rendu de CyclingEventApp (fenêtre cachée).
+
+Usage : python -m bench.bench_resume [nb_tours]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from app import db
+from app.clock import FakeClock
+from app.engine import RaceEngine
+
+
+def build_race(path, n_laps, seed=24):
+    db.configure_db(path)
+    db.init_db()
+    rng = random.Random(seed)
+    clock = FakeClock(0.0, epoch=time.time() - 12 * 3600)
+    engine = RaceEngine(clock=clock)
+    engine.stats.invalidate()
+    engine.start()
+    rows = []
+    ends = dict.fromkeys(db.LAP_TYPES, 0.0)
+    for i in range(n_laps):
+        lap_type = db.LAP_TYPES[i % 3]
+        duration = round(rng.uniform(55.0, 75.0), 3)
+        ends[lap_type] += duration
+        rows.append((lap_type, i // 3 + 1, f"Rider {rng.randrange(23)}", ends[lap_type], "N/A", ends[lap_type], duration))
+    db.insert_laps(rows)
+    clock.set(12 * 3600)
+    engine.reload_from_db()  # instantané cohérent avec les tours insérés
+    db.configure_db(":memory:")
+
+
+def timed_startup(path, resume):
+    db.configure_db(path)
+    t0 = time.perf_counter()
+    db.init_db()
+    engine = RaceEngine(clock=FakeClock(0.0, epoch=time.time()))
+    if resume:
+        engine.resume()
+    else:
+        engine.stats.rebuild()
+        engine.reload_from_db()
+    elapsed = time.perf_counter() - t0
+    db.configure_db(":memory:")
+    return elapsed, engine
+
+
+def first_paint(path):
+    """Construction de CyclingEventApp jusqu'au premier repaint traité ; None sans affichage."""
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+    from app.ui import CyclingEventApp
+    root.withdraw()
+    db.configure_db(path)
+    t0 = time.perf_counter()
+    app = CyclingEventApp(root)
+    root.update()
+    elapsed = time.perf_counter() - t0
+    app.core.shutdown()
+    root.destroy()
+    db.configure_db(":memory:")
+    return elapsed
+
+
+def run(n_laps=50_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "race.db")
+        build_race(path, n_laps)
+        full, _ = timed_startup(path, resume=False)
+        fast, engine = timed_startup(path, resume=True)
+        paint = first_paint(path)
+
+    totals = {name: group.total for name, group in engine.groups.items()}
+    print(f"{n_laps} tours en base, totaux repris : {totals}")
+    print(f"  reconstruction complète : {full * 1e3:8.1f} ms")
+    print(f"  resume()                : {fast * 1e3:8.1f} ms")
+    if paint is None:
+        print("  premier rendu Tk        : pas d'affichage disponible")
+    else:
+        print(f"  premier rendu Tk        : {paint * 1e3:8.1f} ms")
+    return {"full_ms": full * 1e3, "resume_ms": fast * 1e3, "first_paint_ms": paint and paint * 1e3}
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
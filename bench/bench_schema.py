@@ -0,0 +1,97 @@
+"""
+Benchmark des requêtes de stats / rechargement : schéma v1 (TEXT, sans index)
+vs schéma v2 (REAL + index), sur une base générée de N tours.
+Mesure aussi la durée de la migration v1 -> v2 (init_db).
+
+Usage : python -m bench.bench_schema [nb_tours]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+from app import db
+
+LEGACY_SCHEMA = """
+    CREATE TABLE laps (
+        id INTEGER PRIMARY KEY,
+        type TEXT,
+        lap_number INTEGER,
+        rider_name TEXT,
+        lap_time TEXT,
+        time_diff TEXT,
+        cumulative_time TEXT,
+        lap_duration TEXT
+    )
+"""
+
+RIDERS = ["Lionceau", "Tarpan", "Tamarin", "Ouandji", "Pajero", "Bengali", "Kitfox", "Banteng"]
+
+
+def build_legacy_db(path, n_laps, seed=24):
+    rng = random.Random(seed)
+    database = db.Database(path)
+    database.execute(LEGACY_SCHEMA)
+    rows = []
+    counters = {t: 0 for t in db.LAP_TYPES}
+    clock = {t: 0.0 for t in db.LAP_TYPES}
+    for i in range(n_laps):
+        lap_type = db.LAP_TYPES[i % 3]
+        counters[lap_type] += 1
+        duration = int(rng.uniform(60, 120))
+        clock[lap_type] += duration
+        rider = rng.choice(RIDERS) if lap_type == "Vélo 1" else "N/A"
+        rows.append((lap_type, counters[lap_type], rider, str(timedelta(seconds=int(clock[lap_type]))),
+                     "N/A", str(int(clock[lap_type])), str(duration)))
+    with database.transaction():
+        database.executemany("""
+            INSERT INTO laps
+            (type, lap_number, rider_name, lap_time, time_diff, cumulative_time, lap_duration)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+    database.close()
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def measure():
+    return {
+        "fetch_stats_for_all": timed(db.fetch_stats_for_all),
+        "fetch_stats_per_rider": timed(db.fetch_stats_per_rider),
+        "reload_from_db": timed(db.reload_from_db, repeat=3),
+    }
+
+
+def run(n_laps=100_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "laps.db")
+        build_legacy_db(path, n_laps)
+
+        db.configure_db(path)
+        before = measure()
+
+        t0 = time.perf_counter()
+        db.init_db()
+        migration_ms = (time.perf_counter() - t0) * 1000
+
+        after = measure()
+        db.get_db().close()
+
+    print(f"{n_laps} tours - migration v1 -> v2 : {migration_ms:.0f} ms")
+    print(f"  {'requête':<24}{'v1 (ms)':>10}{'v2 (ms)':>10}")
+    for name in before:
+        print(f"  {name:<24}{before[name]:>10.2f}{after[name]:>10.2f}")
+    return {"migration_ms": migration_ms, "v1": before, "v2": after}
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
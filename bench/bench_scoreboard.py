@@ -0,0 +1,135 @@
+"""
+Tableau d'affichage (app/scoreboard.py) interrogé par un client HTTP local : N écrans
+qui relisent /scoreboard.json en boucle (If-None-Match) et M flux /events, pendant que
+le thread principal fait avancer une course (une seconde de course et un publish() tous
+les 1/10 s réels, un tour de temps en temps), comme on_tick dans la boucle Tk.
+
+Vérifie au passage le protocole : 404, 304 sur ETag inchangé, même corps pour une même
+version sur tous les clients, versions croissantes sur chaque flux SSE.
+Rapport : requêtes par seconde, instantanés construits vs servis, latence publish => SSE.
+
+Usage : python -m bench.bench_scoreboard [écrans] [flux_sse] [durée_s]
+"""
+import http.client
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from app import db
+from app.clock import FakeClock
+from app.engine import RaceEngine, BIKE1, PELOTON, TMA
+from app.scoreboard import Scoreboard
+
+
+def poller(port, stop, seen, counts):
+    """Un écran : connexion persistante, relit l'instantané avec If-None-Match."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    etag = None
+    while not stop.is_set():
+        conn.request("GET", "/scoreboard.json", headers={"If-None-Match": etag} if etag else {})
+        response = conn.getresponse()
+        body = response.read()
+        counts[response.status] = counts.get(response.status, 0) + 1
+        if response.status == 200:
+            etag = response.getheader("ETag")
+            version = json.loads(body)["version"]
+            # Même version => mêmes octets, quel que soit le client
+            assert seen.setdefault(version, body) == body
+    conn.close()
+
+
+def sse_reader(port, stop, latencies, versions):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("GET", "/events")
+    response = conn.getresponse()
+    assert response.getheader("Content-Type") == "text/event-stream"
+    while not stop.is_set():
+        line = response.fp.readline()
+        if not line:
+            break
+        if line.startswith(b"data: "):
+            snapshot = json.loads(line[6:])
+            latencies.append(time.time() - snapshot["updated"])
+            assert not versions or snapshot["version"] > versions[-1]
+            versions.append(snapshot["version"])
+    conn.close()
+
+
+def check_protocol(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request("GET", "/nope")
+    response = conn.getresponse()
+    response.read()
+    assert response.status == 404
+    conn.request("GET", "/scoreboard.json")
+    response = conn.getresponse()
+    response.read()
+    etag = response.getheader("ETag")
+    conn.request("GET", "/scoreboard.json", headers={"If-None-Match": etag})
+    response = conn.getresponse()
+    response.read()
+    assert response.status == 304
+    conn.request("GET", "/")
+    response = conn.getresponse()
+    assert b"EventSource" in response.read()
+    conn.close()
+
+
+def run(screens=50, streams=10, duration=5.0):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure_db(os.path.join(tmp, "scoreboard.db"))
+        db.init_db()
+        db.start_writer()
+        clock = FakeClock(0.0)
+        engine = RaceEngine(clock=clock)
+        engine.stats.invalidate()
+        engine.start()
+        board = Scoreboard(engine, "127.0.0.1", 0).start()
+        board.publish()
+        check_protocol(board.port)
+
+        stop = threading.Event()
+        seen, counts, latencies, versions = {}, {}, [], [[] for _ in range(streams)]
+        pollers = [threading.Thread(target=poller, args=(board.port, stop, seen, counts)) for _ in range(screens)]
+        readers = [threading.Thread(target=sse_reader, args=(board.port, stop, latencies, versions[i]))
+                   for i in range(streams)]
+        for thread in pollers + readers:
+            thread.start()
+
+        t0 = time.perf_counter()
+        ticks = 0
+        while time.perf_counter() - t0 < duration:
+            time.sleep(0.1)
+            clock.advance(1.0)
+            ticks += 1
+            if ticks % 31 == 0:
+                engine.record_lap((BIKE1, PELOTON, TMA)[ticks // 31 % 3])
+            board.publish()
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        for thread in pollers:
+            thread.join()
+        board.stop()  # ferme les flux SSE en attente
+        for thread in readers:
+            thread.join()
+        db.stop_writer()
+        db.configure_db(":memory:")
+
+    requests = sum(counts.values())
+    version = board.current[0]
+    print(f"{screens} écrans + {streams} flux SSE pendant {elapsed:.1f} s : {requests / elapsed:.0f} requêtes/s "
+          f"(200 : {counts.get(200, 0)}, 304 : {counts.get(304, 0)})")
+    print(f"  instantanés construits : {board.builds} ({version} versions), corps servis : {board.served}")
+    print(f"  latence publish => SSE : médiane {statistics.median(latencies) * 1e3:.1f} ms, "
+          f"pire {max(latencies) * 1e3:.1f} ms ; événements par flux : {min(map(len, versions))}-{max(map(len, versions))}")
+    return {"requests_per_s": requests / elapsed, "builds": board.builds, "served": board.served,
+            "sse_latency_median_ms": statistics.median(latencies) * 1e3}
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    run(int(args[0]) if args else 50, int(args[1]) if len(args) > 1 else 10, float(args[2]) if len(args) > 2 else 5.0)
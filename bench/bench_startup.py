@@ -0,0 +1,118 @@
+"""
+Démarrage à froid, chaque mesure dans un processus neuf :
+- `python -X importtime -c "import app.ui"` : coût cumulé de l'import, modules les plus
+  lourds, et vérification qu'aucun module chargé à la demande (export, import, simulation,
+  tracé...) n'est importé au démarrage ;
+- temps jusqu'à la boucle Tk (fenêtre construite, premier tour de mainloop) puis jusqu'à
+  l'application prête (base ouverte et course reprise, après le premier rendu), sur une
+  copie temporaire de la base. Sauté sans affichage.
+
+Usage : python -m bench.bench_startup [budget_ms]
+Avec un budget, code de sortie 1 si le temps jusqu'à la boucle Tk (ou, sans affichage,
+l'import de app.ui) le dépasse.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.db import DB_PATH
+
+# Chargés au premier usage seulement (voir core.export_csv / import_laps, ui.simulation)
+LAZY_MODULES = ("csv", "gzip", "hashlib", "app.export", "app.importer", "app.simulation", "app.track")
+
+_CHILD = r"""
+import json, sys, time
+spawn, path = float(sys.argv[1]), sys.argv[2]
+marks = {"interpreter": time.time()}
+import tkinter as tk
+try:
+    root = tk.Tk()
+except tk.TclError:
+    print(json.dumps(None))
+    sys.exit(0)
+root.withdraw()
+from app import db
+from app.ui import CyclingEventApp
+db.configure_db(path)
+marks["imports"] = time.time()
+app = CyclingEventApp(root)
+marks["built"] = time.time()
+
+def mark(name):
+    marks[name] = time.time()
+    if name == "ready":
+        app.core.shutdown()
+        root.destroy()
+
+root.after(0, mark, "mainloop")      # événement minuteur : avant les tâches idle
+root.after_idle(mark, "ready")       # après core.load (planifié avant)
+root.mainloop()
+print(json.dumps({name: (t - spawn) * 1e3 for name, t in marks.items()}))
+"""
+
+
+def _env():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = root + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def import_profile(top=8):
+    """(cumul app.ui en ms, [(module, propre ms)] les plus lourds, modules à la demande importés)."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.ui"],
+                         capture_output=True, text=True, env=_env(), check=True).stderr
+    modules = {}
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # ligne d'en-tête
+        modules[name.strip()] = (int(self_us) / 1e3, int(cumulative_us) / 1e3)
+    heaviest = sorted(((name, own) for name, (own, _) in modules.items()), key=lambda m: -m[1])[:top]
+    eager = [name for name in LAZY_MODULES if name in modules]
+    return modules["app.ui"][1], heaviest, eager
+
+
+def time_to_mainloop(path):
+    """Repères en ms depuis le lancement du processus ; None sans affichage."""
+    spawn = time.time()
+    out = subprocess.run([sys.executable, "-c", _CHILD, repr(spawn), path],
+                         capture_output=True, text=True, env=_env(), check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def run(budget_ms=None):
+    import_ms, heaviest, eager = import_profile()
+    print(f"import app.ui : {import_ms:7.1f} ms (cumulé, -X importtime)")
+    for name, own in heaviest:
+        print(f"  {name:<28} {own:6.1f} ms")
+    print(f"modules à la demande importés au démarrage : {', '.join(eager) or 'aucun'}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "race.db")
+        if os.path.exists(DB_PATH):
+            shutil.copy(DB_PATH, path)
+        marks = time_to_mainloop(path)
+
+    if marks is None:
+        print("boucle Tk : pas d'affichage disponible")
+    else:
+        for name in ("interpreter", "imports", "built", "mainloop", "ready"):
+            print(f"  {name:<12} {marks[name]:7.1f} ms")
+
+    measured = marks["mainloop"] if marks else import_ms
+    result = {"import_ms": import_ms, "eager": eager, "marks": marks}
+    if budget_ms is not None and measured > budget_ms:
+        print(f"budget dépassé : {measured:.1f} ms > {budget_ms:.1f} ms")
+        sys.exit(1)
+    return result
+
+
+if __name__ == "__main__":
+    run(float(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,251 @@
+"""
+Suite de benchmarks des chemins chauds, à l'échelle d'une course : pour chaque taille
+(1k, 10k, 100k et 1M tours par défaut), une laps_data.db générée (graine fixe) puis
+
+- store_lap_data, fetch_stats_for_all, fetch_stats_per_rider (base seule) ;
+- RaceEngine.reload_from_db, undo_last_lap, compute_avg_of_last_5 ;
+- CyclingCore.update_lap_history sur les vrais Treeview, fenêtre cachée (sautée sans affichage).
+
+Écritures synchrones (pas de file d'écriture) : on mesure le coût SQLite lui-même.
+Chaque mesure donne min / médiane / max par appel en µs. --json écrit les résultats,
+--baseline les compare à un fichier précédent : code de sortie 1 si une médiane
+dépasse la référence de plus de --tolerance (x1.5 par défaut).
+
+Usage : python -m bench.bench_suite [--sizes 1000,10000] [--json out.json]
+                                    [--baseline ref.json] [--tolerance 1.5] [--data DIR]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+from app import db
+from app.clock import FakeClock
+from app.engine import RaceEngine, DEFAULT_RIDERS, BIKE1, PELOTON, TMA
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+GROUPS = (BIKE1, PELOTON, TMA)
+
+
+# ============== Données ==============
+def generate_db(path, n_laps, seed=24):
+    """
+    laps_data.db synthétique : n tours répartis sur les trois groupes, temps en secondes
+    arrondis à la ms comme ceux de record_lap (to_ms).
+    """
+    db.configure_db(path)
+    db.init_db()
+    rng = random.Random(seed)
+    ends = dict.fromkeys(GROUPS, 0.0)
+
+    def rows():
+        for i in range(n_laps):
+            group = GROUPS[i % 3]
+            duration = round(rng.uniform(55.0, 75.0), 3)
+            ends[group] = round(ends[group] + duration, 3)
+            rider = rng.choice(DEFAULT_RIDERS) if group == BIKE1 else ("N/A" if group == PELOTON else "TMA")
+            yield group, i // 3 + 1, rider, ends[group], "N/A", ends[group], duration
+
+    db.insert_laps(rows())
+    db.configure_db(":memory:")
+
+
+def race_db(n_laps, data_dir):
+    """Chemin de la base de n tours dans data_dir, générée si absente (réutilisable avec --data)."""
+    path = os.path.join(data_dir, f"laps_data_{n_laps}.db")
+    if not os.path.exists(path):
+        t0 = time.perf_counter()
+        generate_db(path, n_laps)
+        print(f"  base de {n_laps} tours générée en {time.perf_counter() - t0:.1f} s")
+    return path
+
+
+# ============== Mesures ==============
+def _summary(samples):
+    return {
+        "runs": len(samples),
+        "min_us": min(samples) * 1e6,
+        "median_us": statistics.median(samples) * 1e6,
+        "max_us": max(samples) * 1e6,
+    }
+
+
+def timed(fn, repeat=5, max_time=2.0):
+    """Appel répétable : timeit (autorange) puis `repeat` séries, temps par appel."""
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    repeat = max(1, min(repeat, int(max_time / elapsed) if elapsed else repeat))
+    return _summary([t / number for t in timer.repeat(repeat, number)])
+
+
+def timed_steps(step, count, setup=None):
+    """Opération à état (un tour ajouté, un tour annulé...) : chaque appel chronométré seul."""
+    samples = []
+    for i in range(count):
+        if setup is not None:
+            setup(i)
+        t0 = time.perf_counter()
+        step(i)
+        samples.append(time.perf_counter() - t0)
+    return _summary(samples)
+
+
+def bench_db(results, n_laps):
+    results["fetch_stats_for_all"] = timed(db.fetch_stats_for_all)
+    results["fetch_stats_per_rider"] = timed(db.fetch_stats_per_rider)
+
+    def store(i):
+        db.store_lap_data(TMA, n_laps + i + 1, "TMA", 0.0, "N/A", 0.0, 60.0)
+
+    results["store_lap_data"] = timed_steps(store, 200)
+
+
+def bench_engine(results, steps=200):
+    clock = FakeClock(0.0)
+    engine = RaceEngine(clock=clock)
+    engine.stats.invalidate()
+    results["reload_from_db"] = timed(engine.reload_from_db, repeat=3, max_time=10.0)
+    results["compute_avg_of_last_5"] = timed(lambda: engine.compute_avg_of_last_5(BIKE1))
+
+    engine.start()
+    for i in range(steps):
+        clock.advance(31)
+        engine.record_lap(GROUPS[i % 3])
+    results["undo_last_lap"] = timed_steps(lambda i: engine.undo_last_lap(), steps)
+
+
+def bench_tk(results, path, steps=200):
+    """Treeviews réels sous une fenêtre cachée ; False sans affichage."""
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return False
+    root.withdraw()
+    from app.ui import CyclingEventApp
+
+    db.configure_db(path)
+    app = CyclingEventApp(root)
+    core = app.core
+    core.load()
+    core.engine.clock = FakeClock(0.0)
+    core.engine.reload_from_db()
+    root.update()
+
+    # Remplissage complet des trois tableaux, puis un tour par repaint (cas de la course)
+    def empty_tables(i):
+        for group in GROUPS:
+            tree = core.lap_view(group).tree
+            tree.delete(*tree.get_children())
+        core.lap_views.clear()
+
+    results["update_lap_history_full"] = timed_steps(lambda i: core.update_lap_history(), 5, setup=empty_tables)
+
+    core.engine.start()
+
+    def record(i):
+        core.engine.clock.advance(31)
+        core.engine.record_lap(GROUPS[i % 3])
+
+    def repaint(i):
+        core.update_lap_history((GROUPS[i % 3],))
+        root.update_idletasks()
+
+    results["update_lap_history"] = timed_steps(repaint, steps, setup=record)
+    core.shutdown()
+    root.destroy()
+    return True
+
+
+def run_size(n_laps, data_dir):
+    path = race_db(n_laps, data_dir)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Copie de travail : les écritures mesurées ne touchent pas la base générée
+        work = os.path.join(tmp, "laps_data.db")
+        with open(path, "rb") as src, open(work, "wb") as dst:
+            dst.write(src.read())
+
+        db.configure_db(work)
+        bench_engine(results)
+        bench_db(results, n_laps)
+        db.configure_db(":memory:")
+        if not bench_tk(results, work):
+            print("  Tk : pas d'affichage disponible, update_lap_history sauté")
+        db.configure_db(":memory:")
+    return results
+
+
+# ============== Rapport ==============
+def compare(results, baseline, tolerance):
+    """Lignes (taille, mesure, médiane, référence, ratio) des régressions au-delà de tolerance."""
+    regressions = []
+    for size, entries in results.items():
+        for name, entry in entries.items():
+            ref = baseline.get(str(size), {}).get(name)
+            if ref is None or not ref["median_us"]:
+                continue
+            ratio = entry["median_us"] / ref["median_us"]
+            if ratio > tolerance:
+                regressions.append((size, name, entry["median_us"], ref["median_us"], ratio))
+    return regressions
+
+
+def run(sizes=SIZES, data_dir=None, json_path=None, baseline_path=None, tolerance=1.5):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            print(f"{n} tours")
+            entries = results[str(n)] = run_size(n, data_dir or tmp)
+            for name, entry in entries.items():
+                print(f"  {name:<26} médiane {entry['median_us']:12.1f} µs "
+                      f"(min {entry['min_us']:.1f}, max {entry['max_us']:.1f}, {entry['runs']} mesures)")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sqlite": db.sqlite3.sqlite_version,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"résultats écrits dans {json_path}")
+
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, tolerance)
+        for size, name, median, ref, ratio in regressions:
+            print(f"RÉGRESSION {size} tours, {name} : {median:.1f} µs vs {ref:.1f} µs (x{ratio:.2f})")
+        if regressions:
+            sys.exit(1)
+        print(f"aucune régression au-delà de x{tolerance} par rapport à {baseline_path}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks des chemins chauds à l'échelle d'une course")
+    parser.add_argument("--sizes", default=",".join(str(n) for n in SIZES),
+                        help="tailles de course en tours, séparées par des virgules")
+    parser.add_argument("--data", help="dossier où garder les bases générées entre deux lancements")
+    parser.add_argument("--json", dest="json_path", help="fichier JSON de résultats")
+    parser.add_argument("--baseline", help="résultats JSON de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="ratio médiane / référence toléré")
+    args = parser.parse_args(argv)
+    if args.data:
+        os.makedirs(args.data, exist_ok=True)
+    run(tuple(int(n) for n in args.sizes.split(",")), args.data, args.json_path, args.baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Chargement du tracé : json.load + Track (ancien chemin) vs cache binaire compilé,
+sur le fichier du repo et sur une trace GPS synthétique de N points ; taille des
+niveaux de détail (Douglas-Peucker). Travaille sur des copies temporaires.
+
+Usage : python -m bench.bench_track [nb_points]
+"""
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from app.track import COORDINATES_PATH, Track, compile_track, load_track
+
+
+def gps_trace(n_points, seed=24):
+    rng = random.Random(seed)
+    return [[200 + 150 * math.cos(2 * math.pi * i / n_points) + rng.uniform(-0.3, 0.3),
+             200 + 120 * math.sin(4 * math.pi * i / n_points) + rng.uniform(-0.3, 0.3)]
+            for i in range(n_points)]
+
+
+def measure(source):
+    t0 = time.perf_counter()
+    with open(source) as f:
+        Track(json.load(f))
+    t1 = time.perf_counter()
+    levels = compile_track(source)
+    t2 = time.perf_counter()
+    load_track(source)
+    t3 = time.perf_counter()
+    return {"json_ms": (t1 - t0) * 1e3, "compile_ms": (t2 - t1) * 1e3, "cache_ms": (t3 - t2) * 1e3,
+            "levels": {tolerance: len(track) for tolerance, track in levels.levels.items()}}
+
+
+def run(n_points=200_000):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = {}
+        if os.path.exists(COORDINATES_PATH):
+            sources["repo"] = shutil.copy(COORDINATES_PATH, os.path.join(tmp, "repo.json"))
+        sources[f"gps {n_points}"] = os.path.join(tmp, "gps.json")
+        with open(sources[f"gps {n_points}"], "w") as f:
+            json.dump(gps_trace(n_points), f)
+
+        for name, source in sources.items():
+            r = results[name] = measure(source)
+            print(f"{name:>12} : json+Track {r['json_ms']:8.1f} ms, compilation {r['compile_ms']:8.1f} ms, "
+                  f"cache {r['cache_ms']:6.2f} ms, points par niveau {r['levels']}")
+    return results
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,52 @@
+"""
+Latence d'un clic de tour côté boucle Tk : INSERT synchrone (connexion partagée)
+vs soumission à la file d'écriture différée (group commit sur un thread).
+
+Usage : python -m bench.bench_writer [nb_tours]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from app import db
+
+
+def per_lap(n_laps):
+    worst = 0.0
+    t0 = time.perf_counter()
+    for i in range(1, n_laps + 1):
+        t = time.perf_counter()
+        db.store_lap_data("Vélo 1", i, "Lionceau", i * 60.0, "N/A", i * 60.0, 60.0)
+        worst = max(worst, time.perf_counter() - t)
+    return (time.perf_counter() - t0) / n_laps, worst
+
+
+def run(n_laps=5000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure_db(os.path.join(tmp, "sync.db"), synchronous="FULL")
+        db.init_db()
+        sync_avg, sync_worst = per_lap(n_laps)
+
+        db.configure_db(os.path.join(tmp, "async.db"), synchronous="FULL")
+        db.init_db()
+        commits = []
+        db.start_writer(on_commit=lambda depth, size, latency: commits.append((depth, size, latency)))
+        async_avg, async_worst = per_lap(n_laps)
+        t0 = time.perf_counter()
+        db.flush_writes()
+        drain = time.perf_counter() - t0
+        metrics = db.get_writer().metrics()
+        db.configure_db(":memory:")
+
+    print(f"{n_laps} tours (synchronous=FULL)")
+    print(f"  INSERT synchrone : {sync_avg * 1e6:8.1f} µs/tour, pire {sync_worst * 1e3:.2f} ms")
+    print(f"  file d'écriture  : {async_avg * 1e6:8.1f} µs/tour, pire {async_worst * 1e3:.2f} ms")
+    print(f"  {metrics['commits']} commits (taille moyenne {n_laps / max(metrics['commits'], 1):.0f}), "
+          f"profondeur max {metrics['max_depth']}, commit le plus long {metrics['max_commit_latency'] * 1e3:.2f} ms, "
+          f"vidage final {drain * 1e3:.1f} ms")
+    return {"sync_us": sync_avg * 1e6, "async_us": async_avg * 1e6, **metrics}
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,287 @@
+"""
+Course de 24h synthétique et rejeu accéléré, pour mettre CyclingCore en charge.
+
+generate_race() produit, à graine fixe, le flux d'événements d'une course :
+- trois groupes aux allures différentes (Vélo 1 selon le rouleur et sa fatigue,
+  Peloton régulier, TMA plus lent avec des arrêts) ;
+- la rotation des 23 rouleurs par relais de quelques tours (passage au suivant,
+  puis remise en fin de file) ;
+- des clics oubliés (le tour suivant compte double) et des clics sur le mauvais
+  groupe, annulés quelques secondes plus tard.
+
+replay() rejoue ce flux par les vrais chemins (record_*, undo_last_lap, next_rouleur,
+add_to_queue de CyclingCore sous une fenêtre Tk cachée, ou du RaceEngine seul sans
+affichage). L'horloge du moteur est une FakeClock placée sur l'instant exact de chaque
+événement : le résultat ne dépend pas du retard de la boucle. Le rythme réel est
+t / speed (speed=0 : au plus vite). Rapport : événements par seconde, latence par
+événement (appel + repaint qu'il déclenche) et retard de la boucle sur l'échéancier.
+
+Usage : python -m bench.race_replay [--speed 600] [--seed 24] [--hours 24] [--headless]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app import db
+from app.clock import FakeClock
+from app.engine import RaceEngine, DEFAULT_RIDERS, BIKE1, PELOTON, TMA
+
+# Événements : (t en s depuis le départ, type, argument)
+LAP = "lap"                # argument : groupe
+UNDO = "undo"
+NEXT_RIDER = "next_rider"
+QUEUE = "queue"            # argument : rouleur remis en fin de file
+
+MIN_LAP = 40.0             # marge sur min_lap_time (30 s) : aucun tour généré n'est refusé
+
+
+# ============== Générateur ==============
+def _group_laps(rng, end, pace, spread, stop_rate=0.0):
+    """Instants de passage d'un groupe à allure gaussienne, avec arrêts occasionnels."""
+    t, times = 0.0, []
+    while True:
+        t += max(MIN_LAP, rng.gauss(pace, spread))
+        if stop_rate and rng.random() < stop_rate:
+            t += rng.uniform(120.0, 600.0)
+        if t > end:
+            return times
+        times.append(round(t, 3))
+
+
+def _bike1(rng, end, riders, events):
+    """Vélo 1 : relais de 3 à 8 tours, allure propre à chaque rouleur, qui baisse avec les heures."""
+    skill = {rider: rng.gauss(66.0, 4.0) for rider in riders}
+    queue = list(riders[1:])
+    for rider in queue:
+        events.append((0.0, QUEUE, rider))
+    current, stint, t, times = riders[0], rng.randint(3, 8), 0.0, []
+    while True:
+        fatigue = 1.0 + 0.08 * t / 86400.0
+        t += max(MIN_LAP, rng.gauss(skill[current] * fatigue, 2.5))
+        if t > end:
+            return times
+        times.append(round(t, 3))
+        stint -= 1
+        if stint == 0:
+            # Changement de rouleur juste après le passage, l'ancien repart en fin de file
+            events.append((round(t + 2.0, 3), NEXT_RIDER, None))
+            events.append((round(t + 3.0, 3), QUEUE, current))
+            queue.append(current)
+            current, stint = queue.pop(0), rng.randint(3, 8)
+
+
+def generate_race(seed=24, hours=24.0, riders=DEFAULT_RIDERS, miss_rate=0.01, wrong_rate=0.005):
+    """
+    Rend (événements triés par t, totaux attendus par groupe en fin de rejeu).
+    Un clic erroné n'est placé que s'il est accepté par le moteur (groupe sans tour
+    depuis MIN_LAP) et annulé avant l'événement suivant : l'annulation retire bien ce tour.
+    """
+    rng = random.Random(seed)
+    end = hours * 3600.0
+    events = []
+    laps = {
+        BIKE1: _bike1(rng, end, riders, events),
+        PELOTON: _group_laps(rng, end, 74.0, 3.0),
+        TMA: _group_laps(rng, end, 88.0, 8.0, stop_rate=0.02),
+    }
+    totals = {}
+    for group, times in laps.items():
+        kept = [t for t in times if rng.random() >= miss_rate]
+        totals[group] = len(kept)
+        events.extend((t, LAP, group) for t in kept)
+    events.sort(key=lambda e: e[0])
+
+    out = []
+    last_lap = dict.fromkeys(laps, 0.0)
+    for i, event in enumerate(events):
+        out.append(event)
+        t, kind, group = event
+        if kind != LAP:
+            continue
+        last_lap[group] = t
+        if rng.random() >= wrong_rate:
+            continue
+        wrong = rng.choice([g for g in laps if g != group])
+        click = round(t + rng.uniform(1.0, 4.0), 3)
+        undo = round(click + rng.uniform(3.0, 15.0), 3)
+        following = events[i + 1][0] if i + 1 < len(events) else end
+        if click - last_lap[wrong] >= MIN_LAP and undo < following:
+            out.append((click, LAP, wrong))
+            out.append((undo, UNDO, None))
+    return out, totals
+
+
+# ============== Rejeu ==============
+class _Stats:
+    def __init__(self):
+        self.latencies = []
+        self.lags = []
+
+    def report(self, n_events, elapsed):
+        lat = sorted(self.latencies)
+        return {
+            "events": n_events,
+            "elapsed_s": elapsed,
+            "events_per_s": n_events / elapsed if elapsed else float("inf"),
+            "latency_median_ms": statistics.median(lat) * 1e3,
+            "latency_p99_ms": lat[min(len(lat) - 1, int(len(lat) * 0.99))] * 1e3,
+            "latency_max_ms": lat[-1] * 1e3,
+            "lag_max_ms": max(self.lags, default=0.0) * 1e3,
+        }
+
+
+def _engine_actions(engine):
+    return {
+        LAP: engine.record_lap,
+        UNDO: lambda _: engine.undo_last_lap(),
+        NEXT_RIDER: lambda _: engine.next_rouleur(),
+        QUEUE: engine.add_to_queue,
+    }
+
+
+def _core_actions(app):
+    core = app.core
+    record = {BIKE1: core.record_rouleur_1, PELOTON: core.record_peloton, TMA: core.record_tma}
+
+    def queue(rider):
+        app.rider_selector.set(rider)
+        core.add_to_queue()
+
+    return {
+        LAP: lambda group: record[group](),
+        UNDO: lambda _: core.undo_last_lap(),
+        NEXT_RIDER: lambda _: core.next_rouleur(),
+        QUEUE: queue,
+    }
+
+
+def replay_headless(events, speed=0.0):
+    """RaceEngine seul (pas d'affichage) : la latence couvre l'appel et les abonnés."""
+    clock = FakeClock()
+    engine = RaceEngine(clock=clock)
+    engine.stats.invalidate()
+    engine.start()
+    actions = _engine_actions(engine)
+    stats = _Stats()
+
+    t0 = time.perf_counter()
+    for t, kind, arg in events:
+        if speed:
+            due = t0 + t / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            stats.lags.append(max(0.0, time.perf_counter() - due))
+        clock.set(round(engine.start_time + t, 3))
+        start = time.perf_counter()
+        actions[kind](arg)
+        stats.latencies.append(time.perf_counter() - start)
+    return engine, stats.report(len(events), time.perf_counter() - t0)
+
+
+def replay_tk(events, speed=0.0):
+    """
+    CyclingEventApp sous une fenêtre cachée ; None sans affichage. Chaque événement part
+    d'un callback after() planifié à son échéance réelle, suivi de update_idletasks()
+    (repaint coalescé) : la latence est celle d'un clic jusqu'à l'écran à jour.
+    """
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+    root.withdraw()
+    from app.ui import CyclingEventApp
+
+    app = CyclingEventApp(root)
+    core = app.core
+    core.load()
+    clock = FakeClock()
+    core.engine.clock = clock
+    core.start_24h()
+    start_time = core.engine.start_time
+    actions = _core_actions(app)
+    stats = _Stats()
+    state = {"next": 0}
+    t0 = time.perf_counter()
+
+    def pump():
+        now = time.perf_counter()
+        i = state["next"]
+        # Au plus vite : un événement par callback, pour laisser tourner la boucle Tk
+        while i < len(events) and (not speed or t0 + events[i][0] / speed <= now):
+            t, kind, arg = events[i]
+            if speed:
+                stats.lags.append(max(0.0, now - (t0 + t / speed)))
+            clock.set(round(start_time + t, 3))
+            start = time.perf_counter()
+            actions[kind](arg)
+            root.update_idletasks()
+            stats.latencies.append(time.perf_counter() - start)
+            i += 1
+            if not speed:
+                break
+        state["next"] = i
+        if i >= len(events):
+            root.quit()
+            return
+        delay = 0 if not speed else max(0, int((t0 + events[i][0] / speed - time.perf_counter()) * 1000))
+        root.after(delay, pump)
+
+    root.after(0, pump)
+    root.mainloop()
+    report = stats.report(len(events), time.perf_counter() - t0)
+    engine = core.engine
+    core.shutdown()
+    root.destroy()
+    return engine, report
+
+
+def replay(events, speed=0.0, ui=True):
+    """Rejoue sur une base temporaire ; rend (moteur, rapport, "tk" ou "headless")."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure_db(os.path.join(tmp, "replay.db"))
+        result, mode = None, "tk"
+        if ui:
+            result = replay_tk(events, speed)
+        if result is None:
+            db.init_db()
+            db.start_writer()
+            result, mode = replay_headless(events, speed), "headless"
+        db.stop_writer()
+        db.configure_db(":memory:")
+    engine, report = result
+    return engine, report, mode
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rejeu accéléré d'une course de 24h synthétique")
+    parser.add_argument("--seed", type=int, default=24)
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--speed", type=float, default=0.0, help="facteur d'accélération (0 : au plus vite)")
+    parser.add_argument("--headless", action="store_true", help="RaceEngine seul, sans Tk")
+    args = parser.parse_args(argv)
+
+    events, expected = generate_race(args.seed, args.hours)
+    kinds = {}
+    for _, kind, _ in events:
+        kinds[kind] = kinds.get(kind, 0) + 1
+    print(f"{len(events)} événements générés ({args.hours:g}h, graine {args.seed}) : {kinds}")
+
+    engine, report, mode = replay(events, args.speed, ui=not args.headless)
+    totals = {name: group.total for name, group in engine.groups.items()}
+    print(f"rejeu {mode}, vitesse {'max' if not args.speed else f'x{args.speed:g}'} : "
+          f"{report['events_per_s']:.0f} événements/s en {report['elapsed_s']:.1f} s")
+    print(f"  latence par événement : médiane {report['latency_median_ms']:.2f} ms, "
+          f"p99 {report['latency_p99_ms']:.2f} ms, pire {report['latency_max_ms']:.2f} ms")
+    if args.speed:
+        print(f"  pire retard sur l'échéancier : {report['lag_max_ms']:.1f} ms")
+    print(f"  totaux {totals} (attendus {expected}){'' if totals == expected else ' => ÉCART'}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
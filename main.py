@@ -1,7 +1,16 @@
+import os
 from tkinter import Tk
 from app.ui import CyclingEventApp
 
 if __name__ == "__main__":
     root = Tk()
-    app = CyclingEventApp(root)
+    # CHRONO24_INSTRUMENT=50 : instrumentation des callbacks, blocage signalé au-delà de 50 ms
+    instrument = os.environ.get("CHRONO24_INSTRUMENT")
+    # CHRONO24_INGEST_PORT=24024 : tours envoyés par d'autres postes (voir app/ingest.py)
+    ingest_port = os.environ.get("CHRONO24_INGEST_PORT")
+    # CHRONO24_SCOREBOARD_PORT=8024 : tableau d'affichage http://<poste>:8024/ (voir app/scoreboard.py)
+    scoreboard_port = os.environ.get("CHRONO24_SCOREBOARD_PORT")
+    app = CyclingEventApp(root, instrument_ms=float(instrument) if instrument else None,
+                          ingest_port=int(ingest_port) if ingest_port else None,
+                          scoreboard_port=int(scoreboard_port) if scoreboard_port else None)
     app.run()